@@ -1,6 +1,9 @@
 import streamlit as st
 import uuid
 import database
+import bulk_import
+import catalog_cache
+import lineage
 import datetime
 import warnings
 
@@ -43,6 +46,9 @@ def load_help_texts(file_path):
 
 HELP_CONTENT = load_help_texts('info_context.txt')
 
+# Number of most recently updated pipelines shown under "Recent Activity"
+RECENT_ACTIVITY_COUNT = 10
+
 def show(prefill_data=None):
     """
     Main function to display the application UI for creating and editing pipelines.
@@ -502,21 +508,20 @@ def show(prefill_data=None):
             
             if is_valid:
                 try:
+                    # Header and detail rows are written in a single transaction
+                    if st.session_state.edit_pipeline_id:
+                        general_data['DATA_FLOW_GROUP_ID'] = st.session_state.edit_pipeline_id
+                    database.upsert_pipeline(
+                        general_data,
+                        l0_rows=l0_tables_data_list if current_layer == "L0" else None,
+                        pb_row=pb_data if current_layer in ["L1", "L2"] else None,
+                        create=not st.session_state.edit_pipeline_id
+                    )
+                    # Re-derive the table lineage of the saved pipeline
+                    lineage.sync()
                     if st.session_state.edit_pipeline_id:
-                        database.update_general_info(general_data, st.session_state.edit_pipeline_id)
-                        if current_layer == "L0":
-                            # Ensure the data list is correctly passed
-                            database.update_l0_details(l0_tables_data_list, st.session_state.edit_pipeline_id)
-                        elif current_layer in ["L1", "L2"]:
-                            # Ensure the data dictionary is correctly passed
-                            database.update_pb_details(pb_data, st.session_state.edit_pipeline_id)
                         st.success("Pipeline data updated successfully! ✅")
                     else:
-                        database.save_general_info(general_data)
-                        if current_layer == "L0":
-                            database.save_l0_details(l0_tables_data_list, general_data['DATA_FLOW_GROUP_ID'])
-                        elif current_layer in ["L1", "L2"]:
-                            database.save_pb_details(pb_data, general_data['DATA_FLOW_GROUP_ID'])
                         st.success("Pipeline data saved successfully! ✅")
                 except Exception as e:
                     st.error(f"Failed to save data. Please check logs for details. Error: {e}")
@@ -559,9 +564,30 @@ def show(prefill_data=None):
                 st.session_state['general_data'] = {}
                 st.session_state['l0_tables_data'] = [{}]
                 st.rerun()
+        with st.expander("Bulk Import (CSV / JSONL / Excel)"):
+            st.write("One row per record. A `RECORD_TYPE` column (header, l0 or pb) selects the table; other columns use the database column names.")
+            uploaded_file = st.file_uploader("Import file", type=["csv", "jsonl", "ndjson", "xlsx"], key="bulk_import_file")
+            dry_run = st.checkbox("Dry run (validate only, nothing is saved)", value=True, key="bulk_import_dry_run")
+            if uploaded_file is not None and st.button("Run Import", key="bulk_import_run"):
+                try:
+                    report = bulk_import.import_file(uploaded_file, dry_run=dry_run)
+                    prefix = "Dry run: would have " if dry_run else ""
+                    st.success(f"{prefix}inserted {report['inserted']}, updated {report['updated']}, rejected {report['rejected']} rows.")
+                    if report['rejects']:
+                        if report['rejected'] > len(report['rejects']):
+                            st.caption(f"Showing the first {len(report['rejects'])} of {report['rejected']} rejected rows.")
+                        st.dataframe(
+                            [{**reject, 'errors': ' '.join(reject['errors'])} for reject in report['rejects']],
+                            use_container_width=True
+                        )
+                except (ValueError, ImportError) as e:
+                    st.error(f"Import failed: {e}")
         st.subheader("Recent Activity")
         st.write("Recently modified pipelines across all layers")
-        pipelines = database.get_all_pipelines()
+        pipelines, _ = catalog_cache.list_pipelines(
+            page_size=RECENT_ACTIVITY_COUNT,
+            columns=['DATA_FLOW_GROUP_ID', 'BUSINESS_UNIT', 'ETL_LAYER', 'UPDATED_TS']
+        )
         if not pipelines:
             st.info("No pipelines found. Create one to get started! 🚀")
         else:
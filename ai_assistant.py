@@ -3,8 +3,23 @@ import google.generativeai as genai
 import json
 import re
 import database as db
-import sqlite3
+import catalog_cache
+import fuzzy_index
+import intent_router
+import llm_cache
+import llm_client
+import local_parser
+from prompts import SYSTEM_PROMPTS, get_stage_model
+import structured_output
+from db_connection import get_connection
+from validation import (
+    VALID_OPTIONS, FIELD_MAPPING,
+    REQUIRED_FIELDS_HEADER, REQUIRED_FIELDS_L0, REQUIRED_FIELDS_PB,
+    ALL_FIELDS_HEADER, ALL_FIELDS_L0, ALL_FIELDS_PB,
+    get_required_fields, get_all_fields, validate_data,
+)
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -21,110 +36,6 @@ if not API_KEY:
     st.stop()
 
 genai.configure(api_key=API_KEY)
-model = genai.GenerativeModel(model_name="gemini-2.5-flash")
-
-
-# System Prompts for different tables and operations
-SYSTEM_PROMPTS = {
-    "header": """
-    You are an expert data analyst and an intelligent conversational assistant for managing data pipeline metadata. Your task is to extract specific field values from a user's plain English input.
-
-    You MUST follow these rules:
-    1.  **Extract Data**: Parse the user's input to extract values for the specified fields.
-    2.  **Strict Output Format**: You MUST respond with a single JSON object. The JSON object should only contain the keys for the fields you were able to extract from the user's message. Do not include any other text or formatting.
-        **Example:** For the input "create pipeline with ID my_pipeline, Business Unit is Finace, ETL Layer is L0", the correct output is `{"DATA_FLOW_GROUP_ID": "my_pipeline", "BUSINESS_UNIT": "Finace", "ETL_LAYER": "L0"}`.
-    3.  **No Extraneous Keys**: If a value for a key is not explicitly mentioned or inferred from the user's input, DO NOT include that key in the JSON response.
-    4.  **Schema and Rules**: Use the following database schema and rules to guide your extraction and validation.
-        -   **data_flow_control_header**:
-            -   DATA_FLOW_GROUP_ID (STRING, required)
-            -   BUSINESS_UNIT (STRING, required)
-            -   BUSINESS_OBJECT_NAME (STRING, required)
-            -   TRIGGER_TYPE (STRING, required): Allowed values: DLT, JOB. Dependency: Must be DLT if ETL_LAYER is L0.
-            -   ETL_LAYER (STRING, required): Allowed values: L0, L1, L2.
-            -   COMPUTE_CLASS (STRING, required)
-            -   COMPUTE_CLASS_DEV (STRING, required)
-            -   DATA_SME (STRING, required)
-            -   PRODUCT_OWNER (STRING, required)
-            -   INGESTION_BUCKET (STRING, required): 
-            -   WARNING_THRESHOLD_MINS (INT, required)
-            -   WARNING_DL_GROUP (STRING, required)
-            -   IS_ACTIVE (STRING, required): Allowed values: Y, N. Default: Y.
-            -   INGESTION_MODE (STRING, required for L0)
-            -   SPARK_CONFIGS (STRING)
-            -   COST_CENTER (STRING)
-            -   min_version (DECIMAL)
-            -   max_version (DECIMAL)
-    """,
-    "l0": """
-    You are an expert data analyst and an intelligent conversational assistant for managing data pipeline metadata. Your task is to extract specific field values from a user's plain English input for the L0 layer.
-
-    You MUST follow these rules:
-    1.  **Extract Data**: Parse the user's input to extract values for the specified fields.
-    2.  **Strict Output Format**: You MUST respond with a single JSON object. The JSON object should only contain the keys for the fields you were able to extract from the user's message. Do not include any other text or formatting.
-    3.  **No Extraneous Keys**: If a value for a key is not explicitly mentioned or inferred from the user's input, DO NOT include that key in the JSON response.
-    4.  **Schema and Rules**: Use the following database schema and rules to guide your extraction and validation.
-        -   **data_flow_l0_detail**:
-            -   SOURCE (STRING, required)
-            -   SOURCE_OBJ_SCHEMA (STRING, required)
-            -   SOURCE_OBJ_NAME (STRING, required)
-            -   LOB (STRING, required)
-            -   INPUT_FILE_FORMAT (STRING, required)
-            -   STORAGE_TYPE (STRING, required): Allowed values: C1, C2, C3, C4.
-            -   DQ_LOGIC (STRING, required)
-            -   CDC_LOGIC (STRING, required)
-            -   TRANSFORM_QUERY (STRING, required)
-            -   LOAD_TYPE (STRING, required): Allowed values: FULL, DELTA, SCD, PySpark.
-            -   PRESTAG_FLAG (STRING, required): Allowed values: Y, N.
-            -   CUSTOM_SCHEMA (STRING)
-            -   DELIMETER (STRING)
-            -   PARTITION (STRING)
-            -   IS_ACTIVE (STRING, required): Allowed values: Y, N. Default: Y.
-    """,
-    "l1_l2": """
-    You are an expert data analyst and an intelligent conversational assistant for managing data pipeline metadata. Your task is to extract specific field values from a user's plain English input for the L1 or L2 layer.
-
-    You MUST follow these rules:
-    1.  **Extract Data**: Parse the user's input to extract values for the specified fields.
-    2.  **Strict Output Format**: You MUST respond with a single JSON object. The JSON object should only contain the keys for the fields you were able to extract from the user's message. Do not include any other text or formatting.
-    3.  **No Extraneous Keys**: If a value for a key is not explicitly mentioned or inferred from the user's input, DO NOT include that key in the JSON response.
-    4.  **Schema and Rules**: Use the following database schema and rules to guide your extraction and validation.
-        -   **data_flow_pb_detail**:
-            -   LOB (STRING, required)
-            -   TARGET_OBJ_SCHEMA (STRING, required)
-            -   TARGET_OBJ_NAME (STRING, required)
-            -   PRIORITY (INT, required)
-            -   TARGET_OBJ_TYPE (STRING, required): Allowed values: Table, MV. Dependency: If Table, TRIGGER_TYPE must be JOB. If MV, TRIGGER_TYPE must be DLT.
-            -   TRANSFORM_QUERY (STRING, required)
-            -   LOAD_TYPE (STRING, required): Allowed values: FULL, DELTA, SCD. Dependency: If SCD, CUSTOM_SCRIPT_PARAMS becomes mandatory.
-            -   PARTITION_METHOD (STRING, optional): Allowed values: Partition, Liquid cluster.
-            -   CUSTOM_SCRIPT_PARAMS (STRING, optional)
-            -   GENERIC_SCRIPTS (STRING)
-            -   SOURCE_PK (STRING)
-            -   TARGET_PK (STRING)
-            -   PARTITION_OR_INDEX (STRING)
-            -   RETENTION_DETAILS (STRING)
-            -   IS_ACTIVE (STRING, required): Allowed values: Y, N. Default: Y.
-    """,
-    "show_table": """
-    You are an expert data analyst and an intelligent conversational assistant for managing data pipeline metadata. Your task is to identify a user's request to 'show' a pipeline's details.
-
-    You MUST follow these rules:
-    1.  **Identify Action**: Look for keywords like 'show table', 'display all pipelines', 'list pipelines'.
-    2.  **Strict Output Format**: You MUST respond with a single JSON object. The JSON object should have a key `action` with the value `show_all_pipelines`.
-    3.  **No Other Keys**: Do not include any other keys in the JSON response.
-    4.  **No Other Text**: Do not include any other text or conversational phrases.
-    """,
-    "show_details": """
-    You are an expert data analyst and an intelligent conversational assistant for managing data pipeline metadata. Your task is to identify a user's request to 'show' a pipeline's specific details.
-
-    You MUST follow these rules:
-    1.  **Identify Action**: Look for keywords like 'show details', 'view', 'look up', 'get details'.
-    2.  **Extract Data**: Extract the **DATA_FLOW_GROUP_ID** from the user's input.
-    3.  **Strict Output Format**: You MUST respond with a single JSON object. The JSON object should have a key `action` with the value `show_details` and a key `DATA_FLOW_GROUP_ID` with the extracted value.
-    4.  **No Other Keys**: Do not include any other keys in the JSON response.
-    5.  **No Other Text**: Do not include any other text or conversational phrases.
-    """
-}
 
 DEFAULT_VALUES = {
     "header": {
@@ -185,48 +96,6 @@ DEFAULT_VALUES = {
         "RETENTION_DETAILS": "365 days"
     }
 }
-compute_class_options = db.get_compute_classes(dev_allowed=False)
-dev_compute_class_options = db.get_compute_classes(dev_allowed=True)
-
-# The VALID_OPTIONS dictionary is updated to use the fetched lists
-VALID_OPTIONS = {
-    "IS_ACTIVE": ["Y", "N"],
-    "TRIGGER_TYPE": ["DLT", "JOB"],
-    "ETL_LAYER": ["L0", "L1", "L2"],
-    "COMPUTE_CLASS": compute_class_options,
-    "COMPUTE_CLASS_DEV": dev_compute_class_options,
-    "INGESTION_MODE": ["EXTL_FULL", "EXTL_INC", "DATASPHERE_INGEST", "API_INGEST", "DB_INGEST"],
-    "STORAGE_TYPE": ["C1", "C2", "C3", "C4"],
-    "INPUT_FILE_FORMAT": ["parquet", "csv", "tsv", "json", "xml"],
-    "LOAD_TYPE": ["FULL", "DELTA", "SCD", "PySpark"],
-    "PRESTAG_FLAG": ["Y", "N"],
-    "TARGET_OBJ_TYPE": ["MV", "Table", "View"],
-    #"PRIORITY": ["Low", "Medium", "High", "Critical"],
-    "PARTITION_METHOD": ["Partition", "Liquid cluster"],
-}
-
-
-REQUIRED_FIELDS_HEADER = [
-    "DATA_FLOW_GROUP_ID", "BUSINESS_UNIT", "BUSINESS_OBJECT_NAME", "TRIGGER_TYPE",
-    "ETL_LAYER", "COMPUTE_CLASS", "COMPUTE_CLASS_DEV", "DATA_SME", "PRODUCT_OWNER",
-     "WARNING_THRESHOLD_MINS", "WARNING_DL_GROUP", "IS_ACTIVE"
-]
-
-REQUIRED_FIELDS_L0 = [
-    "SOURCE", "SOURCE_OBJ_SCHEMA", "SOURCE_OBJ_NAME", "LOB", "INPUT_FILE_FORMAT",
-    "STORAGE_TYPE", "DQ_LOGIC", "CDC_LOGIC", "TRANSFORM_QUERY", "LOAD_TYPE",
-    "PRESTAG_FLAG", "IS_ACTIVE"
-]
-
-REQUIRED_FIELDS_PB = [
-    "LOB", "TARGET_OBJ_SCHEMA", "TARGET_OBJ_NAME", "PRIORITY", "TARGET_OBJ_TYPE",
-    "TRANSFORM_QUERY", "LOAD_TYPE", "IS_ACTIVE"
-]
-
-# All possible fields for each table, including optional ones
-ALL_FIELDS_HEADER = REQUIRED_FIELDS_HEADER + ["INGESTION_MODE", "INGESTION_BUCKET", "SPARK_CONFIGS", "COST_CENTER", "min_version", "max_version"]
-ALL_FIELDS_L0 = REQUIRED_FIELDS_L0 + ["CUSTOM_SCHEMA", "DELIMETER", "PARTITION"]
-ALL_FIELDS_PB = REQUIRED_FIELDS_PB + ["PARTITION_METHOD", "CUSTOM_SCRIPT_PARAMS", "GENERIC_SCRIPTS", "SOURCE_PK", "TARGET_PK", "PARTITION_OR_INDEX", "RETENTION_DETAILS"]
 
 # Map for L0 table numbers in modify mode
 L0_TABLE_MAP = {
@@ -237,65 +106,9 @@ L0_TABLE_MAP = {
     'table5': 4, 't5': 4, 'table 5': 4, 't 5': 4,' table_5': 4, 't_5': 4
 }
 
-# Mapping for user-friendly names
-FIELD_MAPPING = {
-    "DATA_FLOW_GROUP_ID": "data flow name",
-    "BUSINESS_UNIT": "business unit",
-    "BUSINESS_OBJECT_NAME": "business object name",
-    "TRIGGER_TYPE": "trigger type",
-    "ETL_LAYER": "ETL layer",
-    "COMPUTE_CLASS": "compute class",
-    "COMPUTE_CLASS_DEV": "dev compute class",
-    "DATA_SME": "data SME",
-    "PRODUCT_OWNER": "product owner",
-    "INGESTION_BUCKET": "ingestion bucket",
-    "WARNING_THRESHOLD_MINS": "warning threshold (mins)",
-    "WARNING_DL_GROUP": "warning DL group",
-    "IS_ACTIVE": "is active",
-    "INGESTION_MODE": "ingestion mode",
-    "SOURCE": "source",
-    "SOURCE_OBJ_SCHEMA": "source schema",
-    "SOURCE_OBJ_NAME": "source object name",
-    "LOB": "LOB",
-    "INPUT_FILE_FORMAT": "input file format",
-    "STORAGE_TYPE": "storage type",
-    "DQ_LOGIC": "DQ logic",
-    "CDC_LOGIC": "CDC logic",
-    "TRANSFORM_QUERY": "transform query",
-    "LOAD_TYPE": "load type",
-    "PRESTAG_FLAG": "pre-stage flag",
-    "TARGET_OBJ_SCHEMA": "target schema",
-    "TARGET_OBJ_NAME": "target object name",
-    "PRIORITY": "priority",
-    "TARGET_OBJ_TYPE": "target object type",
-    "PARTITION_METHOD": "partition method",
-    "CUSTOM_SCRIPT_PARAMS": "custom script parameters",
-    "SOURCE_PK": "source primary key",
-    "TARGET_PK": "target primary key",
-    "CUSTOM_SCHEMA": "custom schema",
-    "RETENTION_DETAILS": "retention details"
-}
-
-def get_required_fields(table_type, etl_layer=None):
-    if table_type == "header":
-        required = REQUIRED_FIELDS_HEADER.copy()
-        if etl_layer and etl_layer.upper() == "L0":
-            required.append("INGESTION_MODE")
-        return required
-    elif table_type == "l0":
-        return REQUIRED_FIELDS_L0
-    elif table_type == "pb":
-        return REQUIRED_FIELDS_PB
-    return []
-
-def get_all_fields(table_type):
-    if table_type == "header":
-        return ALL_FIELDS_HEADER
-    elif table_type == "l0":
-        return ALL_FIELDS_L0
-    elif table_type == "pb":
-        return ALL_FIELDS_PB
-    return []
+# Model calls for the tables of one message run concurrently on this many threads (shared by all sessions)
+L0_EXTRACTION_WORKERS = int(os.getenv("PIPELINES_L0_EXTRACTION_WORKERS", "5"))
+_extraction_pool = ThreadPoolExecutor(max_workers=L0_EXTRACTION_WORKERS, thread_name_prefix="l0-extraction")
 
 # Function to add asterisk to important fields
 def get_json_with_asterisks(data, table_type):
@@ -314,104 +127,55 @@ def get_json_with_asterisks(data, table_type):
             formatted_data[key] = value
     return formatted_data
 
-def is_valid_email(email):
-    return re.match(r"[^@]+@[^@]+\.[^@]+", email)
-
-
-def validate_data(data, table_type, trigger_type=None):
-    missing_fields = []
-    invalid_values = []
-    
-    if table_type == "header":
-        required_fields = get_required_fields(table_type, data.get('ETL_LAYER'))
-        for field in required_fields:
-            if field not in data or data[field] is None or data[field] == "":
-                missing_fields.append(FIELD_MAPPING.get(field, field))
-        
-        # if "PRODUCT_OWNER" in data and data["PRODUCT_OWNER"] is not None and not is_valid_email(data["PRODUCT_OWNER"]):
-        #     invalid_values.append(f"PRODUCT_OWNER must be a valid email address.")
-        
-        etl_layer = (data.get('ETL_LAYER') or '').upper()
-        trigger_type = (data.get('TRIGGER_TYPE') or '').upper()
-        
-        if etl_layer == "L0" and trigger_type != "DLT" and "TRIGGER_TYPE" in data:
-             invalid_values.append(f"Friendly message: For an L0 pipeline, the trigger type must always be DLT. Please update the TRIGGER_TYPE field.")
-
-        for key in VALID_OPTIONS:
-            if key in data and data[key] is not None and data[key].upper() not in [o.upper() for o in VALID_OPTIONS[key]]:
-                invalid_values.append(f"Oops! The value for **{FIELD_MAPPING.get(key, key)}** is not allowed. Only allowed options are: `{', '.join(VALID_OPTIONS[key])}`.")
-
-            
-    elif table_type == "l0":
-        required_fields = get_required_fields(table_type)
-        for field in required_fields:
-            if field not in data or data[field] is None or data[field] == "":
-                missing_fields.append(FIELD_MAPPING.get(field, field))
-        
-        for key in VALID_OPTIONS:
-            if key in data and data[key] is not None and data[key].upper() not in [o.upper() for o in VALID_OPTIONS[key]]:
-                invalid_values.append(f"Oops! The value for **{FIELD_MAPPING.get(key, key)}** is not allowed. Only allowed options are: `{', '.join(VALID_OPTIONS[key])}`.")
-
-
-    elif table_type == "pb":
-        required_fields = get_required_fields(table_type)
-        for field in required_fields:
-            if field not in data or data[field] is None or data[field] == "":
-                missing_fields.append(FIELD_MAPPING.get(field, field))
-        
-        if "LOAD_TYPE" in data and data["LOAD_TYPE"].upper() == "SCD" and ("CUSTOM_SCRIPT_PARAMS" not in data or data["CUSTOM_SCRIPT_PARAMS"] is None or data["CUSTOM_SCRIPT_PARAMS"] == ""):
-            missing_fields.append(FIELD_MAPPING.get("CUSTOM_SCRIPT_PARAMS", "CUSTOM_SCRIPT_PARAMS"))
-        
-        target_obj_type = (data.get("TARGET_OBJ_TYPE") or '').upper()
-        if target_obj_type == "TABLE" and trigger_type and (trigger_type.upper() or '') != "JOB":
-            invalid_values.append(f"For TARGET_OBJ_TYPE 'Table', the TRIGGER_TYPE must be 'JOB'.")
-        if target_obj_type == "MV" and trigger_type and (trigger_type.upper() or '') != "DLT":
-            invalid_values.append(f"For TARGET_OBJ_TYPE 'MV', the TRIGGER_TYPE must be 'DLT'.")
-            
-        for key in VALID_OPTIONS:
-            if key in data and data[key] is not None and data[key].upper() not in [o.upper() for o in VALID_OPTIONS[key]]:
-                invalid_values.append(f"Oops! The value for **{FIELD_MAPPING.get(key, key)}** is not allowed. Only allowed options are: `{', '.join(VALID_OPTIONS[key])}`.")
-                
-    return missing_fields, invalid_values
-
 def get_pipeline_details(data_flow_group_id):
-    conn = sqlite3.connect('pipelines.db')
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM data_flow_control_header WHERE DATA_FLOW_GROUP_ID = ?", (data_flow_group_id,))
-    header_data = cursor.fetchone()
-    
-    if not header_data:
-        conn.close()
+    """Returns (header, detail) for a pipeline: a list of L0 rows for L0, the PB row otherwise."""
+    pipeline = db.get_pipeline_by_id(data_flow_group_id)
+    if not pipeline:
         return None, None
-        
-    header_columns = [col[0] for col in cursor.description]
-    header_dict = dict(zip(header_columns, header_data))
-    
-    detail_data = None
-    if header_dict['ETL_LAYER'].upper() == 'L0':
-        cursor.execute("SELECT * FROM data_flow_l0_detail WHERE DATA_FLOW_GROUP_ID = ?", (data_flow_group_id,))
-        detail_rows = cursor.fetchall()
-        if detail_rows:
-            detail_columns = [col[0] for col in cursor.description]
-            detail_data = [dict(zip(detail_columns, row)) for row in detail_rows]
+
+    l0_details = pipeline.pop('l0_details')
+    pb_details = pipeline.pop('pb_details')
+    if pipeline['ETL_LAYER'].upper() == 'L0':
+        detail_data = l0_details or None
     else:
-        cursor.execute("SELECT * FROM data_flow_pb_detail WHERE DATA_FLOW_GROUP_ID = ?", (data_flow_group_id,))
-        detail_row = cursor.fetchone()
-        if detail_row:
-            detail_columns = [col[0] for col in cursor.description]
-            detail_data = dict(zip(detail_columns, detail_row))
-            
-    conn.close()
-    return header_dict, detail_data
+        detail_data = pb_details[0] if pb_details else None
+    return pipeline, detail_data
+
+def show_pipeline(header_data, detail_data):
+    """Puts a pipeline in the side panel, read-only."""
+    st.session_state.pipeline_data['header'] = header_data
+    st.session_state.pipeline_data['detail'] = detail_data
+    st.session_state.conversation_stage = "view_only"
+    st.session_state.messages.append({"role": "assistant", "content": "View data in side panel"})
+
+def extract_fields(text, table_type, prompt_key, use_cache, **call_options):
+    """
+    The fields of one table in a message: read locally when the input is structured, otherwise by
+    the model in JSON mode (call_options go to llm_client.generate(), e.g. stream and on_text).
+    """
+    extracted_data = local_parser.parse(text, table_type)
+    local_parser.record_turn(extracted_data is not None)
+    if extracted_data is None:
+        response_text = llm_cache.generate(
+            get_stage_model(prompt_key), SYSTEM_PROMPTS[prompt_key], text, use_cache,
+            name=prompt_key, generation_config=structured_output.generation_config(table_type), **call_options,
+        )
+        extracted_data = structured_output.parse_response(response_text, prompt_key)
+    return extracted_data
+
+def extract_l0_tables(segments, use_cache):
+    """
+    Extracts the L0 tables of one message concurrently: segments is [(table index, text)] from
+    local_parser.split_l0_tables(). Returns {table index: fields}; the first failure is raised.
+    Runs off the script thread, so nothing here may touch st.* (no streaming).
+    """
+    futures = {index: _extraction_pool.submit(extract_fields, text, "l0", "l0", use_cache) for index, text in segments}
+    return {index: future.result() for index, future in futures.items()}
 
+@catalog_cache.cached
 def get_all_pipelines_summary():
-    conn = sqlite3.connect('pipelines.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT DATA_FLOW_GROUP_ID, BUSINESS_UNIT, ETL_LAYER, PRODUCT_OWNER FROM data_flow_control_header")
-    pipelines = cursor.fetchall()
-    conn.close()
-    return pipelines
+    cursor = get_connection().execute("SELECT DATA_FLOW_GROUP_ID, BUSINESS_UNIT, ETL_LAYER, PRODUCT_OWNER FROM data_flow_control_header")
+    return cursor.fetchall()
 
 
 
@@ -479,6 +243,16 @@ def check_and_transition_stage():
             # This should ideally not happen, but if it does, exit validation gracefully
             return 
             
+        # Tables filled in by the same message (several pasted at once) are passed over once complete
+        # (show() fills every table with None placeholders, so 'holds data' means a value is set)
+        while current_l0_index + 1 < len(detail_data) and any(value not in (None, "") for value in detail_data[current_l0_index + 1].values()):
+            missing_fields, invalid_values = validate_data(detail_data[current_l0_index], "l0", header_data.get('TRIGGER_TYPE'))
+            if missing_fields or invalid_values:
+                break
+            st.session_state.messages.append({"role": "assistant", "content": f"Details for table {current_l0_index + 1} are complete."})
+            current_l0_index += 1
+        st.session_state.current_l0_table_index = current_l0_index
+
         table_type = "l0"
         required_fields = get_required_fields(table_type)
         default_map = DEFAULT_VALUES.get(table_type, {})
@@ -587,6 +361,8 @@ def show():
         st.session_state.current_l0_table_index = 0
     if "last_prompt_is_get" not in st.session_state:
         st.session_state.last_prompt_is_get = False
+    if "llm_cache_enabled" not in st.session_state:
+        st.session_state.llm_cache_enabled = True
     
     # Initialize all required fields in session state
     for field in ALL_FIELDS_HEADER:
@@ -699,6 +475,22 @@ def show():
             else:
                 st.warning("Please complete all required fields before submitting.")
 
+        # Identical requests are answered from the response cache unless switched off for this session
+        st.divider()
+        st.toggle("Reuse cached AI responses", key="llm_cache_enabled")
+        stats = llm_cache.get_stats()
+        st.caption(f"Response cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} stored")
+        parser_stats = local_parser.get_stats()
+        st.caption(f"Served locally: {parser_stats['local']} of {parser_stats['local'] + parser_stats['model']} turns ({parser_stats['local_fraction']:.0%})")
+        router_stats = intent_router.get_stats()
+        st.caption(f"Lookups resolved locally: {router_stats['exact'] + router_stats['prefix'] + router_stats['fuzzy']} ({router_stats['local_fraction']:.0%})")
+        for call_name, parse_stats in structured_output.get_stats().items():
+            st.caption(f"`{call_name}` responses: {parse_stats['failures']} of {parse_stats['responses']} unparseable ({parse_stats['strict_failures']} with strict parsing)")
+        for call_name, call_stats in llm_client.get_stats().items():
+            if call_stats['p50_ms'] is not None:
+                st.caption(f"`{call_name}` calls: p50 {call_stats['p50_ms'] / 1000:.1f}s, p90 {call_stats['p90_ms'] / 1000:.1f}s, {call_stats['retries']} retries, "
+                           f"{call_stats['input_tokens']} in / {call_stats['output_tokens']} out tokens, {call_stats['over_budget']} over budget")
+
     # Main content area for the conversation
     st.markdown("## Data Pipeline Assistant")
     st.markdown("---") 
@@ -721,7 +513,8 @@ def show():
         prompt_to_parse = prompt
         
         # Check for commands at any stage
-        if "show table" in prompt.lower() or "display all pipelines" in prompt.lower() or "list pipelines" in prompt.lower():
+        routed = intent_router.route(prompt)
+        if routed['intent'] == 'list':
             st.session_state.last_prompt_is_get = True
             pipelines = get_all_pipelines_summary()
             if pipelines:
@@ -735,29 +528,55 @@ def show():
             st.session_state.conversation_stage = "initial"
             st.rerun()
         
-        elif any(keyword in prompt.lower() for keyword in ["show details", "view", "look up", "get details"]):
+        elif routed['intent'] == 'show_details' and routed['pipeline_id']:
+            # The ID was resolved from the in-memory index: no model call needed
+            st.session_state.last_prompt_is_get = True
+            header_data, detail_data = get_pipeline_details(routed['pipeline_id'])
+            if header_data:
+                if routed['match'] != 'exact':
+                    st.session_state.messages.append({"role": "assistant", "content": f"Showing `{routed['pipeline_id']}`, the pipeline matching `{routed['query']}`."})
+                show_pipeline(header_data, detail_data)
+            else:
+                st.session_state.messages.append({"role": "assistant", "content": f"I could not find a pipeline with the ID `{routed['pipeline_id']}`. Please check the ID and try again."})
+            st.session_state.conversation_stage = "initial"
+            st.rerun()
+        
+        elif routed['intent'] == 'show_details':
             st.session_state.last_prompt_is_get = True
-            full_prompt = f"{SYSTEM_PROMPTS['show_details']}\nUser input: {prompt_to_parse}"
-            response = model.generate_content(full_prompt)
-            
             try:
-                response_text = response.text.replace("```json", "").replace("```", "").strip()
-                extracted_data = json.loads(response_text)
+                response_text = llm_cache.generate(
+                    get_stage_model('show_details'), SYSTEM_PROMPTS['show_details'], prompt_to_parse, st.session_state.llm_cache_enabled,
+                    name='show_details', generation_config=structured_output.generation_config('show_details'),
+                )
+                extracted_data = structured_output.parse_response(response_text, 'show_details')
                 
                 if extracted_data.get("action") == "show_details" and "DATA_FLOW_GROUP_ID" in extracted_data:
                     data_flow_group_id = extracted_data["DATA_FLOW_GROUP_ID"]
                     header_data, detail_data = get_pipeline_details(data_flow_group_id)
+                    suggestions = []
+                    if not header_data and data_flow_group_id:
+                        # Tolerate typos in the ID: take a close enough match, otherwise offer suggestions
+                        suggestions = fuzzy_index.find_pipelines(str(data_flow_group_id), limit=3)
+                        if suggestions and suggestions[0]['similarity'] >= fuzzy_index.AUTO_MATCH_SIMILARITY:
+                            matched_id = suggestions[0]['DATA_FLOW_GROUP_ID']
+                            header_data, detail_data = get_pipeline_details(matched_id)
+                            st.session_state.messages.append({"role": "assistant", "content": f"No pipeline is called `{data_flow_group_id}`; showing the closest match, `{matched_id}`."})
                     
                     if header_data:
-                        st.session_state.pipeline_data['header'] = header_data
-                        st.session_state.pipeline_data['detail'] = detail_data
-                        st.session_state.conversation_stage = "view_only"
-                        st.session_state.messages.append({"role": "assistant", "content": "View data in side panel"})
+                        show_pipeline(header_data, detail_data)
+                    elif suggestions:
+                        options = ", ".join(f"`{s['DATA_FLOW_GROUP_ID']}`" for s in suggestions)
+                        st.session_state.messages.append({"role": "assistant", "content": f"I could not find a pipeline with the ID `{data_flow_group_id}`. Did you mean: {options}?"})
                     else:
                         st.session_state.messages.append({"role": "assistant", "content": f"I could not find a pipeline with the ID `{data_flow_group_id}`. Please check the ID and try again."})
+                elif routed['candidates']:
+                    options = ", ".join(f"`{candidate}`" for candidate in routed['candidates'])
+                    st.session_state.messages.append({"role": "assistant", "content": f"Several pipelines could match. Did you mean: {options}?"})
                 else:
                     st.session_state.messages.append({"role": "assistant", "content": "I'm sorry, I couldn't understand that request. Please try to phrase it clearly, for example: 'show me the details for pipeline [ID]'."})
                     
+            except llm_client.LLMCallError as e:
+                st.session_state.messages.append({"role": "assistant", "content": f"The AI service is not responding right now ({e}). Please try again."})
             except (json.JSONDecodeError, ValueError) as e:
                 st.session_state.messages.append({"role": "assistant", "content": f"An unexpected error occurred: {e}. Please try again."})
             st.session_state.conversation_stage = "initial"
@@ -826,15 +645,28 @@ def show():
                     if prompt.lower().strip().startswith("create"):
                         prompt_to_parse = prompt[len("create"):].strip()
 
-                    full_prompt = f"{SYSTEM_PROMPTS[prompt_key]}\nUser input: {prompt_to_parse}"
-                    response = model.generate_content(full_prompt)
-
                     try:
-                        response_text = response.text.replace("```json", "").replace("```", "").strip()
-                        if not response_text.strip() or not response_text.startswith('{') or not response_text.endswith('}'):
-                            raise ValueError("Invalid response format from the model. Expected a JSON object.")
-                        
-                        extracted_data = json.loads(response_text)
+                        # Specs for several L0 tables in one message: one concurrent extraction per table, merged below
+                        l0_segments = local_parser.split_l0_tables(prompt_to_parse) if table_type == "l0" else []
+                        if l0_segments:
+                            with st.spinner(f"Reading the details of {len(l0_segments)} tables..."):
+                                extracted_by_table = extract_l0_tables(l0_segments, st.session_state.llm_cache_enabled)
+                            detail_tables = st.session_state.pipeline_data['detail']
+                            ignored = [index + 1 for index in extracted_by_table if index >= len(detail_tables)]
+                            for index, table_data in extracted_by_table.items():
+                                if index < len(detail_tables):
+                                    detail_tables[index].update(table_data)
+                            if ignored:
+                                st.session_state.messages.append({"role": "assistant", "content": f"This pipeline has {len(detail_tables)} L0 tables, so the details for table {', '.join(map(str, ignored))} were ignored."})
+                            check_and_transition_stage()
+
+                        # Structured input (key=value, key: value, JSON, YAML) is read locally; free-form text goes to the model,
+                        # streamed so the extraction shows up while the model is still writing it
+                        partial_output = st.empty()
+                        extracted_data = extract_fields(
+                            prompt_to_parse, table_type, prompt_key, st.session_state.llm_cache_enabled,
+                            stream=True, on_text=lambda text: partial_output.code(text, language="json"),
+                        )
                         
                         # Apply case-insensitive updates
                         updated_data = {k: v for k, v in extracted_data.items()}
@@ -867,6 +699,11 @@ def show():
                         st.markdown(error_message)
                         st.session_state.messages.append({"role": "assistant", "content": error_message})
                         st.rerun()
+                    except llm_client.LLMCallError as e:
+                        error_message = f"The AI service is not responding right now ({e}). Your input was not lost; please send it again."
+                        st.markdown(error_message)
+                        st.session_state.messages.append({"role": "assistant", "content": error_message})
+                        st.rerun()
                     except Exception as e:
                         st.error(f"An unexpected error occurred: {e}")
                         st.session_state.messages.append({"role": "assistant", "content": "An unexpected error occurred. Please try again."})
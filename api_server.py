@@ -0,0 +1,470 @@
+"""
+Headless HTTP API for the pipeline catalog, for CI and deployment jobs.
+
+A small JSON service over the database.py functions, with no Streamlit involved:
+    GET    /version                 {'version': 42} - the catalog version
+    GET    /summary                 pipeline counts per layer, status, unit, ... (database.get_catalog_summary())
+    GET    /pipelines               one page of header rows; query parameters:
+                                      page_size (default 50, max 500), cursor (from the previous page),
+                                      order_by, descending (true/false), columns (comma-separated),
+                                      q (full-text search, paged with offset instead of cursor),
+                                      and filters by column: ETL_LAYER, BUSINESS_UNIT, IS_ACTIVE,
+                                      COMPUTE_CLASS, COST_CENTER (repeat for several values), UPDATED_SINCE
+    GET    /pipelines/<id>          one pipeline: header fields plus 'l0_details' and 'pb_details'
+    POST   /pipelines               creates a pipeline (409 if the ID exists)
+    PUT    /pipelines/<id>          creates or updates a pipeline
+    DELETE /pipelines/<id>          deletes a pipeline
+    GET    /export                  the catalog as ndjson, json or csv (format=...), same filters as /pipelines
+
+POST and PUT take the same record shape GET /pipelines/<id> returns, so a pipeline can be read,
+edited and written back. Records are validated like bulk imports (validation.validate_data).
+
+Requests are served by a fixed pool of worker threads. Each keeps its own database connection
+(db_connection.get_connection) for its lifetime, so connections are opened once, not per request,
+and HTTP/1.1 keep-alive lets clients reuse theirs. Reads go through catalog_cache.
+Every read response carries an ETag of the catalog version: a client sending it back in
+If-None-Match gets 304 Not Modified until something changes. Responses are gzip-compressed for
+clients that accept it; exports are streamed with chunked encoding, so they need no buffering.
+
+Set PIPELINES_API_TOKEN to require 'Authorization: Bearer <token>' on every request.
+
+Usage: python api_server.py [--host 127.0.0.1] [--port 8502] [--workers 16] [--verbose]
+"""
+import argparse
+import gzip
+import hmac
+import json
+import os
+import re
+import sqlite3
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import bulk_import
+import catalog_cache
+import database
+import export
+
+API_TOKEN = os.getenv("PIPELINES_API_TOKEN")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Request bodies larger than this are refused, compressed or once decompressed (a pipeline record is a few KB)
+MAX_BODY_BYTES = 10 * 1024 * 1024
+# Smaller responses are sent uncompressed: gzip would not pay for its header and CPU
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+EXPORT_CHUNK_BYTES = 64 * 1024
+# An idle keep-alive connection holds a worker, so it is closed after this many seconds
+KEEP_ALIVE_TIMEOUT = 15
+
+FILTER_PARAMETERS = database.HEADER_FILTER_COLUMNS + ['UPDATED_SINCE']
+PIPELINE_PATH = re.compile(r"^/pipelines/(?P<id>[^/]+)$")
+EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+    "csv": "text/csv",
+}
+
+
+class ApiError(Exception):
+    """An error reported to the client as {'error': message} with the given HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _to_json(value):
+    return json.dumps(value, default=str, separators=(',', ':')).encode('utf-8')
+
+
+def _single(query, name, default=None):
+    values = query.get(name)
+    return values[-1] if values else default
+
+
+def _int_parameter(query, name, default, maximum=None):
+    value = _single(query, name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be an integer.")
+    if value < 0 or (maximum is not None and value > maximum):
+        raise ApiError(400, f"'{name}' must be between 0 and {maximum}.")
+    return value
+
+
+def _filters(query):
+    """Builds database filters from the query string; a repeated parameter filters on any of its values."""
+    filters = {}
+    for column in FILTER_PARAMETERS:
+        values = query.get(column)
+        if values:
+            filters[column] = values[0] if len(values) == 1 or column == 'UPDATED_SINCE' else values
+    return filters
+
+
+def _cursor(query, order_by):
+    """
+    Decodes the keyset cursor, which is passed around as the JSON list returned in 'next_cursor':
+    one text, number or null per column of the sort key of order_by.
+    """
+    value = _single(query, 'cursor')
+    if not value:
+        return None
+    try:
+        cursor = json.loads(value)
+    except ValueError:
+        cursor = None
+    sort_key = database.SORT_KEYS.get(order_by)
+    if (not isinstance(cursor, list)
+            or (sort_key is not None and len(cursor) != len(sort_key))
+            or not all(item is None or isinstance(item, (str, int, float)) for item in cursor)):
+        raise ApiError(400, "'cursor' must be the 'next_cursor' value of the previous page.")
+    return tuple(cursor)
+
+
+def list_pipelines(query):
+    """GET /pipelines"""
+    page_size = _int_parameter(query, 'page_size', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    columns = [col for col in (_single(query, 'columns') or '').split(',') if col] or None
+    filters = _filters(query)
+    text = (_single(query, 'q') or '').strip()
+
+    if text:
+        offset = _int_parameter(query, 'offset', 0)
+        # One row more than asked for tells whether there is a next page
+        rows = catalog_cache.search_pipelines(text, filters, page_size + 1, columns, offset)
+        next_offset = offset + page_size if len(rows) > page_size else None
+        return {'pipelines': rows[:page_size], 'next_offset': next_offset}
+
+    order_by = _single(query, 'order_by', 'UPDATED_TS')
+    rows, next_cursor = catalog_cache.list_pipelines(
+        page_size, _cursor(query, order_by), filters, columns,
+        order_by=order_by,
+        descending=_single(query, 'descending', 'true').lower() != 'false',
+    )
+    return {'pipelines': rows, 'next_cursor': list(next_cursor) if next_cursor else None}
+
+
+def get_pipeline(pipeline_id):
+    """GET /pipelines/<id>"""
+    pipeline = catalog_cache.get_pipelines_by_ids((pipeline_id,)).get(pipeline_id)
+    if pipeline is None:
+        raise ApiError(404, f"Pipeline '{pipeline_id}' not found.")
+    return pipeline
+
+
+def _validate_pipeline(record):
+    """
+    Splits a pipeline record into (header, l0_rows, pb_row), validating every part like a bulk import.
+    Raises ApiError(400) listing all problems found.
+    """
+    if not isinstance(record, dict):
+        raise ApiError(400, "The request body must be a JSON object.")
+    header = {key: value for key, value in record.items() if key not in export.DETAIL_KEYS}
+    pipeline_id = header.get('DATA_FLOW_GROUP_ID')
+    l0_rows = record.get('l0_details') or []
+    pb_rows = record.get('pb_details') or []
+    if not isinstance(l0_rows, list) or not isinstance(pb_rows, list):
+        raise ApiError(400, "'l0_details' and 'pb_details' must be lists.")
+    if len(pb_rows) > 1:
+        raise ApiError(400, "A pipeline has at most one PB detail row.")
+
+    table_columns = {record_type: set(database.get_table_columns(table)) for record_type, table in bulk_import.RECORD_TABLES.items()}
+    trigger_types = {pipeline_id: header.get('TRIGGER_TYPE')}
+    # Timestamps are set on write; a record read from GET can be sent back as it is
+    parts = [('header', header)] + [('l0', row) for row in l0_rows] + [('pb', row) for row in pb_rows]
+    rows = {'header': [], 'l0': [], 'pb': []}
+    errors = []
+    for record_type, row in parts:
+        if not isinstance(row, dict):
+            errors.append(f"{record_type}: every detail row must be a JSON object.")
+            continue
+        row = {key: value for key, value in row.items() if key not in bulk_import.MANAGED_COLUMNS}
+        if record_type != 'header':
+            if row.setdefault('DATA_FLOW_GROUP_ID', pipeline_id) != pipeline_id:
+                errors.append(f"{record_type}: DATA_FLOW_GROUP_ID must be the pipeline's ID.")
+                continue
+        # validate_data expects text values; explicit nulls are written but not validated
+        values = {key: value for key, value in row.items() if value is not None}
+        _, values, row_errors = bulk_import._validate_record(dict(values, RECORD_TYPE=record_type), table_columns, trigger_types)
+        nulls = {key: None for key, value in row.items() if value is None}
+        unknown = [key for key in nulls if key not in table_columns[record_type]]
+        if unknown:
+            row_errors.append(f"Unknown columns for {record_type}: {', '.join(unknown)}.")
+        errors.extend(f"{record_type}: {error}" for error in row_errors)
+        rows[record_type].append(dict(values, **nulls))
+    if errors:
+        raise ApiError(400, ' '.join(errors))
+    return rows['header'][0], rows['l0'], (rows['pb'] or [None])[0]
+
+
+def save_pipeline(record, pipeline_id=None):
+    """POST /pipelines (pipeline_id None: create only) and PUT /pipelines/<id>"""
+    if pipeline_id is not None and isinstance(record, dict):
+        record.setdefault('DATA_FLOW_GROUP_ID', pipeline_id)
+        if record['DATA_FLOW_GROUP_ID'] != pipeline_id:
+            raise ApiError(400, "DATA_FLOW_GROUP_ID in the body does not match the URL.")
+    header, l0_rows, pb_row = _validate_pipeline(record)
+    try:
+        outcomes = database.upsert_pipeline(header, l0_rows, pb_row, create=pipeline_id is None)
+    except sqlite3.IntegrityError as e:
+        raise ApiError(409, str(e))
+    return {'DATA_FLOW_GROUP_ID': header['DATA_FLOW_GROUP_ID'], 'outcomes': outcomes}
+
+
+def delete_pipeline(pipeline_id):
+    """DELETE /pipelines/<id>"""
+    if not database.get_pipelines_by_ids((pipeline_id,)):
+        raise ApiError(404, f"Pipeline '{pipeline_id}' not found.")
+    if not database.delete_pipeline(pipeline_id):
+        raise ApiError(500, f"Pipeline '{pipeline_id}' could not be deleted.")
+    return {'DATA_FLOW_GROUP_ID': pipeline_id, 'deleted': True}
+
+
+def _gunzip(body):
+    """Decompresses a gzip request body, refusing one that is corrupt or inflates past MAX_BODY_BYTES."""
+    # wbits=31 reads a gzip container; max_length stops a small body from inflating without bound
+    decompressor = zlib.decompressobj(31)
+    try:
+        data = decompressor.decompress(body, MAX_BODY_BYTES + 1)
+    except zlib.error:
+        raise ApiError(400, "The request body is not valid gzip.")
+    if len(data) > MAX_BODY_BYTES:
+        raise ApiError(413, "Request body too large.")
+    if not decompressor.eof:
+        raise ApiError(400, "The request body is not valid gzip.")
+    return data
+
+
+class _ChunkedWriter:
+    """Text stream for export.export_catalog() that sends HTTP chunks, gzip-compressed if requested."""
+
+    def __init__(self, wfile, compress):
+        self.wfile = wfile
+        self.buffer = []
+        self.buffered = 0
+        # wbits=31 writes a gzip container, the same format as gzip.compress()
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+
+    def _send(self, data):
+        if data:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def write(self, text):
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= EXPORT_CHUNK_BYTES:
+            self.flush()
+
+    def flush(self):
+        data = ''.join(self.buffer).encode('utf-8')
+        self.buffer, self.buffered = [], 0
+        self._send(self.compressor.compress(data) if self.compressor else data)
+
+    def close(self):
+        self.flush()
+        if self.compressor:
+            self._send(self.compressor.flush())
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class CatalogRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "PipelineCatalogAPI/1.0"
+    timeout = KEEP_ALIVE_TIMEOUT
+    # Headers and body are separate writes; with Nagle on, the body waits for the client's delayed ACK
+    disable_nagle_algorithm = True
+    verbose = False
+
+    def log_message(self, format, *args):
+        # Logging every request to stderr costs more than serving a cached read
+        if self.verbose:
+            super().log_message(format, *args)
+
+    def _accepts_gzip(self):
+        return 'gzip' in (self.headers.get('Accept-Encoding') or '')
+
+    def _send_json(self, status, value, etag=None):
+        body = _to_json(value)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        if len(body) >= GZIP_MIN_BYTES and self._accepts_gzip():
+            body = gzip.compress(body, GZIP_LEVEL)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            raise ApiError(400, "Invalid Content-Length.")
+        if length > MAX_BODY_BYTES:
+            raise ApiError(413, "Request body too large.")
+        body = self.rfile.read(length) if length else b''
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = _gunzip(body)
+        try:
+            return json.loads(body or b'null')
+        except ValueError:
+            raise ApiError(400, "The request body is not valid JSON.")
+
+    def _check_token(self):
+        if API_TOKEN and not hmac.compare_digest(self.headers.get('Authorization') or '', f"Bearer {API_TOKEN}"):
+            raise ApiError(401, "Missing or invalid API token.")
+
+    def _not_modified(self, etag):
+        """Answers 304 if the client already holds the current version."""
+        match = self.headers.get('If-None-Match')
+        if match and (match.strip() == '*' or etag in [tag.strip() for tag in match.split(',')]):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return True
+        return False
+
+    def _export(self, query, etag):
+        file_format = _single(query, 'format', 'ndjson')
+        if file_format not in EXPORT_CONTENT_TYPES:
+            raise ApiError(400, f"Unsupported export format '{file_format}'. Supported formats: {', '.join(EXPORT_CONTENT_TYPES)}.")
+        compress = self._accepts_gzip()
+        self.send_response(200)
+        self.send_header("Content-Type", EXPORT_CONTENT_TYPES[file_format])
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        out = _ChunkedWriter(self.wfile, compress)
+        try:
+            export.export_catalog(out, file_format, _filters(query))
+            out.close()
+        except (ValueError, sqlite3.Error) as e:
+            # Headers are out: dropping the connection before the last chunk tells the client it failed
+            self.log_error("Export failed: %s", e)
+            self.close_connection = True
+
+    def _handle_get(self, path, query):
+        # Weak: the same version is served gzip-compressed or not
+        etag = f'W/"{database.get_catalog_version()}"'
+        if self._not_modified(etag):
+            return
+        match = PIPELINE_PATH.match(path)
+        if match:
+            self._send_json(200, get_pipeline(unquote(match.group('id'))), etag)
+        elif path == '/pipelines':
+            self._send_json(200, list_pipelines(query), etag)
+        elif path == '/summary':
+            self._send_json(200, catalog_cache.get_catalog_summary(), etag)
+        elif path == '/version':
+            self._send_json(200, {'version': database.get_catalog_version()}, etag)
+        elif path == '/export':
+            self._export(query, etag)
+        else:
+            raise ApiError(404, f"Unknown endpoint: {path}")
+
+    def _handle(self, method):
+        try:
+            self._check_token()
+            url = urlsplit(self.path)
+            path = url.path.rstrip('/') or '/'
+            query = parse_qs(url.query)
+            match = PIPELINE_PATH.match(path)
+            pipeline_id = unquote(match.group('id')) if match else None
+
+            if method == 'GET':
+                self._handle_get(path, query)
+                return
+            if method == 'POST' and path == '/pipelines':
+                status, result = 201, save_pipeline(self._read_body())
+            elif method == 'PUT' and match:
+                result = save_pipeline(self._read_body(), pipeline_id)
+                status = 201 if result['outcomes']['header'] == 'inserted' else 200
+            elif method == 'DELETE' and match:
+                status, result = 200, delete_pipeline(pipeline_id)
+            else:
+                raise ApiError(405, f"{method} is not supported on {path}")
+            self._send_json(status, result, f'W/"{database.get_catalog_version()}"')
+        except ApiError as e:
+            self._send_json(e.status, {'error': str(e)})
+        except ValueError as e:
+            # Raised by the database layer for unsupported columns, sort orders and filters
+            self._send_json(400, {'error': str(e)})
+        except sqlite3.Error as e:
+            self._send_json(500, {'error': f"Database error: {e}"})
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands connections to a fixed pool of threads, each keeping its database connection."""
+
+    def __init__(self, address, handler, workers=16):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def make_server(host="127.0.0.1", port=8502, workers=16, verbose=False):
+    """Creates the API server (database migrated, not yet serving); call serve_forever() on it."""
+    database.init_db()
+    CatalogRequestHandler.verbose = verbose
+    return PooledHTTPServer((host, port), CatalogRequestHandler, workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the pipeline catalog as a JSON HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--workers", type=int, default=16, help="Worker threads (= concurrent connections served)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.workers, args.verbose)
+    print(f"Serving the pipeline catalog on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import streamlit as st
 import search
 import add_edit
 import ai_assistant
+import lineage_view
 from collections import defaultdict
 import uuid
 import database
@@ -75,10 +76,6 @@ def load_pipeline_for_editing(pipeline_id):
         st.error("Pipeline not found.")
         st.session_state.edit_pipeline_id = None
 
-# Initialize session state for pipelines
-if 'pipelines' not in st.session_state:
-    st.session_state['pipelines'] = database.get_all_pipelines()
-
 # Initialize other session state variables
 if 'current_view' not in st.session_state:
     st.session_state['current_view'] = 'search'
@@ -160,7 +157,7 @@ with col3:
         
         st.rerun()
 
-col1, col2, col3 = st.columns([1, 1, 1])
+col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
 
 with col1:
     if st.button("🔍 Search Pipelines", use_container_width=True):
@@ -175,6 +172,9 @@ with col2:
 with col3:
     if st.button("🤖 AI Assistant", use_container_width=True):
         st.session_state.current_view = 'ai_assistant'
+with col4:
+    if st.button("🧬 Lineage", use_container_width=True):
+        st.session_state.current_view = 'lineage'
 
 
 st.markdown("---")
@@ -190,5 +190,7 @@ elif st.session_state.current_view == 'add_edit':
         add_edit.show()
 elif st.session_state.current_view == 'ai_assistant':
     ai_assistant.show()
+elif st.session_state.current_view == 'lineage':
+    lineage_view.show()
 elif st.session_state.current_view == 'description':
     description_page()
@@ -0,0 +1,267 @@
+"""
+Streaming bulk import of pipelines from CSV, JSONL or Excel (.xlsx) files.
+
+Every input row is one record. A RECORD_TYPE column says which table it belongs to:
+    header - a data_flow_control_header row
+    l0     - a data_flow_l0_detail row
+    pb     - a data_flow_pb_detail row
+All records carry the DATA_FLOW_GROUP_ID of their pipeline; the other columns use the
+database column names. Rows are validated with the same rules as the AI assistant
+(validation.validate_data), read and written in fixed-size chunks, so memory use does
+not depend on the file size. Invalid rows are reported one by one and skipped; the
+rest of the file is still imported.
+
+Usage: python bulk_import.py FILE [--dry-run] [--chunk-size N] [--format csv|jsonl|xlsx]
+"""
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import json
+import os
+import sqlite3
+
+import database
+from db_connection import transaction
+from validation import validate_data
+
+DEFAULT_CHUNK_SIZE = 500
+# Without an on_reject callback, only this many rejects are kept in the report (the count covers all)
+MAX_REPORTED_REJECTS = 1000
+
+RECORD_TABLES = {
+    "header": "data_flow_control_header",
+    "l0": "data_flow_l0_detail",
+    "pb": "data_flow_pb_detail",
+}
+
+# Timestamps are managed by database.bulk_upsert and cannot be imported
+MANAGED_COLUMNS = {"INSERTED_TS", "UPDATED_TS"}
+
+
+def _clean(record):
+    """Normalizes a raw record: trims keys, turns empty strings into None."""
+    cleaned = {}
+    for key, value in record.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == "":
+                value = None
+        cleaned[str(key).strip()] = value
+    return cleaned
+
+
+def _open_text(source):
+    """Returns a text stream for a path or a binary/text file object (e.g. a Streamlit upload)."""
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, "r", encoding="utf-8-sig", newline="")
+    if isinstance(source, io.TextIOBase):
+        return source
+    return io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+
+
+def _iter_csv(source):
+    with _open_text(source) as f:
+        for record in csv.DictReader(f):
+            yield record
+
+
+def _iter_jsonl(source):
+    with _open_text(source) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _iter_excel(source):
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError("Excel import requires openpyxl. Install it with 'pip install openpyxl' or use CSV/JSONL.")
+
+    # read_only mode streams rows from the sheet instead of loading the workbook
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        columns = next(rows, None)
+        if columns is None:
+            return
+        for row in rows:
+            if any(value is not None for value in row):
+                yield dict(zip(columns, row))
+    finally:
+        workbook.close()
+
+
+READERS = {
+    "csv": _iter_csv,
+    "jsonl": _iter_jsonl,
+    "ndjson": _iter_jsonl,
+    "xlsx": _iter_excel,
+}
+
+
+def detect_format(source, file_format=None):
+    """Returns the import format, taken from the file extension unless given explicitly."""
+    if file_format is None:
+        name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+        file_format = os.path.splitext(str(name))[1].lstrip(".").lower()
+    if file_format not in READERS:
+        raise ValueError(f"Unsupported import format '{file_format}'. Supported formats: {', '.join(READERS)}.")
+    return file_format
+
+
+def iter_records(source, file_format=None):
+    """Yields cleaned records one at a time."""
+    for record in READERS[detect_format(source, file_format)](source):
+        yield _clean(record)
+
+
+def _validate_record(record, table_columns, trigger_types):
+    """Checks one record. Returns (record_type, row, errors); errors is empty for a valid row."""
+    record = dict(record)
+    record_type = (record.pop("RECORD_TYPE", None) or "").lower()
+    if record_type not in RECORD_TABLES:
+        return record_type, record, [f"RECORD_TYPE must be one of: {', '.join(RECORD_TABLES)}."]
+
+    # A file mixing record types has blank cells for the other tables' columns; drop those
+    record = {key: value for key, value in record.items() if value is not None or key in table_columns[record_type]}
+
+    errors = []
+    if not record.get("DATA_FLOW_GROUP_ID"):
+        errors.append("DATA_FLOW_GROUP_ID is required.")
+
+    unknown = [key for key in record if key not in table_columns[record_type] or key in MANAGED_COLUMNS]
+    if unknown:
+        errors.append(f"Unknown columns for {record_type}: {', '.join(unknown)}.")
+
+    try:
+        if record_type == "header":
+            missing, invalid = validate_data(record, "header")
+        else:
+            trigger_type = trigger_types.get(record.get("DATA_FLOW_GROUP_ID"))
+            missing, invalid = validate_data(record, record_type, trigger_type)
+    except (AttributeError, TypeError) as e:
+        # validate_data expects text values; anything else (e.g. JSON numbers in an enum field) is invalid
+        missing, invalid = [], [f"Invalid value type: {e}"]
+
+    if missing:
+        errors.append(f"Missing required fields: {', '.join(missing)}.")
+    errors.extend(invalid)
+    return record_type, record, errors
+
+
+def _load_trigger_types(records, trigger_types):
+    """Looks up TRIGGER_TYPE for PB records whose header is not in trigger_types (the chunk's headers)."""
+    missing_ids = {
+        r.get("DATA_FLOW_GROUP_ID") for r in records
+        if (r.get("RECORD_TYPE") or "").lower() == "pb" and r.get("DATA_FLOW_GROUP_ID") not in trigger_types
+    }
+    missing_ids.discard(None)
+    pipelines = database.get_pipelines_by_ids(missing_ids)
+    for pipeline_id in missing_ids:
+        pipeline = pipelines.get(pipeline_id)
+        trigger_types[pipeline_id] = pipeline.get("TRIGGER_TYPE") if pipeline else None
+
+
+def _write_chunk(accepted):
+    """Writes accepted (line, record_type, row) tuples. Returns per-row outcomes or raises sqlite3.Error."""
+    rows_by_type = {record_type: [row for _, t, row in accepted if t == record_type] for record_type in RECORD_TABLES}
+    outcomes = database.bulk_upsert(rows_by_type["header"], rows_by_type["l0"], rows_by_type["pb"])
+    positions = {record_type: iter(values) for record_type, values in outcomes.items()}
+    return [next(positions[record_type]) for _, record_type, _ in accepted]
+
+
+def import_file(source, file_format=None, dry_run=False, chunk_size=DEFAULT_CHUNK_SIZE, on_reject=None):
+    """
+    Imports pipelines from a CSV, JSONL or Excel file (a path or an open file object).
+    With dry_run=True nothing is written, but inserts/updates/rejects are still counted: the file is
+    written inside one transaction that is rolled back at the end (other writers wait meanwhile), so
+    later chunks see earlier ones as a real run would.
+    Rejected rows are passed to on_reject(reject) if given, otherwise the first MAX_REPORTED_REJECTS
+    are collected in the report ('rejected' always counts all of them).
+
+    Returns a report:
+    {'inserted': int, 'updated': int, 'rejected': int,
+     'rejects': [{'line': 3, 'RECORD_TYPE': 'l0', 'DATA_FLOW_GROUP_ID': 'x', 'errors': [...]}]}
+    """
+    database.init_db()
+    table_columns = {record_type: set(database.get_table_columns(table)) for record_type, table in RECORD_TABLES.items()}
+    report = {"inserted": 0, "updated": 0, "rejected": 0, "rejects": []}
+
+    def reject(line, record_type, record, errors):
+        entry = {"line": line, "RECORD_TYPE": record_type, "DATA_FLOW_GROUP_ID": record.get("DATA_FLOW_GROUP_ID"), "errors": errors}
+        report["rejected"] += 1
+        if on_reject:
+            on_reject(entry)
+        elif len(report["rejects"]) < MAX_REPORTED_REJECTS:
+            report["rejects"].append(entry)
+
+    file_format = detect_format(source, file_format)
+    # Line 1 of a CSV/Excel file is the column header row
+    first_line = 1 if file_format in ("jsonl", "ndjson") else 2
+    records = enumerate(iter_records(source, file_format), start=first_line)
+
+    with transaction(rollback=True) if dry_run else contextlib.nullcontext():
+        while True:
+            chunk = list(itertools.islice(records, chunk_size))
+            if not chunk:
+                break
+
+            # PB rows are validated against the TRIGGER_TYPE of their header: from this chunk, else
+            # from the database (where earlier chunks already are), so nothing is kept across chunks
+            trigger_types = {}
+            for _, record in chunk:
+                if (record.get("RECORD_TYPE") or "").lower() == "header" and record.get("DATA_FLOW_GROUP_ID"):
+                    trigger_types[record["DATA_FLOW_GROUP_ID"]] = record.get("TRIGGER_TYPE")
+            _load_trigger_types([record for _, record in chunk], trigger_types)
+
+            accepted = []
+            for line, record in chunk:
+                record_type, row, errors = _validate_record(record, table_columns, trigger_types)
+                if errors:
+                    reject(line, record_type, row, errors)
+                else:
+                    accepted.append((line, record_type, row))
+
+            try:
+                outcomes = _write_chunk(accepted)
+            except sqlite3.Error:
+                # The chunk was rolled back; retry row by row so only the offending rows are rejected
+                outcomes = []
+                for item in accepted:
+                    try:
+                        outcomes.extend(_write_chunk([item]))
+                    except sqlite3.Error as e:
+                        outcomes.append(None)
+                        reject(item[0], item[1], item[2], [f"Database error: {e}"])
+
+            for outcome in outcomes:
+                if outcome:
+                    report[outcome] += 1
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import pipelines from CSV, JSONL or Excel.")
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=sorted(READERS), help="File format (default: from the extension)")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and report without writing")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    def print_reject(entry):
+        print(f"line {entry['line']} [{entry['RECORD_TYPE'] or '?'}] {entry['DATA_FLOW_GROUP_ID'] or '?'}: {' '.join(entry['errors'])}")
+
+    report = import_file(args.file, args.format, dry_run=args.dry_run, chunk_size=args.chunk_size, on_reject=print_reject)
+    prefix = "Dry run: would have " if args.dry_run else ""
+    print(f"{prefix}inserted {report['inserted']}, updated {report['updated']}, rejected {report['rejected']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Process-wide cache of catalog reads, shared by every Streamlit session.
+
+Entries are keyed on the catalog version (database.get_catalog_version()), which the
+change-log triggers bump on every insert, update and delete of a pipeline row - whether
+it comes from this process, another session or a bulk import. A reader therefore never
+gets data older than the last write, and unchanged data is never read twice.
+Entries of older versions are dropped as soon as a newer version is cached, and the rest
+are evicted least-recently-used once MAX_CACHED_ROWS is reached.
+
+Cached values are shared between sessions: callers must not modify them.
+"""
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import database
+
+# Memory bound, counted in rows (list/dict items) across all cached values
+MAX_CACHED_ROWS = int(os.getenv("PIPELINES_CATALOG_CACHE_ROWS", "200000"))
+
+_entries = OrderedDict()  # (version, function, args) -> (value, size)
+_cached_rows = 0
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def _freeze(value):
+    """Turns call arguments into a hashable cache key."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _size(value):
+    """Approximate size of a cached value, in rows."""
+    if isinstance(value, tuple):
+        return sum(_size(item) for item in value) or 1
+    if isinstance(value, (list, dict)):
+        return len(value) or 1
+    return 1
+
+
+def _evict(version):
+    """Drops entries of older catalog versions, then least recently used ones over the row budget."""
+    global _cached_rows
+    for key in [key for key in _entries if key[0] != version]:
+        _cached_rows -= _entries.pop(key)[1]
+        _stats['evictions'] += 1
+    while _cached_rows > MAX_CACHED_ROWS and len(_entries) > 1:
+        _, (_, size) = _entries.popitem(last=False)
+        _cached_rows -= size
+        _stats['evictions'] += 1
+
+
+def cached(function):
+    """Decorator: caches a catalog read per catalog version and arguments."""
+    name = f"{function.__module__}.{function.__qualname__}"
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        global _cached_rows
+        version = database.get_catalog_version()
+        key = (version, name, _freeze(args), _freeze(kwargs))
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None:
+                _entries.move_to_end(key)
+                _stats['hits'] += 1
+                return entry[0]
+            _stats['misses'] += 1
+
+        value = function(*args, **kwargs)
+        size = _size(value)
+        with _lock:
+            # Only cache if no write happened while reading, so the value matches its version
+            if key not in _entries and database.get_catalog_version() == version:
+                _entries[key] = (value, size)
+                _cached_rows += size
+                _evict(version)
+        return value
+
+    return wrapper
+
+
+def clear():
+    """Empties the cache."""
+    global _cached_rows
+    with _lock:
+        _entries.clear()
+        _cached_rows = 0
+
+
+def get_stats():
+    """Returns hit/miss/eviction counters and the current size."""
+    with _lock:
+        return dict(_stats, entries=len(_entries), rows=_cached_rows)
+
+
+# Cached versions of the catalog reads used on every rerun
+list_pipelines = cached(database.list_pipelines)
+count_pipelines = cached(database.count_pipelines)
+get_facet_counts = cached(database.get_facet_counts)
+get_catalog_summary = cached(database.get_catalog_summary)
+search_pipelines = cached(database.search_pipelines)
+get_pipelines_by_ids = cached(database.get_pipelines_by_ids)
@@ -1,128 +1,41 @@
 import sqlite3
 import datetime
+import json
+import threading
+from db_connection import get_connection, get_db_path, transaction
+import migrations
+
+# Database files already bootstrapped by this process. init_db() is called on every
+# Streamlit rerun (and again by ai_assistant at import), so after the first call it
+# must cost no more than a set lookup.
+_bootstrapped_paths = set()
+_bootstrap_lock = threading.Lock()
 
 def init_db():
     """
-    Initializes the SQLite database and creates the necessary tables.
-    """
-    conn = sqlite3.connect('pipelines.db')
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS data_flow_control_header (
-            DATA_FLOW_GROUP_ID STRING PRIMARY KEY,
-            BUSINESS_UNIT STRING,
-            PRODUCT_OWNER STRING,
-            TRIGGER_TYPE STRING,
-            BUSINESS_OBJECT_NAME STRING,
-            ETL_LAYER STRING,
-            COMPUTE_CLASS STRING,
-            COMPUTE_CLASS_DEV STRING,
-            DATA_SME STRING,
-            INGESTION_MODE STRING,
-            INGESTION_BUCKET STRING,
-            SPARK_CONFIGS STRING,
-            COST_CENTER STRING,
-            WARNING_THRESHOLD_MINS INT,
-            WARNING_DL_GROUP STRING,
-            min_version REAL,
-            max_version REAL,
-            IS_ACTIVE STRING,
-            INSERTED_BY STRING,
-            UPDATED_BY STRING,
-            INSERTED_TS STRING,
-            UPDATED_TS STRING
-        )
-    """)
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS data_flow_l0_detail (
-            DATA_FLOW_GROUP_ID STRING,
-            SOURCE STRING NOT NULL,
-            SOURCE_OBJ_SCHEMA STRING NOT NULL,
-            SOURCE_OBJ_NAME STRING NOT NULL,
-            INPUT_FILE_FORMAT STRING,
-            STORAGE_TYPE STRING,
-            CUSTOM_SCHEMA STRING,
-            DELIMETER STRING,
-            DQ_LOGIC STRING,
-            CDC_LOGIC STRING,
-            TRANSFORM_QUERY STRING,
-            LOAD_TYPE STRING,
-            PRESTAG_FLAG STRING,
-            PARTITION STRING,
-            LS_FLAG STRING,
-            LS_DETAIL STRING,
-            LOB STRING,
-            IS_ACTIVE STRING,
-            INSERTED_BY STRING,
-            UPDATED_BY STRING,      
-            FOREIGN KEY (DATA_FLOW_GROUP_ID) REFERENCES data_flow_control_header(DATA_FLOW_GROUP_ID),
-            UNIQUE (DATA_FLOW_GROUP_ID, SOURCE, SOURCE_OBJ_SCHEMA, SOURCE_OBJ_NAME)
-        )
-    """)
-    
-    # Removed UNIQUE (DATA_FLOW_GROUP_ID) constraint from data_flow_pb_detail 
-    # to allow for update/insert logic without an explicit pb_id, assuming 
-    # a 1:1 or 1:N relationship where the N side is managed by DATA_FLOW_GROUP_ID
-    # I am assuming a 1:1 relationship based on the original update_pb_details logic.
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS data_flow_pb_detail (
-            DATA_FLOW_GROUP_ID STRING,
-            TARGET_OBJ_SCHEMA STRING,
-            TARGET_OBJ_NAME STRING,
-            PRIORITY INT,
-            TARGET_OBJ_TYPE STRING,
-            TRANSFORM_QUERY STRING,
-            GENERIC_SCRIPTS STRING,
-            SOURCE_PK STRING,
-            TARGET_PK STRING,
-            LOAD_TYPE STRING,
-            PARTITION_METHOD STRING,
-            PARTITION_OR_INDEX STRING,
-            CUSTOM_SCRIPT_PARAMS STRING,
-            RETENTION_DETAILS STRING,
-            LOB STRING,
-            IS_ACTIVE STRING,
-            INSERTED_BY STRING,
-            UPDATED_BY STRING,
-            FOREIGN KEY (DATA_FLOW_GROUP_ID) REFERENCES data_flow_control_header(DATA_FLOW_GROUP_ID)
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS data_flow_cluster_config_lookup (
-            COMPUTE_CLASS STRING PRIMARY KEY,
-            DESCRIPTION STRING,
-            MIN_WORKER INT,
-            MAX_WORKER INT,
-            DRIVER_NODE_TYPE_ID STRING,
-            WORKER_NODE_TYPE_ID STRING,
-            RUNTIME_ENGINE STRING,
-            SPARK_VERSION STRING,
-            INSERTED_BY STRING,
-            UPDATED_BY STRING,
-            INSERTED_TS TEXT,
-            UPDATED_TS TEXT,
-            DEV_ALLOWED STRING
-        )
-    """)
-
-    conn.commit()
-    conn.close()
-    
-    _seed_cluster_config_data()
+    Initializes the SQLite database: applies any pending schema migrations
+    (see migrations.py) and seeds the lookup tables.
+    Runs once per process and database file; later calls are no-ops.
+    """
+    db_path = get_db_path()
+    if db_path in _bootstrapped_paths:
+        return
+
+    with _bootstrap_lock:
+        if db_path in _bootstrapped_paths:
+            return
+        conn = get_connection()
+        if migrations.get_schema_version(conn) < migrations.LATEST_VERSION:
+            migrations.migrate(conn)
+        _seed_cluster_config_data()
+        _bootstrapped_paths.add(db_path)
 
 def _seed_cluster_config_data():
     """
     Seeds the data_flow_cluster_config_lookup table with hardcoded data if it's empty.
     """
-    conn = sqlite3.connect('pipelines.db')
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT COUNT(*) FROM data_flow_cluster_config_lookup")
-    if cursor.fetchone()[0] > 0:
-        conn.close()
+    conn = get_connection()
+    if conn.execute("SELECT COUNT(*) FROM data_flow_cluster_config_lookup").fetchone()[0] > 0:
         return
 
     data = [
@@ -156,22 +69,17 @@ def _seed_cluster_config_data():
         ('XXL_C6_WP', 'XXL_C6_WP', 16, 64, None, None, None, None, None, None, None, None, 'N')
     ]
 
-    cursor.executemany("""
-        INSERT INTO data_flow_cluster_config_lookup (
-            COMPUTE_CLASS, DESCRIPTION, MIN_WORKER, MAX_WORKER, DRIVER_NODE_TYPE_ID,
-            WORKER_NODE_TYPE_ID, RUNTIME_ENGINE, SPARK_VERSION, INSERTED_BY, UPDATED_BY,
-            INSERTED_TS, UPDATED_TS, DEV_ALLOWED
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, data)
-
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.executemany("""
+            INSERT INTO data_flow_cluster_config_lookup (
+                COMPUTE_CLASS, DESCRIPTION, MIN_WORKER, MAX_WORKER, DRIVER_NODE_TYPE_ID,
+                WORKER_NODE_TYPE_ID, RUNTIME_ENGINE, SPARK_VERSION, INSERTED_BY, UPDATED_BY,
+                INSERTED_TS, UPDATED_TS, DEV_ALLOWED
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, data)
 
 def save_general_info(general_data):
     """Inserts a new header record."""
-    conn = sqlite3.connect('pipelines.db')
-    cursor = conn.cursor()
-    
     general_data['INSERTED_TS'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     general_data['UPDATED_TS'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -179,15 +87,11 @@ def save_general_info(general_data):
     placeholders = ', '.join('?' * len(general_data))
     values = tuple(general_data.values())
     
-    cursor.execute(f"INSERT INTO data_flow_control_header ({columns}) VALUES ({placeholders})", values)
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute(f"INSERT INTO data_flow_control_header ({columns}) VALUES ({placeholders})", values)
 
 def update_general_info(general_data, data_flow_group_id):
     """Updates an existing header record."""
-    conn = sqlite3.connect('pipelines.db')
-    cursor = conn.cursor()
-    
     general_data['UPDATED_TS'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     # Exclude primary key from update columns
@@ -198,9 +102,8 @@ def update_general_info(general_data, data_flow_group_id):
     
     update_cols = ', '.join([f"{col} = ?" for col in columns])
     
-    cursor.execute(f"UPDATE data_flow_control_header SET {update_cols} WHERE DATA_FLOW_GROUP_ID = ?", values + (data_flow_group_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute(f"UPDATE data_flow_control_header SET {update_cols} WHERE DATA_FLOW_GROUP_ID = ?", values + (data_flow_group_id,))
 
 
 def save_l0_details(l0_data_list, data_flow_group_id):
@@ -208,22 +111,17 @@ def save_l0_details(l0_data_list, data_flow_group_id):
     Saves a list of L0 detail records for a given pipeline header.
     Performs inserts for new records using INSERT OR IGNORE to handle the unique constraint.
     """
-    conn = sqlite3.connect('pipelines.db')
-    cursor = conn.cursor()
-
-    for l0_data in l0_data_list:
-        data_to_save = l0_data.copy()
-        data_to_save['DATA_FLOW_GROUP_ID'] = data_flow_group_id
-
-        columns = ', '.join(data_to_save.keys())
-        placeholders = ', '.join('?' * len(data_to_save))
-        values = tuple(data_to_save.values())
+    with transaction() as conn:
+        for l0_data in l0_data_list:
+            data_to_save = l0_data.copy()
+            data_to_save['DATA_FLOW_GROUP_ID'] = data_flow_group_id
 
-        # Use INSERT OR IGNORE based on the unique constraint (DATA_FLOW_GROUP_ID, SOURCE, SOURCE_OBJ_SCHEMA, SOURCE_OBJ_NAME)
-        cursor.execute(f"INSERT OR IGNORE INTO data_flow_l0_detail ({columns}) VALUES ({placeholders})", values)
+            columns = ', '.join(data_to_save.keys())
+            placeholders = ', '.join('?' * len(data_to_save))
+            values = tuple(data_to_save.values())
 
-    conn.commit()
-    conn.close()
+            # Use INSERT OR IGNORE based on the unique constraint (DATA_FLOW_GROUP_ID, SOURCE, SOURCE_OBJ_SCHEMA, SOURCE_OBJ_NAME)
+            conn.execute(f"INSERT OR IGNORE INTO data_flow_l0_detail ({columns}) VALUES ({placeholders})", values)
 
 def update_l0_details(l0_data_list, data_flow_group_id):
     """
@@ -231,159 +129,556 @@ def update_l0_details(l0_data_list, data_flow_group_id):
     Performs an UPDATE if a record exists; performs an INSERT otherwise.
     (Note: Deletion logic is removed as it relied on l0_id).
     """
-    conn = sqlite3.connect('pipelines.db')
-    cursor = conn.cursor()
-
-    for l0_data in l0_data_list:
-        
-        # Keys that form the unique identifier
-        unique_keys = ['DATA_FLOW_GROUP_ID', 'SOURCE', 'SOURCE_OBJ_SCHEMA', 'SOURCE_OBJ_NAME']
-        
-        # Prepare data for update/insert
-        data_to_update = {k: v for k, v in l0_data.items() if k not in unique_keys}
-        data_to_update['DATA_FLOW_GROUP_ID'] = data_flow_group_id # Ensure FK is present for update/insert
-
-        # Attempt to UPDATE first
-        update_cols = ', '.join([f"{col} = ?" for col in data_to_update.keys()])
-        update_values = tuple(data_to_update.values()) + (
-            data_flow_group_id, 
-            l0_data['SOURCE'], 
-            l0_data['SOURCE_OBJ_SCHEMA'], 
-            l0_data['SOURCE_OBJ_NAME']
-        )
-        
-        cursor.execute(f"""
-            UPDATE data_flow_l0_detail 
-            SET {update_cols} 
-            WHERE DATA_FLOW_GROUP_ID = ? AND SOURCE = ? AND SOURCE_OBJ_SCHEMA = ? AND SOURCE_OBJ_NAME = ?
-        """, update_values)
-        
-        # If no rows were updated, INSERT the record
-        if cursor.rowcount == 0:
-            full_data = l0_data.copy()
-            full_data['DATA_FLOW_GROUP_ID'] = data_flow_group_id
-            
-            columns = ', '.join(full_data.keys())
-            placeholders = ', '.join('?' * len(full_data))
-            values = tuple(full_data.values())
-            
-            # Use INSERT OR IGNORE to respect the unique constraint on the detail table
-            cursor.execute(f"INSERT OR IGNORE INTO data_flow_l0_detail ({columns}) VALUES ({placeholders})", values)
-
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        _upsert_l0_rows(conn, l0_data_list, data_flow_group_id)
 
 def save_pb_details(pb_data, data_flow_group_id):
-    """Inserts a single L1/L2 detail record."""
-    conn = sqlite3.connect('pipelines.db')
-    cursor = conn.cursor()
-
+    """Inserts a single L1/L2 detail record, or updates the pipeline's existing one."""
     pb_data['DATA_FLOW_GROUP_ID'] = data_flow_group_id
-    columns = ', '.join(pb_data.keys())
-    placeholders = ', '.join('?' * len(pb_data))
-    values = tuple(pb_data.values())
-
-    # INSERT OR REPLACE handles the case where there is a unique constraint on DATA_FLOW_GROUP_ID 
-    # (even though I removed the explicit unique constraint, this is safer for 1:1 records).
-    cursor.execute(f"INSERT OR REPLACE INTO data_flow_pb_detail ({columns}) VALUES ({placeholders})", values)
-    conn.commit()
-    conn.close()
+    # An upsert on the unique DATA_FLOW_GROUP_ID rather than INSERT OR REPLACE: REPLACE deletes the old
+    # row without firing delete triggers (recursive_triggers is off), so the change log would miss it
+    with transaction() as conn:
+        conn.execute(_upsert_sql('data_flow_pb_detail', list(pb_data.keys()), PB_KEY_COLUMNS), tuple(pb_data.values()))
     
 def update_pb_details(pb_data, data_flow_group_id):
-    """Updates an existing L1/L2 detail record based on DATA_FLOW_GROUP_ID."""
-    conn = sqlite3.connect('pipelines.db')
-    cursor = conn.cursor()
+    """Updates an existing L1/L2 detail record based on DATA_FLOW_GROUP_ID, inserting it if missing."""
+    with transaction() as conn:
+        _upsert_pb_row(conn, pb_data, data_flow_group_id)
 
-    # Exclude foreign key from update list, but use it in WHERE clause
-    data_to_update = {k: v for k, v in pb_data.items() if k != 'DATA_FLOW_GROUP_ID'}
 
-    columns = data_to_update.keys()
-    values = tuple(data_to_update.values())
+# Conflict targets for the upserts below; they match the PK / UNIQUE indexes of each table.
+L0_KEY_COLUMNS = ['DATA_FLOW_GROUP_ID', 'SOURCE', 'SOURCE_OBJ_SCHEMA', 'SOURCE_OBJ_NAME']
+PB_KEY_COLUMNS = ['DATA_FLOW_GROUP_ID']
 
-    update_cols = ', '.join([f"{col} = ?" for col in columns])
+def _upsert_sql(table, columns, key_columns, keep_columns=()):
+    """
+    Builds an INSERT ... ON CONFLICT DO UPDATE statement for the given column list.
+    key_columns form the conflict target; keep_columns are written on insert only.
+    """
+    placeholders = ', '.join('?' * len(columns))
+    update_cols = [col for col in columns if col not in key_columns and col not in keep_columns]
+    if update_cols:
+        action = "DO UPDATE SET " + ', '.join(f"{col} = excluded.{col}" for col in update_cols)
+    else:
+        action = "DO NOTHING"
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) ON CONFLICT ({', '.join(key_columns)}) {action}"
+
+def _upsert_header(conn, header_data, create=False):
+    """Upserts one header row. INSERTED_TS is only set when the row is new. Returns 'inserted' or 'updated'."""
+    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    data = dict(header_data)
+    data['INSERTED_TS'] = now
+    data['UPDATED_TS'] = now
+
+    exists = conn.execute(
+        "SELECT 1 FROM data_flow_control_header WHERE DATA_FLOW_GROUP_ID = ?", (data['DATA_FLOW_GROUP_ID'],)
+    ).fetchone() is not None
+    if exists and create:
+        raise sqlite3.IntegrityError(f"Pipeline '{data['DATA_FLOW_GROUP_ID']}' already exists.")
+
+    columns = list(data.keys())
+    conn.execute(_upsert_sql('data_flow_control_header', columns, ['DATA_FLOW_GROUP_ID'], ['INSERTED_TS']), tuple(data.values()))
+    return 'updated' if exists else 'inserted'
+
+def _upsert_l0_rows(conn, l0_data_list, data_flow_group_id):
+    """
+    Upserts L0 detail rows keyed on (DATA_FLOW_GROUP_ID, SOURCE, SOURCE_OBJ_SCHEMA, SOURCE_OBJ_NAME)
+    with one executemany per distinct column layout. Returns 'inserted'/'updated' per input row.
+    """
+    rows = [dict(l0_data, DATA_FLOW_GROUP_ID=data_flow_group_id) for l0_data in l0_data_list]
+    return _bulk_upsert_table(conn, 'data_flow_l0_detail', rows, L0_KEY_COLUMNS)
+
+def _upsert_pb_row(conn, pb_data, data_flow_group_id):
+    """Upserts the single PB detail row of a pipeline. Returns 'inserted' or 'updated'."""
+    row = dict(pb_data, DATA_FLOW_GROUP_ID=data_flow_group_id)
+    return _bulk_upsert_table(conn, 'data_flow_pb_detail', [row], PB_KEY_COLUMNS)[0]
+
+def upsert_pipeline(header, l0_rows=None, pb_row=None, create=False):
+    """
+    Writes a whole pipeline (header, L0 detail rows and/or the PB detail row) in one transaction.
+    Either everything is saved or, on any error, nothing is.
+    With create=True an existing DATA_FLOW_GROUP_ID raises sqlite3.IntegrityError instead of being updated.
 
-    # Update based only on DATA_FLOW_GROUP_ID, assuming one PB detail record per header.
-    cursor.execute(f"UPDATE data_flow_pb_detail SET {update_cols} WHERE DATA_FLOW_GROUP_ID = ?", values + (data_flow_group_id,))
+    Returns the per-row outcomes, e.g.
+    {'header': 'inserted', 'l0': ['inserted', 'updated'], 'pb': None}
+    """
+    data_flow_group_id = header['DATA_FLOW_GROUP_ID']
+    outcomes = {'header': None, 'l0': [], 'pb': None}
+
+    with transaction() as conn:
+        outcomes['header'] = _upsert_header(conn, header, create=create)
+        if l0_rows:
+            outcomes['l0'] = _upsert_l0_rows(conn, l0_rows, data_flow_group_id)
+        if pb_row:
+            outcomes['pb'] = _upsert_pb_row(conn, pb_row, data_flow_group_id)
+    return outcomes
+
+def _existing_keys(conn, table, key_columns, group_ids):
+    """Returns the set of key tuples already stored in `table` for the given pipeline IDs."""
+    if not group_ids:
+        return set()
+    placeholders = ', '.join('?' * len(group_ids))
+    cursor = conn.execute(
+        f"SELECT {', '.join(key_columns)} FROM {table} WHERE DATA_FLOW_GROUP_ID IN ({placeholders})",
+        tuple(group_ids)
+    )
+    return set(cursor.fetchall())
+
+def _bulk_upsert_table(conn, table, rows, key_columns, keep_columns=()):
+    """
+    Classifies each row as 'inserted' or 'updated' against the stored keys and writes the rows
+    with one executemany per distinct column layout.
+    """
+    existing = _existing_keys(conn, table, key_columns, {row['DATA_FLOW_GROUP_ID'] for row in rows})
+    outcomes = []
+    batches = {}
+    for row in rows:
+        key = tuple(row.get(col) for col in key_columns)
+        outcomes.append('updated' if key in existing else 'inserted')
+        existing.add(key)
+        batches.setdefault(tuple(row.keys()), []).append(tuple(row.values()))
+
+    for columns, values in batches.items():
+        conn.executemany(_upsert_sql(table, list(columns), key_columns, keep_columns), values)
+    return outcomes
+
+def bulk_upsert(header_rows=(), l0_rows=(), pb_rows=()):
+    """
+    Upserts a batch of rows belonging to any number of pipelines in one transaction.
+    Every row must carry its own DATA_FLOW_GROUP_ID. For a dry run, call it inside
+    db_connection.transaction(rollback=True).
+
+    Returns outcomes aligned with the inputs, e.g.
+    {'header': ['inserted'], 'l0': ['inserted', 'updated'], 'pb': []}
+    """
+    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    header_rows = [dict(row, INSERTED_TS=now, UPDATED_TS=now) for row in header_rows]
+
+    with transaction() as conn:
+        outcomes = {
+            'header': _bulk_upsert_table(conn, 'data_flow_control_header', header_rows, ['DATA_FLOW_GROUP_ID'], ['INSERTED_TS']),
+            'l0': _bulk_upsert_table(conn, 'data_flow_l0_detail', list(l0_rows), L0_KEY_COLUMNS),
+            'pb': _bulk_upsert_table(conn, 'data_flow_pb_detail', list(pb_rows), PB_KEY_COLUMNS),
+        }
+    return outcomes
+
+def get_catalog_version():
+    """
+    Returns the catalog version: the VERSION of the latest catalog_change_log entry (0 for an empty
+    catalog). It grows with every write to the pipeline tables, so a cached copy of any catalog data
+    is current as long as the version it was read at still equals this value.
+    """
+    row = get_connection().execute("SELECT seq FROM sqlite_sequence WHERE name = 'catalog_change_log'").fetchone()
+    return row[0] if row else 0
 
-    # If no row was updated, it means the record doesn't exist, so insert it.
-    if cursor.rowcount == 0:
-        save_pb_details(pb_data, data_flow_group_id)
+def get_changes_since(version, limit=None):
+    """
+    Returns the catalog changes made after `version`, oldest first (at most `limit` of them):
+    [{'VERSION': 42, 'TABLE_NAME': 'data_flow_l0_detail', 'DATA_FLOW_GROUP_ID': 'x',
+      'ROW_KEY': ['x', 'sap', 'GBL', 'GBL_CUSTOMER'], 'OPERATION': 'UPDATE', 'CHANGED_TS': '...'}]
+    Pass the VERSION of the last change received to read the next batch.
+    """
+    cursor = get_connection().execute(
+        "SELECT VERSION, TABLE_NAME, DATA_FLOW_GROUP_ID, ROW_KEY, OPERATION, CHANGED_TS"
+        " FROM catalog_change_log WHERE VERSION > ? ORDER BY VERSION LIMIT ?",
+        (version, -1 if limit is None else limit)
+    )
+    columns = [col[0] for col in cursor.description]
+    changes = []
+    for row in cursor.fetchall():
+        change = dict(zip(columns, row))
+        change['ROW_KEY'] = json.loads(change['ROW_KEY'])
+        changes.append(change)
+    return changes
 
-    conn.commit()
-    conn.close()
+def get_table_columns(table):
+    """Returns the column names of a catalog table."""
+    return [row[1] for row in get_connection().execute(f"PRAGMA table_info({table})").fetchall()]
 
 
 def get_all_pipelines():
     """
     Fetches all pipelines by selecting only from the header table.
     """
-    conn = sqlite3.connect('pipelines.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM data_flow_control_header ORDER BY UPDATED_TS DESC")
+    cursor = get_connection().execute("SELECT * FROM data_flow_control_header ORDER BY UPDATED_TS DESC")
     headers = [dict(zip([col[0] for col in cursor.description], row)) for row in cursor.fetchall()]
-    conn.close()
     return headers
 
+# Maximum number of IDs bound into one IN (...) list; keeps well under SQLite's host parameter limit
+ID_BATCH_SIZE = 500
+
+def _rows_by_group_id(conn, table, group_ids):
+    """Fetches the rows of `table` for the given pipeline IDs, grouped by DATA_FLOW_GROUP_ID in one pass."""
+    placeholders = ', '.join('?' * len(group_ids))
+    cursor = conn.execute(f"SELECT * FROM {table} WHERE DATA_FLOW_GROUP_ID IN ({placeholders})", tuple(group_ids))
+    columns = [col[0] for col in cursor.description]
+    grouped = {}
+    for row in cursor:
+        record = dict(zip(columns, row))
+        grouped.setdefault(record['DATA_FLOW_GROUP_ID'], []).append(record)
+    return grouped
+
+def get_pipelines_by_ids(data_flow_group_ids):
+    """
+    Fetches many pipelines and their detail records at once.
+    IDs are looked up in chunks of ID_BATCH_SIZE with three queries per chunk (header, L0, PB),
+    whatever the number of pipelines.
+
+    Returns a dict keyed by DATA_FLOW_GROUP_ID, in the order the IDs were given; IDs that do not exist
+    are left out. Each value is the header dict plus 'l0_details' and 'pb_details' lists.
+    """
+    ids = list(dict.fromkeys(i for i in data_flow_group_ids if i is not None))
+    conn = get_connection()
+    found = {}
+    for start in range(0, len(ids), ID_BATCH_SIZE):
+        chunk = ids[start:start + ID_BATCH_SIZE]
+        headers = _rows_by_group_id(conn, 'data_flow_control_header', chunk)
+        if not headers:
+            continue
+        chunk = [i for i in chunk if i in headers]
+        l0_details = _rows_by_group_id(conn, 'data_flow_l0_detail', chunk)
+        pb_details = _rows_by_group_id(conn, 'data_flow_pb_detail', chunk)
+        for group_id in chunk:
+            pipeline_dict = headers[group_id][0]
+            pipeline_dict['l0_details'] = l0_details.get(group_id, [])
+            pipeline_dict['pb_details'] = pb_details.get(group_id, [])
+            found[group_id] = pipeline_dict
+    return found
+
 def get_pipeline_by_id(data_flow_group_id):
     """Fetches a single pipeline and its detail records by ID."""
-    conn = sqlite3.connect('pipelines.db')
-    cursor = conn.cursor()
+    return get_pipelines_by_ids([data_flow_group_id]).get(data_flow_group_id)
 
-    cursor.execute("SELECT * FROM data_flow_control_header WHERE DATA_FLOW_GROUP_ID = ?", (data_flow_group_id,))
-    columns = [col[0] for col in cursor.description]
-    pipeline_data = cursor.fetchone()
+# Header columns that can be filtered on by equality (a single value or a list of values)
+HEADER_FILTER_COLUMNS = ['ETL_LAYER', 'BUSINESS_UNIT', 'IS_ACTIVE', 'COMPUTE_CLASS', 'COST_CENTER']
+
+def _header_filter_clause(filters, alias='h', use_indexes=True):
+    """
+    Builds a parameterized WHERE clause over the header table.
+    filters: {'ETL_LAYER': 'L0', 'BUSINESS_UNIT': ['sales', 'finance'], 'UPDATED_SINCE': '2024-01-01 00:00:00',
+              'TEXT': 'gbl_customer'}
+    TEXT is a full-text search (see search_pipelines()).
+    With use_indexes=False the columns are prefixed with unary '+', which stops SQLite from
+    picking a filter index, so a scan in ORDER BY index order is used instead of a sort.
+    Returns (sql, params); sql is '1 = 1' when there is nothing to filter.
+    """
+    prefix = '' if use_indexes else '+'
+    conditions = []
+    params = []
+    for column, value in (filters or {}).items():
+        if value is None or value == "All":
+            continue
+        if column == 'UPDATED_SINCE':
+            conditions.append(f"{prefix}{alias}.UPDATED_TS >= ?")
+            params.append(value)
+        elif column == 'TEXT':
+            query = _fts_query(value)
+            if query is None:
+                continue
+            conditions.append(f"{prefix}{alias}.rowid IN (SELECT rowid FROM pipeline_search WHERE pipeline_search MATCH ?)")
+            params.append(query)
+        elif column in HEADER_FILTER_COLUMNS:
+            if isinstance(value, (list, tuple, set)):
+                if not value:
+                    continue
+                conditions.append(f"{prefix}{alias}.{column} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                conditions.append(f"{prefix}{alias}.{column} = ?")
+                params.append(value)
+        else:
+            raise ValueError(f"Unsupported pipeline filter: {column}")
+    return (' AND '.join(conditions) or '1 = 1'), params
+
+# Sort orders supported by list_pipelines(): each column is extended with tie-breakers up to the
+# unique DATA_FLOW_GROUP_ID, matching the index that serves it (see migrations.py)
+SORT_KEYS = {
+    'UPDATED_TS': ['UPDATED_TS', 'DATA_FLOW_GROUP_ID'],
+    'DATA_FLOW_GROUP_ID': ['DATA_FLOW_GROUP_ID'],
+    'ETL_LAYER': ['ETL_LAYER', 'UPDATED_TS', 'DATA_FLOW_GROUP_ID'],
+    'BUSINESS_UNIT': ['BUSINESS_UNIT', 'UPDATED_TS', 'DATA_FLOW_GROUP_ID'],
+    'IS_ACTIVE': ['IS_ACTIVE', 'UPDATED_TS', 'DATA_FLOW_GROUP_ID'],
+}
+# Sort columns that may hold NULL (bulk import and the API accept incomplete headers). UPDATED_TS
+# is set on every write and DATA_FLOW_GROUP_ID is the key, so only a leading column can be NULL.
+NULLABLE_SORT_COLUMNS = {'ETL_LAYER', 'BUSINESS_UNIT', 'IS_ACTIVE'}
+
+def list_pipelines(page_size=50, cursor=None, filters=None, columns=None, order_by='UPDATED_TS', descending=True):
+    """
+    Returns one page of header rows using keyset pagination, sorted by `order_by` (newest first by default).
+    cursor is the sort key (see SORT_KEYS) of the last row of the previous page (None for the first page),
+    so each page is an index range scan whose cost does not grow with the catalog.
+    columns limits the returned fields (default: all header columns).
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if order_by not in SORT_KEYS:
+        raise ValueError(f"Unsupported sort column: {order_by}")
+    header_columns = get_table_columns('data_flow_control_header')
+    columns = list(columns or header_columns)
+    unknown = [col for col in columns if col not in header_columns]
+    if unknown:
+        raise ValueError(f"Unknown header columns: {', '.join(unknown)}")
+
+    # The sort key columns are always read so the next cursor can be built
+    sort_key = SORT_KEYS[order_by]
+    select_columns = columns + [col for col in sort_key if col not in columns]
+
+    where, params = _header_filter_clause(filters)
+    direction = 'DESC' if descending else 'ASC'
+    comparison = '<' if descending else '>'
+
+    def read_page(condition, condition_params, limit):
+        return get_connection().execute(
+            f"SELECT {', '.join('h.' + col for col in select_columns)} FROM data_flow_control_header h"
+            f" WHERE {where}{condition} ORDER BY {', '.join(f'h.{col} {direction}' for col in sort_key)} LIMIT ?",
+            params + condition_params + [limit]
+        ).fetchall()
+
+    def after(columns, values):
+        return f" AND ({', '.join('h.' + col for col in columns)}) {comparison} ({', '.join('?' * len(columns))})", list(values)
+
+    lead = sort_key[0]
+    if cursor is None:
+        rows = read_page('', [], page_size + 1)
+    elif lead in NULLABLE_SORT_COLUMNS and cursor[0] is None:
+        # The cursor is inside the block of NULL leading values (first ascending, last descending):
+        # finish that block, then, ascending, go on with the non-NULL values
+        condition, condition_params = after(sort_key[1:], cursor[1:])
+        rows = read_page(f" AND h.{lead} IS NULL{condition}", condition_params, page_size + 1)
+        if not descending and len(rows) <= page_size:
+            rows += read_page(f" AND h.{lead} IS NOT NULL", [], page_size + 1 - len(rows))
+    else:
+        # A row-value comparison is NULL for NULL leading values, so descending, the NULL block that
+        # follows the non-NULL values is read separately
+        rows = read_page(*after(sort_key, cursor), page_size + 1)
+        if descending and lead in NULLABLE_SORT_COLUMNS and len(rows) <= page_size:
+            rows += read_page(f" AND h.{lead} IS NULL", [], page_size + 1 - len(rows))
 
-    if not pipeline_data:
-        conn.close()
-        return None
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = dict(zip(select_columns, rows[-1]))
+        next_cursor = tuple(last[col] for col in sort_key)
 
-    pipeline_dict = dict(zip(columns, pipeline_data))
+    return [dict(zip(columns, row)) for row in rows], next_cursor
 
-    cursor.execute("SELECT * FROM data_flow_l0_detail WHERE DATA_FLOW_GROUP_ID = ?", (data_flow_group_id,))
-    l0_columns = [col[0] for col in cursor.description]
-    l0_details = [dict(zip(l0_columns, row)) for row in cursor.fetchall()]
-    pipeline_dict['l0_details'] = l0_details
+# Header columns offered as facets (filter options with counts) on the search page
+FACET_COLUMNS = ['IS_ACTIVE', 'ETL_LAYER', 'BUSINESS_UNIT']
 
-    cursor.execute("SELECT * FROM data_flow_pb_detail WHERE DATA_FLOW_GROUP_ID = ?", (data_flow_group_id,))
-    pb_columns = [col[0] for col in cursor.description]
-    pb_details = [dict(zip(pb_columns, row)) for row in cursor.fetchall()]
-    pipeline_dict['pb_details'] = pb_details
-    
-    conn.close()
-    return pipeline_dict
+def get_catalog_summary():
+    """
+    Returns the number of pipelines per value of BUSINESS_UNIT, ETL_LAYER, IS_ACTIVE, COMPUTE_CLASS and
+    COST_CENTER from the trigger-maintained catalog_summary table (one small read, whatever the catalog size):
+    {'ETL_LAYER': {'L0': 120, 'L1': 40}, 'COST_CENTER': {'': 3, 'CC100': 157}, ...}
+    Pipelines without a value are counted under ''.
+    """
+    summary = {column: {} for column in migrations.SUMMARY_COLUMNS}
+    for column, value, count in get_connection().execute("SELECT COLUMN_NAME, VALUE, PIPELINE_COUNT FROM catalog_summary"):
+        summary[column][value] = count
+    return summary
+
+def count_pipelines(filters=None):
+    """Returns the number of pipelines matching the filters (same keys as list_pipelines())."""
+    where, params = _header_filter_clause(filters)
+    if not params:
+        # Unfiltered: every pipeline has exactly one ETL_LAYER entry in the summary
+        return sum(get_catalog_summary()['ETL_LAYER'].values())
+    return get_connection().execute(f"SELECT COUNT(*) FROM data_flow_control_header h WHERE {where}", params).fetchone()[0]
+
+def get_facet_counts(filters=None, columns=FACET_COLUMNS):
+    """
+    Returns the distinct values of each facet column with their pipeline counts, in one query:
+    {'ETL_LAYER': {'L0': 120, 'L1': 40}, 'IS_ACTIVE': {'Y': 150, 'N': 10}, ...}
+    Each facet is counted under all the other filters but not its own, so every option stays
+    selectable and its count is the number of results selecting it would give.
+    """
+    unknown = [col for col in columns if col not in HEADER_FILTER_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unsupported facet columns: {', '.join(unknown)}")
+
+    if not _header_filter_clause(filters)[1]:
+        # Unfiltered counts are kept by triggers in catalog_summary
+        summary = get_catalog_summary()
+        return {column: {value or None: count for value, count in summary[column].items()} for column in columns}
+
+    selects = []
+    params = []
+    for column in columns:
+        where, column_params = _header_filter_clause({k: v for k, v in (filters or {}).items() if k != column})
+        selects.append(f"SELECT '{column}', h.{column}, COUNT(*) FROM data_flow_control_header h WHERE {where} GROUP BY h.{column}")
+        params.extend(column_params)
+
+    facets = {column: {} for column in columns}
+    for column, value, count in get_connection().execute(' UNION ALL '.join(selects), params).fetchall():
+        facets[column][value] = count
+    return facets
+
+def _fts_query(text):
+    """
+    Turns free text into an FTS5 query: every whitespace-separated term must match, as a quoted
+    phrase (so '.', '_' and operators in the input are taken literally) and as a prefix.
+    Returns None when the text holds no terms.
+    """
+    terms = [term.replace('"', '""') for term in text.split()]
+    return ' '.join(f'"{term}"*' for term in terms) or None
+
+def search_pipelines(text, filters=None, limit=50, columns=None, offset=0, snippet_marks=('**', '**')):
+    """
+    Full-text search over pipeline IDs, owners, source/target object names, transform queries,
+    DQ and CDC logic (the pipeline_search FTS5 index, kept in sync by triggers).
+    filters narrows the results with the same keys as list_pipelines(); columns adds header fields.
+    offset skips that many of the best matches (for paging through ranked results).
+
+    Returns up to `limit` matches (all of them when limit is None), best first:
+    [{'DATA_FLOW_GROUP_ID': 'x', 'rank': -3.2, 'snippet': '... **GBL_CUSTOMER** ...'}]
+    """
+    query = _fts_query(text or '')
+    if query is None:
+        return []
+    header_columns = get_table_columns('data_flow_control_header')
+    columns = ['DATA_FLOW_GROUP_ID'] + [col for col in (columns or []) if col != 'DATA_FLOW_GROUP_ID']
+    unknown = [col for col in columns if col not in header_columns]
+    if unknown:
+        raise ValueError(f"Unknown header columns: {', '.join(unknown)}")
+
+    where, params = _header_filter_clause(filters)
+    # CROSS JOIN keeps the FTS index as the outer loop, so results come out in rank order without a sort
+    cursor = get_connection().execute(
+        f"SELECT {', '.join('h.' + col for col in columns)}, pipeline_search.rank, snippet(pipeline_search, -1, ?, ?, '…', 12)"
+        f" FROM pipeline_search CROSS JOIN data_flow_control_header h ON h.rowid = pipeline_search.rowid"
+        f" WHERE pipeline_search MATCH ? AND {where} ORDER BY pipeline_search.rank LIMIT ? OFFSET ?",
+        [snippet_marks[0], snippet_marks[1], query] + params + [-1 if limit is None else limit, offset]
+    )
+    return [dict(zip(columns + ['rank', 'snippet'], row)) for row in cursor.fetchall()]
+
+def get_pipeline_ids(data_flow_group_ids=None):
+    """Returns the IDs of all pipelines, or those of the given IDs that exist (read from the primary key index)."""
+    conn = get_connection()
+    if data_flow_group_ids is None:
+        return [row[0] for row in conn.execute("SELECT DATA_FLOW_GROUP_ID FROM data_flow_control_header")]
+    ids = list(dict.fromkeys(data_flow_group_ids))
+    existing = []
+    for start in range(0, len(ids), ID_BATCH_SIZE):
+        chunk = ids[start:start + ID_BATCH_SIZE]
+        existing.extend(row[0] for row in conn.execute(
+            f"SELECT DATA_FLOW_GROUP_ID FROM data_flow_control_header WHERE DATA_FLOW_GROUP_ID IN ({', '.join('?' * len(chunk))})",
+            chunk
+        ))
+    return existing
+
+def get_pipeline_names(data_flow_group_ids=None):
+    """
+    Returns the names a pipeline can be looked up by - its ID, business object name and L0 source /
+    PB target object names - as {DATA_FLOW_GROUP_ID: set(names)}, for the given IDs or all pipelines.
+    """
+    names_sql = """
+        SELECT DATA_FLOW_GROUP_ID, DATA_FLOW_GROUP_ID FROM data_flow_control_header WHERE {where}
+        UNION ALL SELECT DATA_FLOW_GROUP_ID, BUSINESS_OBJECT_NAME FROM data_flow_control_header WHERE {where}
+        UNION ALL SELECT DATA_FLOW_GROUP_ID, SOURCE_OBJ_NAME FROM data_flow_l0_detail WHERE {where}
+        UNION ALL SELECT DATA_FLOW_GROUP_ID, TARGET_OBJ_NAME FROM data_flow_pb_detail WHERE {where}
+    """
+    conn = get_connection()
+    if data_flow_group_ids is None:
+        batches = [(names_sql.format(where='1 = 1'), ())]
+    else:
+        ids = list(dict.fromkeys(data_flow_group_ids))
+        batches = []
+        for start in range(0, len(ids), ID_BATCH_SIZE):
+            chunk = ids[start:start + ID_BATCH_SIZE]
+            where = f"DATA_FLOW_GROUP_ID IN ({', '.join('?' * len(chunk))})"
+            batches.append((names_sql.format(where=where), tuple(chunk) * 4))
+
+    names = {}
+    for sql, params in batches:
+        for group_id, name in conn.execute(sql, params):
+            if name:
+                names.setdefault(group_id, set()).add(name)
+    return names
+
+def get_search_documents():
+    """
+    Returns one row per pipeline for in-memory search (search_index.py), newest first:
+    the listing columns plus the pipeline's HEADER_TEXT and OBJECT_NAMES from the FTS documents.
+    """
+    cursor = get_connection().execute(
+        "SELECT h.DATA_FLOW_GROUP_ID, h.IS_ACTIVE, h.ETL_LAYER, h.BUSINESS_UNIT, h.UPDATED_TS,"
+        " s.HEADER_TEXT, s.OBJECT_NAMES"
+        " FROM data_flow_control_header h JOIN pipeline_search s ON s.rowid = h.rowid"
+        " ORDER BY h.UPDATED_TS DESC, h.DATA_FLOW_GROUP_ID DESC"
+    )
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def _iter_dicts(cursor, batch_size):
+    """Yields the cursor's rows as dicts, fetching batch_size rows at a time."""
+    columns = [col[0] for col in cursor.description]
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        for row in rows:
+            yield dict(zip(columns, row))
+
+def iter_pipeline_records(filters=None, batch_size=500):
+    """
+    Streams pipelines as nested records (header fields + 'l0_details' + 'pb_details'), ordered by ID.
+    The header and both detail tables are read with one query each, in the same ID order, and
+    merged as they are fetched, so memory stays bounded by batch_size whatever the catalog size.
+    """
+    # Headers are walked in primary-key order; a filter index would force a sort of the whole result
+    where, params = _header_filter_clause(filters, use_indexes=False)
+    conn = get_connection()
+    headers = _iter_dicts(conn.execute(
+        f"SELECT h.* FROM data_flow_control_header h WHERE {where} ORDER BY h.DATA_FLOW_GROUP_ID", params
+    ), batch_size)
+    # Joining on the header applies the same filters and drops detail rows without a header,
+    # so every detail group lines up with a header in the merge below. CROSS JOIN pins the
+    # header as the outer loop, so rows come out in primary-key order without a sort step.
+    l0_rows = _iter_dicts(conn.execute(
+        f"SELECT d.* FROM data_flow_control_header h CROSS JOIN data_flow_l0_detail d ON d.DATA_FLOW_GROUP_ID = h.DATA_FLOW_GROUP_ID"
+        f" WHERE {where} ORDER BY h.DATA_FLOW_GROUP_ID", params
+    ), batch_size)
+    pb_rows = _iter_dicts(conn.execute(
+        f"SELECT d.* FROM data_flow_control_header h CROSS JOIN data_flow_pb_detail d ON d.DATA_FLOW_GROUP_ID = h.DATA_FLOW_GROUP_ID"
+        f" WHERE {where} ORDER BY h.DATA_FLOW_GROUP_ID", params
+    ), batch_size)
+
+    next_l0 = next(l0_rows, None)
+    next_pb = next(pb_rows, None)
+    for header in headers:
+        group_id = header['DATA_FLOW_GROUP_ID']
+        header['l0_details'] = []
+        while next_l0 is not None and next_l0['DATA_FLOW_GROUP_ID'] == group_id:
+            header['l0_details'].append(next_l0)
+            next_l0 = next(l0_rows, None)
+        header['pb_details'] = []
+        while next_pb is not None and next_pb['DATA_FLOW_GROUP_ID'] == group_id:
+            header['pb_details'].append(next_pb)
+            next_pb = next(pb_rows, None)
+        yield header
 
 def delete_pipeline(data_flow_group_id):
     """Deletes a complete pipeline and all its associated records."""
-    conn = sqlite3.connect('pipelines.db')
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute("DELETE FROM data_flow_l0_detail WHERE DATA_FLOW_GROUP_ID = ?", (data_flow_group_id,))
-        cursor.execute("DELETE FROM data_flow_pb_detail WHERE DATA_FLOW_GROUP_ID = ?", (data_flow_group_id,))
-        cursor.execute("DELETE FROM data_flow_control_header WHERE DATA_FLOW_GROUP_ID = ?", (data_flow_group_id,))
-        conn.commit()
+        with transaction() as conn:
+            conn.execute("DELETE FROM data_flow_l0_detail WHERE DATA_FLOW_GROUP_ID = ?", (data_flow_group_id,))
+            conn.execute("DELETE FROM data_flow_pb_detail WHERE DATA_FLOW_GROUP_ID = ?", (data_flow_group_id,))
+            conn.execute("DELETE FROM data_flow_control_header WHERE DATA_FLOW_GROUP_ID = ?", (data_flow_group_id,))
         return True
     except sqlite3.Error as e:
         print(f"Error deleting pipeline: {e}")
-        conn.rollback()
         return False
-    finally:
-        conn.close()
 
 def get_compute_classes(dev_allowed=False):
     """
     Fetches COMPUTE_CLASS options from the lookup table.
     """
-    conn = sqlite3.connect('pipelines.db')
-    cursor = conn.cursor()
-    
     if dev_allowed:
         query = "SELECT COMPUTE_CLASS FROM data_flow_cluster_config_lookup WHERE DEV_ALLOWED = 'Y';"
     else:
         query = "SELECT COMPUTE_CLASS FROM data_flow_cluster_config_lookup;"
         
-    cursor.execute(query)
-    classes = [row[0] for row in cursor.fetchall() if row[0] is not None]
-    conn.close()
+    classes = [row[0] for row in get_connection().execute(query).fetchall() if row[0] is not None]
     
-    return sorted(list(set(classes)))
\ No newline at end of file
+    return sorted(list(set(classes)))
@@ -0,0 +1,110 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Connection settings - overridable through environment variables (.env is loaded by the app)
+DB_PATH = os.getenv("PIPELINES_DB_PATH", "pipelines.db")
+BUSY_TIMEOUT_MS = int(os.getenv("PIPELINES_DB_BUSY_TIMEOUT_MS", "5000"))
+MMAP_SIZE = int(os.getenv("PIPELINES_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHE_SIZE_KB = int(os.getenv("PIPELINES_DB_CACHE_SIZE_KB", "65536"))
+STATEMENT_CACHE_SIZE = int(os.getenv("PIPELINES_DB_STATEMENT_CACHE", "256"))
+
+# Each thread (i.e. each Streamlit script run) gets its own connections, keyed by DB path.
+# sqlite3 connections must not be shared across threads, so this is the unit of reuse.
+_local = threading.local()
+
+
+def set_db_path(db_path):
+    """Points all subsequent get_connection() calls at a different database file."""
+    global DB_PATH
+    DB_PATH = db_path
+
+
+def get_db_path():
+    """Returns the database file currently in use."""
+    return DB_PATH
+
+
+def _configure(conn):
+    """Applies the per-connection PRAGMAs once, right after the connection is opened."""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    # A negative cache_size is interpreted by SQLite as KiB rather than pages
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+
+def get_connection(db_path=None):
+    """
+    Returns the calling thread's connection to the database, opening and configuring it on first use.
+    The connection is kept open and reused, so callers must not close it.
+    Statements are prepared once per connection and reused through sqlite3's statement cache.
+    """
+    path = db_path or DB_PATH
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(
+            path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        _configure(conn)
+        connections[path] = conn
+    return conn
+
+
+def _undo(conn, savepoint):
+    if savepoint:
+        conn.execute(f"ROLLBACK TO {savepoint}")
+        conn.execute(f"RELEASE {savepoint}")
+    else:
+        conn.rollback()
+
+
+@contextmanager
+def transaction(db_path=None, rollback=False):
+    """
+    Yields the thread's connection inside a transaction.
+    Commits on success and rolls back on error. Nested use joins the outer transaction as a
+    savepoint, so only the outermost block commits, and an error rolls back just the nested block.
+    With rollback=True the block's writes are discarded when it ends, even on success (a dry run:
+    later statements in the block still see the earlier ones).
+    """
+    conn = get_connection(db_path)
+    depth = getattr(_local, 'tx_depth', 0)
+    savepoint = f"tx_{depth}" if depth else None
+    if savepoint:
+        # A savepoint outside BEGIN would start (and on release commit) a transaction of its own
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        conn.execute(f"SAVEPOINT {savepoint}")
+    _local.tx_depth = depth + 1
+    try:
+        yield conn
+        if rollback:
+            _undo(conn, savepoint)
+        elif savepoint:
+            conn.execute(f"RELEASE {savepoint}")
+        else:
+            conn.commit()
+    except Exception:
+        _undo(conn, savepoint)
+        raise
+    finally:
+        _local.tx_depth = depth
+
+
+def close_connection(db_path=None):
+    """Closes the calling thread's connection (e.g. before deleting or replacing the database file)."""
+    path = db_path or DB_PATH
+    connections = getattr(_local, 'connections', {})
+    conn = connections.pop(path, None)
+    if conn is not None:
+        conn.close()
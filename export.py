@@ -0,0 +1,104 @@
+"""
+Streaming export of the pipeline catalog for the Databricks framework.
+
+Each pipeline is exported as one nested record: the header fields plus its
+'l0_details' and 'pb_details' rows. Records are streamed from
+database.iter_pipeline_records(), so memory stays bounded for any catalog size.
+
+Formats:
+    ndjson - one JSON record per line
+    json   - a single JSON array
+    csv    - one row per pipeline; l0_details / pb_details are JSON-encoded columns
+
+Usage: python export.py [--format ndjson|json|csv] [--layer L0] [--unit sales]
+                        [--active Y] [--updated-since "2024-01-01 00:00:00"] [-o FILE]
+"""
+import argparse
+import csv
+import json
+import sys
+
+import database
+
+DETAIL_KEYS = ['l0_details', 'pb_details']
+
+
+def _write_ndjson(records, out):
+    for record in records:
+        out.write(json.dumps(record, default=str))
+        out.write("\n")
+
+
+def _write_json(records, out):
+    out.write("[")
+    for i, record in enumerate(records):
+        out.write(",\n" if i else "\n")
+        out.write(json.dumps(record, default=str))
+    out.write("\n]\n")
+
+
+def _write_csv(records, out):
+    columns = database.get_table_columns('data_flow_control_header') + DETAIL_KEYS
+    writer = csv.DictWriter(out, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        for key in DETAIL_KEYS:
+            record[key] = json.dumps(record[key], default=str)
+        writer.writerow(record)
+
+
+WRITERS = {
+    "ndjson": _write_ndjson,
+    "json": _write_json,
+    "csv": _write_csv,
+}
+
+
+def export_catalog(out, file_format="ndjson", filters=None, batch_size=500):
+    """
+    Writes the (optionally filtered) catalog to the text stream `out`.
+    filters uses the database filter keys: ETL_LAYER, BUSINESS_UNIT, IS_ACTIVE, UPDATED_SINCE, ...
+    Returns the number of pipelines written.
+    """
+    if file_format not in WRITERS:
+        raise ValueError(f"Unsupported export format '{file_format}'. Supported formats: {', '.join(WRITERS)}.")
+
+    count = 0
+
+    def counted(records):
+        nonlocal count
+        for record in records:
+            count += 1
+            yield record
+
+    WRITERS[file_format](counted(database.iter_pipeline_records(filters, batch_size)), out)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the pipeline catalog.")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="ndjson")
+    parser.add_argument("--layer", help="ETL_LAYER filter, e.g. L0")
+    parser.add_argument("--unit", help="BUSINESS_UNIT filter")
+    parser.add_argument("--active", choices=["Y", "N"], help="IS_ACTIVE filter")
+    parser.add_argument("--updated-since", help="Only pipelines with UPDATED_TS >= this timestamp")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    database.init_db()
+    filters = {
+        'ETL_LAYER': args.layer,
+        'BUSINESS_UNIT': args.unit,
+        'IS_ACTIVE': args.active,
+        'UPDATED_SINCE': args.updated_since,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            count = export_catalog(out, args.format, filters)
+    else:
+        count = export_catalog(sys.stdout, args.format, filters)
+    print(f"Exported {count} pipelines.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
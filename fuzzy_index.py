@@ -0,0 +1,222 @@
+"""
+Typo-tolerant pipeline lookup with an in-memory trigram index.
+
+Every name a pipeline can be looked up by (its DATA_FLOW_GROUP_ID, business object name and
+source/target object names, see database.get_pipeline_names()) is split into trigrams.
+A query is ranked by trigram similarity (shared / union of the two trigram sets, as in
+PostgreSQL's pg_trgm), so 'custmer_sales_etl_01' still finds customer_sales_etl_001.
+
+Names get integer ids and each trigram keeps an array of the ids containing it. A lookup
+concatenates the arrays of the query's trigrams and counts shared trigrams for all names at
+once with numpy.bincount, which keeps lookups well under 10 ms at 100k pipelines.
+
+The index is built once per process and then updated incrementally from the catalog
+change log (database.get_changes_since()): only the pipelines saved or deleted since the
+last lookup are re-read. Removed names are only marked dead; the index is rebuilt once
+dead names outnumber live ones.
+
+Usage: python fuzzy_index.py [N]   - benchmark build and lookup over N synthetic pipelines
+"""
+import argparse
+import random
+import threading
+import time
+from array import array
+
+import numpy as np
+
+import database
+
+DEFAULT_THRESHOLD = 0.3
+# A lookup result this similar is taken as the intended pipeline (e.g. by the AI assistant)
+AUTO_MATCH_SIMILARITY = 0.6
+# More changes than this since the last lookup and the index is rebuilt from scratch
+MAX_INCREMENTAL_CHANGES = 5000
+
+
+def trigrams(text):
+    """Returns the set of trigrams of a name, padded like pg_trgm so short names and word starts count."""
+    padded = f"  {text.lower().strip()} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def new_index():
+    return {
+        'version': None,
+        'name_ids': {},            # live name (lowercase) -> name id
+        'names': [],               # name id -> name (lowercase)
+        'name_sizes': array('i'),  # name id -> number of trigrams
+        'alive': bytearray(),      # name id -> 1 while some pipeline uses the name
+        'dead': 0,                 # number of dead name ids
+        'postings': {},            # trigram -> array of name ids
+        'name_pipelines': [],      # name id -> {DATA_FLOW_GROUP_ID: original spelling}
+        'pipeline_names': {},      # DATA_FLOW_GROUP_ID -> set of name ids
+    }
+
+
+def remove_pipeline(index, pipeline_id):
+    """Drops a pipeline; names no other pipeline uses are marked dead."""
+    for name_id in index['pipeline_names'].pop(pipeline_id, ()):
+        pipelines = index['name_pipelines'][name_id]
+        pipelines.pop(pipeline_id, None)
+        if not pipelines:
+            index['alive'][name_id] = 0
+            index['dead'] += 1
+            del index['name_ids'][index['names'][name_id]]
+
+
+def add_pipeline(index, pipeline_id, names):
+    """Adds (or replaces) a pipeline with the names it can be looked up by."""
+    remove_pipeline(index, pipeline_id)
+    name_ids = set()
+    for name in names:
+        key = name.lower().strip()
+        if not key:
+            continue
+        name_id = index['name_ids'].get(key)
+        if name_id is None:
+            name_id = index['name_ids'][key] = len(index['name_sizes'])
+            grams = trigrams(key)
+            index['names'].append(key)
+            index['name_sizes'].append(len(grams))
+            index['alive'].append(1)
+            index['name_pipelines'].append({})
+            for trigram in grams:
+                index['postings'].setdefault(trigram, array('i')).append(name_id)
+        index['name_pipelines'][name_id][pipeline_id] = name
+        name_ids.add(name_id)
+    index['pipeline_names'][pipeline_id] = name_ids
+
+
+def build_index(pipeline_names, version=None):
+    """Builds an index from {DATA_FLOW_GROUP_ID: names}."""
+    index = new_index()
+    index['version'] = version
+    for pipeline_id, names in pipeline_names.items():
+        add_pipeline(index, pipeline_id, names)
+    return index
+
+
+def lookup(index, text, limit=10, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns up to `limit` pipelines with a name at least `threshold` similar to `text`, best first:
+    [{'DATA_FLOW_GROUP_ID': 'customer_sales_etl_001', 'name': 'customer_sales_etl_001', 'similarity': 0.71}]
+    """
+    if not text.strip():
+        return []
+    query = trigrams(text)
+    arrays = [np.frombuffer(index['postings'][trigram], dtype=np.int32) for trigram in query if trigram in index['postings']]
+    if not arrays:
+        return []
+
+    name_count = len(index['name_sizes'])
+    shared = np.bincount(np.concatenate(arrays), minlength=name_count)
+    sizes = np.frombuffer(index['name_sizes'], dtype=np.int32)
+    similarity = shared / (len(query) + sizes - shared)
+    similarity[np.frombuffer(index['alive'], dtype=np.uint8) == 0] = 0
+    del arrays, sizes
+
+    candidates = np.flatnonzero(similarity >= threshold)
+    candidates = candidates[np.argsort(-similarity[candidates], kind='stable')]
+
+    results = []
+    seen = set()
+    for name_id in candidates:
+        for pipeline_id, spelling in sorted(index['name_pipelines'][name_id].items()):
+            if pipeline_id in seen:
+                continue
+            seen.add(pipeline_id)
+            results.append({'DATA_FLOW_GROUP_ID': pipeline_id, 'name': spelling,
+                            'similarity': round(float(similarity[name_id]), 3)})
+            if len(results) == limit:
+                return results
+    return results
+
+
+_index = None
+# Guards the index: lookups read the trigram arrays through numpy buffers, which must not grow meanwhile
+_index_lock = threading.Lock()
+
+
+def _sync_index():
+    """Brings the process-wide index up to the current catalog version. Call with _index_lock held."""
+    global _index
+    version = database.get_catalog_version()
+    if _index is None:
+        _index = build_index(database.get_pipeline_names(), version)
+    elif _index['version'] != version:
+        changes = database.get_changes_since(_index['version'], limit=MAX_INCREMENTAL_CHANGES + 1)
+        if len(changes) > MAX_INCREMENTAL_CHANGES or _index['dead'] > len(_index['name_ids']):
+            _index = build_index(database.get_pipeline_names(), version)
+        elif not changes:
+            # Versions with no change left in the log (pruned) have nothing to apply
+            _index['version'] = version
+        else:
+            changed_ids = {change['DATA_FLOW_GROUP_ID'] for change in changes}
+            names = database.get_pipeline_names(changed_ids)
+            for pipeline_id in changed_ids:
+                if pipeline_id in names:
+                    add_pipeline(_index, pipeline_id, names[pipeline_id])
+                else:
+                    remove_pipeline(_index, pipeline_id)
+            _index['version'] = changes[-1]['VERSION']
+    return _index
+
+
+def find_pipelines(text, limit=10, threshold=DEFAULT_THRESHOLD):
+    """Similarity-ranked lookup of pipelines by (possibly mistyped) ID or object name."""
+    with _index_lock:
+        return lookup(_sync_index(), text, limit, threshold)
+
+
+def _typo(text, rng):
+    """Drops, doubles or swaps one character."""
+    i = rng.randrange(len(text) - 1)
+    edit = rng.choice(['drop', 'double', 'swap'])
+    if edit == 'drop':
+        return text[:i] + text[i + 1:]
+    if edit == 'double':
+        return text[:i] + text[i] + text[i:]
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def benchmark(count=100_000, lookups=200):
+    """Times a build, lookups of mistyped IDs and an incremental update over `count` synthetic pipelines."""
+    rng = random.Random(42)
+    units = ['customer', 'sales', 'finance', 'inventory', 'marketing', 'supply', 'hr', 'billing']
+    pipelines = {}
+    for i in range(count):
+        pipeline_id = f"{rng.choice(units)}_{rng.choice(units)}_etl_{i:06d}"
+        pipelines[pipeline_id] = {pipeline_id, f"GBL_{rng.choice(units).upper()}_{i % 5000}", f"DIM_{rng.choice(units).upper()}"}
+
+    start = time.perf_counter()
+    index = build_index(pipelines)
+    print(f"build: {count} pipelines in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    targets = rng.sample(sorted(pipelines), lookups)
+    timings = []
+    found = 0
+    for target in targets:
+        start = time.perf_counter()
+        results = lookup(index, _typo(target, rng), limit=5)
+        timings.append((time.perf_counter() - start) * 1000)
+        found += any(result['DATA_FLOW_GROUP_ID'] == target for result in results)
+    timings.sort()
+    print(f"lookup: {lookups} mistyped IDs, median {timings[len(timings) // 2]:.2f} ms, "
+          f"p95 {timings[int(len(timings) * 0.95)]:.2f} ms, max {timings[-1]:.2f} ms, "
+          f"intended pipeline in top 5: {found}/{lookups}")
+
+    start = time.perf_counter()
+    add_pipeline(index, targets[0], {targets[0], "GBL_RENAMED_OBJECT"})
+    print(f"incremental update of one pipeline: {(time.perf_counter() - start) * 1000:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the trigram pipeline lookup.")
+    parser.add_argument("count", type=int, nargs="?", default=100_000, help="Number of synthetic pipelines")
+    args = parser.parse_args()
+    benchmark(args.count)
+
+
+if __name__ == "__main__":
+    main()
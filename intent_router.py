@@ -0,0 +1,196 @@
+"""
+Local routing of the AI assistant's lookup commands.
+
+route() recognizes the 'list pipelines' and 'show details / view / look up' command phrases and,
+for the latter, resolves the pipeline the user named without calling the model:
+    exact  - a word of the message is an existing DATA_FLOW_GROUP_ID (case-insensitive)
+    prefix - a word is the start of exactly one ID ('customer_sales_e' -> customer_sales_etl_001)
+    fuzzy  - the trigram index (fuzzy_index) finds one clearly best match at AUTO_MATCH_SIMILARITY,
+             by ID or object name, so typos still resolve; only the word right after the command
+             ('view custmer_sales', 'look up the \'orders\' pipeline') is looked up this way, so an
+             unrelated word elsewhere in the message never opens a pipeline
+When nothing or more than one pipeline fits, the message is left to the model, as before.
+
+The IDs are kept in memory as a dict and a sorted list (for prefix ranges). The index is built
+once per process and then updated from the catalog change log, like fuzzy_index.
+"""
+import re
+import threading
+from bisect import bisect_left, insort
+
+import database
+import fuzzy_index
+
+# The assistant's command phrases (see SYSTEM_PROMPTS in prompts), matched as whole words
+LIST_PHRASES = ["show table", "display all pipelines", "list pipelines"]
+DETAIL_PHRASES = ["show details", "view", "look up", "get details"]
+# Words of a lookup request that are never part of an ID
+STOPWORDS = {
+    "show", "details", "detail", "get", "view", "look", "up", "lookup", "for", "of", "the", "a", "an", "me",
+    "please", "pipeline", "pipelines", "id", "with", "called", "named", "about", "on", "info", "data", "flow",
+    "group", "can", "you", "i", "want", "to", "see", "what", "is", "and", "my", "that", "this", "it",
+}
+MAX_CANDIDATES = 5
+# A fuzzy match is only taken when it beats the runner-up by this much
+FUZZY_MARGIN = 0.1
+# More changes than this since the last sync and the ID index is rebuilt from scratch
+MAX_INCREMENTAL_CHANGES = 5000
+
+_LIST_PATTERN = re.compile(r"\b(?:" + "|".join(map(re.escape, LIST_PHRASES)) + r")\b", re.IGNORECASE)
+_DETAIL_PATTERN = re.compile(r"\b(?:" + "|".join(map(re.escape, DETAIL_PHRASES)) + r")\b", re.IGNORECASE)
+_QUOTED = re.compile(r"[`'\"]([^`'\"\s]+)[`'\"]")
+_WORD = re.compile(r"[\w.$-]+")
+
+_index = None
+_index_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {'exact': 0, 'prefix': 0, 'fuzzy': 0, 'unresolved': 0}
+
+
+def _add(index, pipeline_id):
+    key = pipeline_id.lower()
+    if key not in index['ids']:
+        insort(index['sorted'], key)
+    index['ids'][key] = pipeline_id
+
+
+def _remove(index, pipeline_id):
+    key = pipeline_id.lower()
+    if index['ids'].get(key) == pipeline_id:
+        del index['ids'][key]
+        del index['sorted'][bisect_left(index['sorted'], key)]
+
+
+def build_index(pipeline_ids, version=None):
+    """Builds the ID index: {'version', 'ids': {lowercase ID: ID}, 'sorted': [lowercase IDs]}."""
+    ids = {pipeline_id.lower(): pipeline_id for pipeline_id in pipeline_ids if pipeline_id}
+    return {'version': version, 'ids': ids, 'sorted': sorted(ids)}
+
+
+def _sync_index():
+    """Brings the process-wide ID index up to the current catalog version. Call with _index_lock held."""
+    global _index
+    version = database.get_catalog_version()
+    if _index is None:
+        _index = build_index(database.get_pipeline_ids(), version)
+    elif _index['version'] != version:
+        changes = database.get_changes_since(_index['version'], limit=MAX_INCREMENTAL_CHANGES + 1)
+        if len(changes) > MAX_INCREMENTAL_CHANGES:
+            _index = build_index(database.get_pipeline_ids(), version)
+        elif not changes:
+            # Versions with no change left in the log (pruned) have nothing to apply
+            _index['version'] = version
+        else:
+            # Only header rows create or remove IDs
+            changed_ids = {change['DATA_FLOW_GROUP_ID'] for change in changes if change['TABLE_NAME'] == 'data_flow_control_header'}
+            existing = set(database.get_pipeline_ids(changed_ids))
+            for pipeline_id in changed_ids:
+                (_add if pipeline_id in existing else _remove)(_index, pipeline_id)
+            _index['version'] = changes[-1]['VERSION']
+    return _index
+
+
+def _prefix_matches(index, prefix, limit):
+    """IDs starting with prefix (lowercase), at most `limit` of them."""
+    matches = []
+    position = bisect_left(index['sorted'], prefix)
+    while position < len(index['sorted']) and index['sorted'][position].startswith(prefix) and len(matches) < limit:
+        matches.append(index['ids'][index['sorted'][position]])
+        position += 1
+    return matches
+
+
+def candidate_words(text):
+    """Words of a message that may name a pipeline: quoted ones first, then ID-like ones (with _ . - or digits)."""
+    quoted = _QUOTED.findall(text)
+    words = [word.strip('.-') for word in _WORD.findall(text)]
+    words = [word for word in words if len(word) >= 2 and word.lower() not in STOPWORDS]
+    words.sort(key=lambda word: not re.search(r"[_.\-$\d]", word))
+    return list(dict.fromkeys(quoted + words))
+
+
+def command_target(text):
+    """The word naming the pipeline in a lookup command: the first one after the command phrase that is not a stopword."""
+    command = _DETAIL_PATTERN.search(text or '')
+    if command is None:
+        return None
+    for word in _WORD.findall(text[command.end():]):
+        word = word.strip('.-')
+        if len(word) >= 2 and word.lower() not in STOPWORDS:
+            return word
+    return None
+
+
+def resolve(text):
+    """
+    Finds the pipeline a lookup message names. Returns
+    {'pipeline_id': 'customer_sales_etl_001' or None, 'match': 'exact' | 'prefix' | 'fuzzy' | None,
+     'query': the word that matched, 'candidates': [IDs that fit, when not exactly one]}
+    """
+    words = candidate_words(text)
+    candidates = []
+    with _index_lock:
+        index = _sync_index()
+        for word in words:
+            pipeline_id = index['ids'].get(word.lower())
+            if pipeline_id:
+                return _resolved(pipeline_id, 'exact', word)
+        for word in words:
+            if len(word) < 3:
+                continue
+            matches = _prefix_matches(index, word.lower(), MAX_CANDIDATES + 1)
+            if len(matches) == 1:
+                return _resolved(matches[0], 'prefix', word)
+            candidates.extend(matches[:MAX_CANDIDATES])
+
+    target = command_target(text)
+    matches = fuzzy_index.find_pipelines(target, limit=2) if target and len(target) >= 3 else []
+    if matches:
+        best = matches[0]
+        clear_winner = len(matches) == 1 or best['similarity'] - matches[1]['similarity'] >= FUZZY_MARGIN
+        if best['similarity'] >= fuzzy_index.AUTO_MATCH_SIMILARITY and clear_winner:
+            return _resolved(best['DATA_FLOW_GROUP_ID'], 'fuzzy', target)
+        candidates.extend(match['DATA_FLOW_GROUP_ID'] for match in matches)
+
+    _count('unresolved')
+    return {'pipeline_id': None, 'match': None, 'query': None, 'candidates': list(dict.fromkeys(candidates))[:MAX_CANDIDATES]}
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def _resolved(pipeline_id, match, word):
+    _count(match)
+    return {'pipeline_id': pipeline_id, 'match': match, 'query': word, 'candidates': [pipeline_id]}
+
+
+def detect_intent(text):
+    """'list' for a list-pipelines command, 'show_details' for a lookup, None for anything else."""
+    if _LIST_PATTERN.search(text or ''):
+        return 'list'
+    if _DETAIL_PATTERN.search(text or ''):
+        return 'show_details'
+    return None
+
+
+def route(text):
+    """
+    Routes an assistant message: {'intent': 'list' | 'show_details' | None, ...}, plus the result of
+    resolve() for a lookup. pipeline_id None on a lookup means it still needs the model.
+    """
+    intent = detect_intent(text)
+    routed = {'intent': intent, 'pipeline_id': None, 'match': None, 'query': None, 'candidates': []}
+    if intent == 'show_details':
+        routed.update(resolve(text))
+    return routed
+
+
+def get_stats():
+    """Returns this process's lookup counters by how they were resolved, and the fraction resolved locally."""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = sum(stats.values())
+    stats['local_fraction'] = (total - stats['unresolved']) / total if total else 0.0
+    return stats
@@ -0,0 +1,252 @@
+"""
+Table-level lineage of the pipeline catalog.
+
+Every pipeline reads ('in') and writes ('out') objects, named SCHEMA.NAME in lower case:
+    L0 - lands its source object into the lake under the same name, so it writes
+         SOURCE_OBJ_SCHEMA.SOURCE_OBJ_NAME; tables referenced by its TRANSFORM_QUERY are read.
+    PB - writes TARGET_OBJ_SCHEMA.TARGET_OBJ_NAME and reads the tables its TRANSFORM_QUERY
+         references (FROM / JOIN); INSERT INTO / MERGE INTO targets count as writes.
+The edges are stored in the pipeline_lineage adjacency table. sync() keeps it current from
+the catalog change log, re-deriving only the pipelines changed since the last sync, so every
+save is picked up whichever session, process or bulk import made it.
+
+downstream()/upstream() walk the graph breadth-first, one indexed query per hop and
+direction, so their cost is proportional to the edges visited, not the catalog size.
+
+Usage: python lineage.py OBJECT_OR_PIPELINE [--upstream] [--depth N]
+"""
+import argparse
+import re
+import threading
+
+import database
+from db_connection import get_connection, transaction
+
+CONSUMER_NAME = 'lineage'
+# More changes than this since the last sync and the lineage is rebuilt from scratch
+MAX_INCREMENTAL_CHANGES = 5000
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_IDENTIFIER = r"[`\"\[]?[\w${}]+[`\"\]]?"
+_TABLE_NAME = rf"({_IDENTIFIER}(?:\s*\.\s*{_IDENTIFIER}){{0,2}})"
+# DELETE FROM is matched too, so it can be told apart from a read
+_READS = re.compile(rf"\b(delete\s+)?(?:from|join)\s+{_TABLE_NAME}", re.IGNORECASE)
+_SUBQUERY_START = re.compile(r"\s*(?:select|with)\b", re.IGNORECASE)
+_WRITES = re.compile(rf"\b(?:insert\s+(?:into|overwrite)(?:\s+table)?|merge\s+into)\s+{_TABLE_NAME}", re.IGNORECASE)
+_CTE_NAMES = re.compile(r"(?:\bwith|,)\s*(\w+)\s+as\s*\(", re.IGNORECASE)
+
+_sync_lock = threading.Lock()
+
+
+def normalize_object_name(name):
+    """Lower-cases an object name, strips quoting and keeps at most SCHEMA.NAME (drops a catalog prefix)."""
+    parts = [part.strip().strip('`"[]').lower() for part in str(name).split('.')]
+    parts = [part for part in parts if part]
+    return '.'.join(parts[-2:])
+
+
+def _in_function_arguments(sql):
+    """
+    Per character of sql, whether its innermost parentheses hold something other than a subquery:
+    function arguments such as EXTRACT(year FROM col) or TRIM(BOTH ' ' FROM x), where FROM names no table.
+    """
+    flags = []
+    stack = []
+    for position, char in enumerate(sql):
+        if char == '(':
+            stack.append(not _SUBQUERY_START.match(sql, position + 1))
+        elif char == ')' and stack:
+            stack.pop()
+        flags.append(bool(stack) and stack[-1])
+    return flags
+
+
+def parse_table_references(sql):
+    """Returns (reads, writes): the sets of object names a SQL text reads from and writes to."""
+    if not sql:
+        return set(), set()
+    sql = _STRINGS.sub("''", _COMMENTS.sub(" ", sql))
+    ctes = {name.lower() for name in _CTE_NAMES.findall(sql)}
+    in_function = _in_function_arguments(sql)
+    reads = {
+        normalize_object_name(match.group(2)) for match in _READS.finditer(sql)
+        if not match.group(1) and not in_function[match.start()]
+    }
+    writes = {normalize_object_name(name) for name in _WRITES.findall(sql)}
+    # 'FROM (' subqueries match nothing; CTEs are not objects
+    reads = {name for name in reads if name and name not in ctes}
+    writes = {name for name in writes if name and name not in ctes}
+    return reads, writes
+
+
+def _object_name(schema, name):
+    return normalize_object_name(f"{schema}.{name}" if schema else name) if name else None
+
+
+def pipeline_edges(pipeline):
+    """Returns the set of (DIRECTION, OBJECT_NAME) edges of a pipeline record (see database.get_pipelines_by_ids())."""
+    reads, writes = set(), set()
+    for row in pipeline.get('l0_details') or []:
+        writes.add(_object_name(row.get('SOURCE_OBJ_SCHEMA'), row.get('SOURCE_OBJ_NAME')))
+        query_reads, query_writes = parse_table_references(row.get('TRANSFORM_QUERY'))
+        reads |= query_reads
+        writes |= query_writes
+    for row in pipeline.get('pb_details') or []:
+        writes.add(_object_name(row.get('TARGET_OBJ_SCHEMA'), row.get('TARGET_OBJ_NAME')))
+        query_reads, query_writes = parse_table_references(row.get('TRANSFORM_QUERY'))
+        reads |= query_reads
+        writes |= query_writes
+    writes.discard(None)
+    # A pipeline reading back what it writes (e.g. MERGE INTO t ... FROM t) is not its own upstream
+    reads -= writes
+    return {('in', name) for name in reads} | {('out', name) for name in writes}
+
+
+def _replace_edges(conn, pipelines, removed_ids=()):
+    """Rewrites the edges of the given pipeline records and drops those of removed pipelines."""
+    ids = [pipeline['DATA_FLOW_GROUP_ID'] for pipeline in pipelines] + list(removed_ids)
+    conn.executemany("DELETE FROM pipeline_lineage WHERE DATA_FLOW_GROUP_ID = ?", [(pipeline_id,) for pipeline_id in ids])
+    conn.executemany(
+        "INSERT INTO pipeline_lineage (DATA_FLOW_GROUP_ID, DIRECTION, OBJECT_NAME) VALUES (?, ?, ?)",
+        [(pipeline['DATA_FLOW_GROUP_ID'], direction, name)
+         for pipeline in pipelines for direction, name in sorted(pipeline_edges(pipeline))]
+    )
+
+
+def _save_position(conn, version):
+    conn.execute(
+        "INSERT INTO change_log_consumers (NAME, VERSION) VALUES (?, ?)"
+        " ON CONFLICT (NAME) DO UPDATE SET VERSION = MAX(VERSION, excluded.VERSION)",
+        (CONSUMER_NAME, version)
+    )
+
+
+def sync():
+    """Brings pipeline_lineage up to the current catalog version. Returns the number of pipelines re-derived."""
+    with _sync_lock:
+        conn = get_connection()
+        version = database.get_catalog_version()
+        row = conn.execute("SELECT VERSION FROM change_log_consumers WHERE NAME = ?", (CONSUMER_NAME,)).fetchone()
+        position = row[0] if row else 0
+        if position >= version:
+            return 0
+
+        changes = database.get_changes_since(position, limit=MAX_INCREMENTAL_CHANGES + 1)
+        if len(changes) > MAX_INCREMENTAL_CHANGES:
+            count = 0
+            with transaction() as conn:
+                conn.execute("DELETE FROM pipeline_lineage")
+                batch = []
+                for pipeline in database.iter_pipeline_records():
+                    batch.append(pipeline)
+                    if len(batch) == 500:
+                        _replace_edges(conn, batch)
+                        count += len(batch)
+                        batch = []
+                _replace_edges(conn, batch)
+                _save_position(conn, version)
+            return count + len(batch)
+
+        if not changes:
+            # Versions with no change left in the log (pruned) have nothing to re-derive
+            with transaction() as conn:
+                _save_position(conn, version)
+            return 0
+
+        changed_ids = {change['DATA_FLOW_GROUP_ID'] for change in changes}
+        pipelines = database.get_pipelines_by_ids(changed_ids)
+        with transaction() as conn:
+            _replace_edges(conn, list(pipelines.values()), changed_ids - set(pipelines))
+            _save_position(conn, changes[-1]['VERSION'])
+        return len(changed_ids)
+
+
+def _neighbours(conn, direction, by_column, values):
+    """Edges of `direction` whose `by_column` is in values, as (by_value, other_value) pairs."""
+    other_column = 'DATA_FLOW_GROUP_ID' if by_column == 'OBJECT_NAME' else 'OBJECT_NAME'
+    values = list(values)
+    pairs = []
+    for start in range(0, len(values), database.ID_BATCH_SIZE):
+        chunk = values[start:start + database.ID_BATCH_SIZE]
+        pairs.extend(conn.execute(
+            f"SELECT {by_column}, {other_column} FROM pipeline_lineage"
+            f" WHERE DIRECTION = ? AND {by_column} IN ({', '.join('?' * len(chunk))})",
+            [direction] + chunk
+        ).fetchall())
+    return pairs
+
+
+def _walk(start, downstream, max_depth):
+    """
+    Breadth-first walk from objects or pipelines named in `start`.
+    Downstream: object -> pipelines reading it -> objects they write -> ...
+    Upstream:   object -> pipelines writing it -> objects they read -> ...
+    """
+    sync()
+    conn = get_connection()
+    to_pipelines, from_pipelines = ('in', 'out') if downstream else ('out', 'in')
+
+    start = [name for name in start if name]
+    known_pipelines = set(database.get_pipeline_ids(start)) if start else set()
+    objects = {normalize_object_name(name): 0 for name in start if name not in known_pipelines}
+    pipelines = {pipeline_id: 0 for pipeline_id in known_pipelines}
+    edges = []
+
+    object_frontier = set(objects)
+    pipeline_frontier = set(pipelines)
+    depth = 0
+    while (object_frontier or pipeline_frontier) and (max_depth is None or depth < max_depth):
+        depth += 1
+        # Objects -> the pipelines reading (downstream) or writing (upstream) them
+        for object_name, pipeline_id in _neighbours(conn, to_pipelines, 'OBJECT_NAME', object_frontier):
+            edges.append({'DEPTH': depth, 'FROM': object_name, 'TO': pipeline_id, 'TYPE': 'object -> pipeline'})
+            if pipeline_id not in pipelines:
+                pipelines[pipeline_id] = depth
+                pipeline_frontier.add(pipeline_id)
+        # Pipelines -> the objects they write (downstream) or read (upstream)
+        object_frontier = set()
+        for pipeline_id, object_name in _neighbours(conn, from_pipelines, 'DATA_FLOW_GROUP_ID', pipeline_frontier):
+            edges.append({'DEPTH': depth, 'FROM': pipeline_id, 'TO': object_name, 'TYPE': 'pipeline -> object'})
+            if object_name not in objects:
+                objects[object_name] = depth
+                object_frontier.add(object_name)
+        pipeline_frontier = set()
+
+    if not downstream:
+        for edge in edges:
+            edge['FROM'], edge['TO'] = edge['TO'], edge['FROM']
+            edge['TYPE'] = ' -> '.join(reversed(edge['TYPE'].split(' -> ')))
+    return {'objects': objects, 'pipelines': pipelines, 'edges': edges}
+
+
+def downstream(*start, max_depth=None):
+    """
+    Everything affected by a change to the given objects (SCHEMA.NAME) or pipelines (DATA_FLOW_GROUP_ID):
+    {'objects': {name: depth}, 'pipelines': {id: depth}, 'edges': [{'DEPTH', 'FROM', 'TO', 'TYPE'}]}
+    """
+    return _walk(start, True, max_depth)
+
+
+def upstream(*start, max_depth=None):
+    """Everything the given objects or pipelines are derived from; same shape as downstream()."""
+    return _walk(start, False, max_depth)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the lineage of an object or pipeline.")
+    parser.add_argument("start", nargs="+", help="SCHEMA.NAME of an object, or a DATA_FLOW_GROUP_ID")
+    parser.add_argument("--upstream", action="store_true", help="Walk upstream instead of downstream")
+    parser.add_argument("--depth", type=int, help="Maximum number of hops")
+    args = parser.parse_args()
+
+    database.init_db()
+    walk = upstream if args.upstream else downstream
+    result = walk(*args.start, max_depth=args.depth)
+    for edge in result['edges']:
+        print(f"{edge['DEPTH']}  {edge['FROM']} -> {edge['TO']}")
+    print(f"{len(result['pipelines'])} pipelines, {len(result['objects'])} objects")
+
+
+if __name__ == "__main__":
+    main()
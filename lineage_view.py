@@ -0,0 +1,92 @@
+import streamlit as st
+import lineage
+
+# Graphs with more edges than this are listed but not drawn
+MAX_GRAPH_EDGES = 200
+
+
+def _dot_id(name):
+    """A name as a quoted DOT ID: backslashes and quotes escaped, line breaks kept as DOT's \\n."""
+    escaped = str(name).replace('\\', '\\\\').replace('"', '\\"').replace('\r', '').replace('\n', '\\n')
+    return f'"{escaped}"'
+
+
+def lineage_dot(result):
+    """Builds a Graphviz DOT graph of a lineage walk: boxes are pipelines, ellipses are objects."""
+    lines = ["digraph lineage {", "  rankdir=LR;", '  node [fontsize=10];']
+    for name in result['objects']:
+        lines.append(f'  {_dot_id(name)} [shape=ellipse];')
+    for pipeline_id in result['pipelines']:
+        lines.append(f'  {_dot_id(pipeline_id)} [shape=box, style=filled, fillcolor="#dbeafe"];')
+    for edge in result['edges']:
+        lines.append(f'  {_dot_id(edge["FROM"])} -> {_dot_id(edge["TO"])};')
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def show():
+    """
+    Displays the lineage view: what is downstream of (affected by) or upstream of (feeding)
+    an object or pipeline.
+    """
+    st.subheader("🧬 Table Lineage")
+
+    if 'lineage_table_key' not in st.session_state:
+        st.session_state.lineage_table_key = 0
+
+    col1, col2, col3 = st.columns([4, 2, 1])
+    with col1:
+        start = st.text_input(
+            "Object (SCHEMA.NAME) or pipeline ID",
+            placeholder="e.g., GBL.GBL_CUSTOMER",
+            key="lineage_start"
+        ).strip()
+    with col2:
+        direction = st.radio("Direction", ["Downstream impact", "Upstream sources"], horizontal=True, key="lineage_direction")
+    with col3:
+        max_depth = st.number_input("Max hops (0 = all)", min_value=0, value=0, step=1, key="lineage_depth")
+
+    if not start:
+        st.info("Enter a table or pipeline to see what depends on it, or what it is built from.")
+        return
+
+    walk = lineage.downstream if direction == "Downstream impact" else lineage.upstream
+    result = walk(start, max_depth=max_depth or None)
+
+    if not result['edges']:
+        st.info(f"No lineage found for `{start}`.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Pipelines", len(result['pipelines']))
+    col2.metric("Objects", len(result['objects']))
+    col3.metric("Hops", max(edge['DEPTH'] for edge in result['edges']))
+
+    if len(result['edges']) <= MAX_GRAPH_EDGES:
+        st.graphviz_chart(lineage_dot(result))
+    else:
+        st.caption(f"{len(result['edges'])} edges: too many to draw, see the lists below.")
+
+    # --- Affected pipelines; selecting one opens it in the editor ---
+    st.write("Pipelines")
+    pipelines = [{"Pipeline": pipeline_id, "Hops": depth} for pipeline_id, depth in sorted(result['pipelines'].items(), key=lambda item: (item[1], item[0]))]
+    event = st.dataframe(
+        pipelines,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"lineage_pipelines_{st.session_state.lineage_table_key}",
+    )
+    if event.selection.rows:
+        # A new table key drops the selection, so coming back to this view does not reopen it
+        st.session_state.lineage_table_key += 1
+        st.session_state.edit_pipeline_id = pipelines[event.selection.rows[0]]["Pipeline"]
+        st.session_state.form_visible = True
+        st.session_state.current_view = 'add_edit'
+        st.rerun()
+
+    with st.expander("Edges"):
+        st.dataframe(
+            [{"Hops": edge['DEPTH'], "From": edge['FROM'], "To": edge['TO']} for edge in result['edges']],
+            hide_index=True,
+        )
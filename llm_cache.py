@@ -0,0 +1,139 @@
+"""
+Persistent cache of Gemini responses for the AI assistant.
+
+A response is stored under a content address: the SHA-256 of the model name, the system prompt,
+the user input and the call's generation_config (canonical JSON, so key order does not matter). A retried turn, a pasted-again spec or a repeated 'show details' request is
+then answered from the llm_response_cache table (migration 9) instead of another round trip to
+the model. Entries expire after TTL_SECONDS and, beyond MAX_ENTRIES, the least recently used ones
+are evicted. Because the system prompt and the generation config are part of the key, editing a
+prompt or a response schema never serves answers produced by the old one.
+
+The cache lives in the pipelines database, so it survives restarts and is shared by every session
+and process using that database. Only successful, non-empty responses are cached.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import llm_client
+from db_connection import get_connection, transaction
+
+# Entries older than this are not served (default: 7 days)
+TTL_SECONDS = int(os.getenv("PIPELINES_LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.getenv("PIPELINES_LLM_CACHE_ENTRIES", "5000"))
+# A hit only rewrites LAST_USED_TS (taking the write lock) when it is older than this; hits in
+# between are counted in memory and added to HIT_COUNT with the next refresh
+LAST_USED_REFRESH_SECONDS = int(os.getenv("PIPELINES_LLM_CACHE_REFRESH_SECONDS", "300"))
+
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+_pending_hits = {}
+
+
+def cache_key(model_name, system_prompt, user_input, generation_config=None):
+    """Content address of one model call. Calls without a generation_config keep their earlier keys."""
+    parts = [model_name, system_prompt, user_input]
+    if generation_config is not None:
+        parts.append(json.dumps(generation_config, sort_keys=True, default=str))
+    payload = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _count(name, amount=1):
+    with _lock:
+        _stats[name] += amount
+
+
+def get(key):
+    """
+    Returns the cached response text for a key, or None when it is missing or expired.
+    A hit is a plain read unless the entry's LAST_USED_TS is older than LAST_USED_REFRESH_SECONDS.
+    """
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT RESPONSE_TEXT, CREATED_TS, LAST_USED_TS FROM llm_response_cache WHERE CACHE_KEY = ?", (key,)
+    ).fetchone()
+    now = time.time()
+    if row is None:
+        return None
+    if now - row[1] > TTL_SECONDS:
+        with transaction() as conn:
+            conn.execute("DELETE FROM llm_response_cache WHERE CACHE_KEY = ?", (key,))
+        with _lock:
+            _pending_hits.pop(key, None)
+        _count('expired')
+        return None
+    with _lock:
+        hits = _pending_hits.pop(key, 0) + 1
+        if now - row[2] < LAST_USED_REFRESH_SECONDS:
+            _pending_hits[key] = hits
+            return row[0]
+    with transaction() as conn:
+        conn.execute(
+            "UPDATE llm_response_cache SET LAST_USED_TS = ?, HIT_COUNT = HIT_COUNT + ? WHERE CACHE_KEY = ?", (now, hits, key)
+        )
+    return row[0]
+
+
+def put(key, model_name, response_text):
+    """Stores a response, then drops expired entries and the least recently used ones over MAX_ENTRIES."""
+    now = time.time()
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO llm_response_cache (CACHE_KEY, MODEL_NAME, RESPONSE_TEXT, CREATED_TS, LAST_USED_TS)"
+            " VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (CACHE_KEY) DO UPDATE SET RESPONSE_TEXT = excluded.RESPONSE_TEXT,"
+            " CREATED_TS = excluded.CREATED_TS, LAST_USED_TS = excluded.LAST_USED_TS",
+            (key, model_name, response_text, now, now)
+        )
+        evicted = conn.execute("DELETE FROM llm_response_cache WHERE CREATED_TS < ?", (now - TTL_SECONDS,)).rowcount
+        evicted += conn.execute(
+            "DELETE FROM llm_response_cache WHERE CACHE_KEY IN"
+            " (SELECT CACHE_KEY FROM llm_response_cache ORDER BY LAST_USED_TS DESC LIMIT -1 OFFSET ?)",
+            (MAX_ENTRIES,)
+        ).rowcount
+    if evicted:
+        _count('evictions', evicted)
+
+
+def generate(model, system_prompt, user_input, use_cache=True, **call_options):
+    """
+    Returns the model's text for the user input (through llm_client.generate(), which takes
+    call_options: name, stream, on_text, cancel, deadline, generation_config), from the cache when an
+    identical call was answered before. A cached answer is passed to on_text in one piece.
+    The model carries system_prompt as its system instruction (prompts.get_stage_model()); it is
+    passed here only to key the cache. use_cache=False always calls the model and leaves the cache untouched.
+    """
+    if not use_cache:
+        return llm_client.generate(model, user_input, **call_options)
+
+    key = cache_key(model.model_name, system_prompt, user_input, call_options.get('generation_config'))
+    text = get(key)
+    if text is not None:
+        _count('hits')
+        if call_options.get('on_text'):
+            call_options['on_text'](text)
+        return text
+    _count('misses')
+    # Blocked or empty responses and failed calls raise, so they are never cached
+    text = llm_client.generate(model, user_input, **call_options)
+    if text and text.strip():
+        put(key, model.model_name, text)
+    return text
+
+
+def clear():
+    """Removes every cached response."""
+    with transaction() as conn:
+        conn.execute("DELETE FROM llm_response_cache")
+    with _lock:
+        _pending_hits.clear()
+
+
+def get_stats():
+    """Returns this process's hit/miss/expiry/eviction counters and the number of stored entries."""
+    entries = get_connection().execute("SELECT ENTRIES FROM llm_response_cache_size").fetchone()[0]
+    with _lock:
+        return dict(_stats, entries=entries)
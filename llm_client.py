@@ -0,0 +1,233 @@
+"""
+Gemini calls with deadlines, retries, cancellation and streaming.
+
+generate() wraps model.generate_content:
+    - every call has an overall deadline (DEFAULT_DEADLINE_SECONDS) and each attempt a timeout
+      (ATTEMPT_TIMEOUT_SECONDS, cut to what is left of the deadline), and a stream is checked
+      against the deadline between chunks, so a slow response never holds a session's script
+      thread for longer than the deadline;
+    - rate limits (429) and transient server / network errors are retried with full-jitter
+      exponential backoff, up to MAX_ATTEMPTS attempts within the deadline;
+    - a caller-supplied threading.Event cancels the call between stream chunks and during backoff;
+      in Streamlit, a rerun raised from the on_text callback abandons the stream the same way;
+    - with stream=True, on_text(text_so_far) is called as the response arrives, so partial output
+      can be shown before the call completes.
+Latency of every call (total and time to first text) and its input / output token counts (from
+the response's usage metadata) are recorded per call name; get_stats() reports percentiles and
+token totals alongside retry, timeout and failure counts, and counts the calls whose input went
+over PROMPT_TOKEN_BUDGET.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from google.api_core import exceptions as api_exceptions
+
+DEFAULT_DEADLINE_SECONDS = float(os.getenv("PIPELINES_LLM_DEADLINE_SECONDS", "60"))
+ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("PIPELINES_LLM_ATTEMPT_TIMEOUT_SECONDS", "30"))
+MAX_ATTEMPTS = int(os.getenv("PIPELINES_LLM_MAX_ATTEMPTS", "4"))
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+# Input tokens (system instruction + message) a call should stay within; see also prompts.py
+PROMPT_TOKEN_BUDGET = int(os.getenv("PIPELINES_PROMPT_TOKEN_BUDGET", "1500"))
+# Latencies kept per call name for the percentiles
+LATENCY_SAMPLES = 500
+
+# Rate limits, server-side failures and dropped connections: worth another attempt
+RETRYABLE_ERRORS = (
+    api_exceptions.TooManyRequests,  # includes ResourceExhausted (429)
+    api_exceptions.InternalServerError,
+    api_exceptions.BadGateway,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.GatewayTimeout,
+    api_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class LLMCallError(Exception):
+    """The model call failed: a non-retryable API error, retries exhausted, deadline passed or cancelled."""
+
+
+class LLMTimeout(LLMCallError):
+    """The overall deadline passed before the model answered."""
+
+
+class LLMCancelled(LLMCallError):
+    """The caller cancelled the call."""
+
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def _record(name, outcome, latency=None, first_text=None, retries=0, usage=None):
+    with _lock:
+        stats = _stats.setdefault(name, {
+            'calls': 0, 'succeeded': 0, 'failed': 0, 'timeouts': 0, 'cancelled': 0, 'retries': 0,
+            'input_tokens': 0, 'output_tokens': 0, 'cached_tokens': 0, 'max_input_tokens': 0, 'over_budget': 0,
+            'latencies': deque(maxlen=LATENCY_SAMPLES), 'first_text_latencies': deque(maxlen=LATENCY_SAMPLES),
+        })
+        stats['calls'] += 1
+        stats[outcome] += 1
+        stats['retries'] += retries
+        if usage:
+            stats['input_tokens'] += usage['input']
+            stats['output_tokens'] += usage['output']
+            stats['cached_tokens'] += usage['cached']
+            stats['max_input_tokens'] = max(stats['max_input_tokens'], usage['input'])
+            stats['over_budget'] += usage['input'] > PROMPT_TOKEN_BUDGET
+        if latency is not None:
+            stats['latencies'].append(latency)
+        if first_text is not None:
+            stats['first_text_latencies'].append(first_text)
+
+
+def _percentile(values, fraction):
+    """Nearest-rank percentile of a list of seconds, in milliseconds (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 1)
+
+
+def get_stats():
+    """
+    Returns per call name counters and latency percentiles (milliseconds), e.g.
+    {'header': {'calls': 12, 'succeeded': 11, 'failed': 0, 'timeouts': 1, 'cancelled': 0, 'retries': 3,
+                'input_tokens': 6820, 'output_tokens': 904, 'cached_tokens': 0, 'max_input_tokens': 731, 'over_budget': 0,
+                'p50_ms': 1830.2, 'p90_ms': 3120.0, 'p99_ms': 5012.7, 'first_text_p50_ms': 640.1}}
+    Token counts cover the succeeded calls.
+    """
+    with _lock:
+        snapshot = {name: dict(stats, latencies=list(stats['latencies']), first_text_latencies=list(stats['first_text_latencies']))
+                    for name, stats in _stats.items()}
+    report = {}
+    for name, stats in snapshot.items():
+        latencies = stats.pop('latencies')
+        first_text = stats.pop('first_text_latencies')
+        stats.update(
+            p50_ms=_percentile(latencies, 0.5), p90_ms=_percentile(latencies, 0.9), p99_ms=_percentile(latencies, 0.99),
+            first_text_p50_ms=_percentile(first_text, 0.5),
+        )
+        report[name] = stats
+    return report
+
+
+def _backoff(attempt):
+    """Full jitter: a random wait up to an exponentially growing cap."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _usage(response):
+    """{'input', 'output', 'cached'} token counts of a (fully read) response, or None if it reports none."""
+    metadata = getattr(response, 'usage_metadata', None)
+    if metadata is None:
+        return None
+    return {
+        'input': metadata.prompt_token_count,
+        'output': metadata.candidates_token_count,
+        'cached': getattr(metadata, 'cached_content_token_count', 0),
+    }
+
+
+def _attempt(model, prompt, timeout, stream, on_text, cancel, started, deadline, first_text, generation_config, usage):
+    """
+    One model call. Returns the response text; first_text[0] is set when the first text arrives
+    and usage[0] to the response's token counts. A stream still running at the deadline raises LLMTimeout.
+    """
+    response = model.generate_content(prompt, stream=stream, generation_config=generation_config, request_options={'timeout': timeout})
+    if not stream:
+        usage[0] = _usage(response)
+        return response.text
+
+    parts = []
+    for chunk in response:
+        if cancel is not None and cancel.is_set():
+            raise LLMCancelled("The model call was cancelled.")
+        # The request timeout only bounds each wait for a chunk, not a stream that keeps trickling
+        if time.monotonic() - started >= deadline:
+            raise LLMTimeout(f"The model did not answer within {deadline:g} seconds.")
+        try:
+            text = chunk.text
+        except ValueError:
+            # A chunk without text parts (e.g. the final one carrying only the finish reason)
+            continue
+        if not text:
+            continue
+        if first_text[0] is None:
+            first_text[0] = time.monotonic() - started
+        parts.append(text)
+        if on_text is not None:
+            on_text(''.join(parts))
+    if not parts:
+        raise ValueError("The model returned no text (the response was empty or blocked).")
+    # The usage metadata comes with the last chunk
+    usage[0] = _usage(response)
+    return ''.join(parts)
+
+
+def generate(model, prompt, name='default', stream=False, on_text=None, cancel=None,
+             deadline=DEFAULT_DEADLINE_SECONDS, max_attempts=MAX_ATTEMPTS, generation_config=None):
+    """
+    Returns the text the model generates for the prompt.
+    name groups the call in get_stats(); stream/on_text deliver partial text as it arrives
+    (on_text gets the whole text so far, so a retried attempt simply starts it over);
+    cancel is an optional threading.Event; generation_config overrides the model's own for this call
+    (e.g. structured_output.generation_config() for JSON output).
+
+    Raises LLMTimeout, LLMCancelled or LLMCallError (also for non-retryable API errors); a ValueError
+    from a blocked or empty response is raised as is, since retrying the same prompt would not help.
+    """
+    started = time.monotonic()
+    retries = 0
+    last_error = None
+    for attempt in range(max_attempts):
+        remaining = deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+        first_text = [None]
+        usage = [None]
+        try:
+            text = _attempt(model, prompt, min(ATTEMPT_TIMEOUT_SECONDS, remaining), stream, on_text, cancel, started, deadline, first_text, generation_config, usage)
+        except LLMCancelled:
+            _record(name, 'cancelled', retries=retries)
+            raise
+        except LLMTimeout:
+            _record(name, 'timeouts', retries=retries)
+            raise
+        except RETRYABLE_ERRORS as e:
+            last_error = e
+        except ValueError:
+            _record(name, 'failed', retries=retries)
+            raise
+        except api_exceptions.GoogleAPIError as e:
+            # Invalid requests, permission and quota-config errors: the same call would fail again
+            _record(name, 'failed', retries=retries)
+            raise LLMCallError(f"The model call failed: {e}") from e
+        else:
+            latency = time.monotonic() - started
+            _record(name, 'succeeded', latency, first_text[0] if stream else latency, retries, usage[0])
+            return text
+
+        if attempt + 1 == max_attempts:
+            break
+        wait = min(_backoff(attempt), deadline - (time.monotonic() - started))
+        if wait <= 0:
+            break
+        retries += 1
+        if cancel is not None:
+            if cancel.wait(wait):
+                _record(name, 'cancelled', retries=retries)
+                raise LLMCancelled("The model call was cancelled.")
+        else:
+            time.sleep(wait)
+
+    if time.monotonic() - started >= deadline or isinstance(last_error, (api_exceptions.DeadlineExceeded, TimeoutError)):
+        _record(name, 'timeouts', retries=retries)
+        raise LLMTimeout(f"The model did not answer within {deadline:g} seconds.") from last_error
+    _record(name, 'failed', retries=retries)
+    raise LLMCallError(f"The model call failed after {retries + 1} attempts: {last_error}") from last_error
@@ -0,0 +1,259 @@
+"""
+Local extraction of structured pipeline input for the AI assistant.
+
+Users often paste field values rather than describe them:
+    BUSINESS_UNIT=finance, ETL_LAYER=L0, COMPUTE_CLASS=M_M6
+    business unit: finance
+    {"BUSINESS_UNIT": "finance", "ETL_LAYER": "L0"}
+    a YAML mapping (block scalars included, if PyYAML is installed)
+parse() reads such input directly into pipeline fields, with no model round trip. Keys may be
+column names or the friendly names of validation.FIELD_MAPPING, in any case, with spaces,
+underscores or dashes. Only input that is structured as a whole is taken: any free-form text
+(other than a leading 'table1'-style L0 table reference) makes parse() return None, and the
+message goes to the model as before.
+
+Values for fields with fixed options (validation.VALID_OPTIONS) are put in their canonical case
+('l0' -> 'L0'); integer fields are converted to int. A value that is not one of the options or not
+an integer, or (in 'key: value' text) a plain value running on into more words ('bob, he owns it'),
+also sends the message to the model rather than guessing where the value ends.
+"""
+import json
+import re
+import threading
+
+from validation import FIELD_MAPPING, VALID_OPTIONS, get_all_fields
+
+# Fields the forms and the model treat as integers
+INTEGER_FIELDS = {"WARNING_THRESHOLD_MINS", "PRIORITY"}
+# SQL, logic and config fields: their values may hold '=', ':' and commas of their own
+FREE_TEXT_FIELDS = {
+    "TRANSFORM_QUERY", "DQ_LOGIC", "CDC_LOGIC", "CUSTOM_SCRIPT_PARAMS", "SPARK_CONFIGS",
+    "GENERIC_SCRIPTS", "CUSTOM_SCHEMA", "RETENTION_DETAILS", "PARTITION",
+}
+# In any other value, '=' or ', word:' means a key that is not a known field (or not split off)
+_EMBEDDED_KEY = re.compile(r"=|[,;\n][ \t]*[A-Za-z][\w \t-]{0,40}:")
+# In 'key: value' text, a value of any other field with spaces or ', more text' is prose, not a value
+_PROSE_VALUE = re.compile(r"\s|,\s*\S")
+# A leading L0 table reference ('table1', 't 2', 'table_3:') is allowed before the fields
+_TABLE_PREFIX = re.compile(r"^(?:table|t)\s*_?\s*[1-5]\b\s*[:,-]?\s*", re.IGNORECASE)
+# Where one L0 table's spec may start in a message covering several: 'table2:', 'Table 3 -', 't4' at the start
+# of the text, a line or a ';' / ',' separated part ('table1.col' or 't1.col' in SQL is not a marker).
+# split_l0_tables() decides which of these really start a table.
+_TABLE_MARKER = re.compile(
+    r"(?:^|(?<=[;,]))[ \t]*(?P<word>table|t)[ \t_]*(?P<number>[1-5])(?![\w.])[ \t]*(?P<separator>[:=-])?",
+    re.IGNORECASE | re.MULTILINE
+)
+_CODE_FENCE = re.compile(r"^```(?:json|yaml|yml)?\s*(.*?)\s*```$", re.DOTALL | re.IGNORECASE)
+
+_lock = threading.Lock()
+_stats = {'local': 0, 'model': 0}
+_patterns = {}
+
+
+def _normalize_key(key):
+    """'Warning threshold (mins)', 'WARNING_THRESHOLD_MINS' and 'warning-threshold-mins' all become 'warning threshold mins'."""
+    return ' '.join(re.sub(r"[^0-9a-z]+", ' ', str(key).lower()).split())
+
+
+def field_aliases(table_type):
+    """Returns {normalized alias: column} for every field of a table type (see validation.get_all_fields())."""
+    aliases = {}
+    for column in get_all_fields(table_type):
+        aliases[_normalize_key(column)] = column
+        friendly = FIELD_MAPPING.get(column)
+        if friendly:
+            aliases[_normalize_key(friendly)] = column
+            # 'warning threshold (mins)' is also accepted as 'warning threshold'
+            aliases[_normalize_key(re.sub(r"\(.*?\)", '', friendly))] = column
+    return aliases
+
+
+def _key_pattern(table_type):
+    """
+    Regex finding 'key =' / 'key:' for the known fields of a table type. A key must start the text or
+    follow a comma, semicolon or line break; only an exact column name (e.g. ETL_LAYER=L0) may also
+    follow a space, so 'BUSINESS_UNIT=finance ETL_LAYER=L0' is read as two fields but a value like
+    "select * from t where source = 'x'" is not split.
+    """
+    if table_type not in _patterns:
+        aliases = sorted(field_aliases(table_type), key=len, reverse=True)
+        # Spaces in an alias match any run of spaces, underscores or dashes
+        alternation = '|'.join(r"[\s_-]+".join(map(re.escape, alias.split())) for alias in aliases)
+        columns = '|'.join(map(re.escape, sorted(get_all_fields(table_type), key=len, reverse=True)))
+        _patterns[table_type] = re.compile(
+            rf"(?:(?:^|(?<=[,;\n]))[ \t]*[\"']?(?P<alias>{alternation})[\"']?[ \t]*[:=]"
+            rf"|(?<=[ \t])(?-i:(?P<column>{columns}))[:=])",
+            re.IGNORECASE
+        )
+    return _patterns[table_type]
+
+
+def _clean_value(column, value):
+    """Canonical form of one extracted value; None for an empty one."""
+    if isinstance(value, bool):
+        value = 'Y' if value else 'N'
+    if value is None:
+        return None
+    if not isinstance(value, (int, float)):
+        value = str(value).strip().rstrip(',;').strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1].strip()
+        if not value:
+            return None
+    if column in INTEGER_FIELDS and re.fullmatch(r"\d+", str(value)):
+        return int(value)
+    if column in VALID_OPTIONS:
+        for option in VALID_OPTIONS[column]:
+            if str(value).upper() == option.upper():
+                return option
+    return value
+
+
+def _fits_field(column, value):
+    """Whether a cleaned value can be taken as is: one of the field's options, an int for an integer field."""
+    if column in VALID_OPTIONS:
+        return value in VALID_OPTIONS[column]
+    if column in INTEGER_FIELDS:
+        return isinstance(value, int)
+    return True
+
+
+def _from_mapping(mapping, table_type):
+    """Maps the keys of a parsed JSON/YAML object to columns; None if any key is not a known field."""
+    aliases = field_aliases(table_type)
+    fields = {}
+    for key, value in mapping.items():
+        column = aliases.get(_normalize_key(key))
+        if column is None or isinstance(value, (dict, list)):
+            return None
+        value = _clean_value(column, value)
+        if value is None:
+            continue
+        if not _fits_field(column, value):
+            return None
+        fields[column] = value
+    return fields or None
+
+
+def _parse_json(text, table_type):
+    if not text.startswith('{'):
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    return _from_mapping(data, table_type) if isinstance(data, dict) else None
+
+
+def _parse_yaml(text, table_type):
+    # PyYAML is optional: without it, 'key: value' lines are still read by _parse_pairs()
+    try:
+        import yaml
+    except ImportError:
+        return None
+    if '\n' not in text:
+        return None
+    try:
+        data = yaml.safe_load(text)
+    except yaml.YAMLError:
+        return None
+    return _from_mapping(data, table_type) if isinstance(data, dict) else None
+
+
+def _parse_pairs(text, table_type):
+    """Reads 'key=value' / 'key: value' pairs separated by commas, semicolons, line breaks or (column names) spaces."""
+    aliases = field_aliases(table_type)
+    matches = list(_key_pattern(table_type).finditer(text))
+    # Structured means nothing but fields: no free text before the first key
+    if not matches or text[:matches[0].start()].strip(' \t\n,;'):
+        return None
+    fields = {}
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        column = aliases[_normalize_key(match.group('alias') or match.group('column'))]
+        raw_value = text[match.end():end]
+        if column not in FREE_TEXT_FIELDS and _EMBEDDED_KEY.search(raw_value):
+            return None
+        value = _clean_value(column, raw_value)
+        if value is None:
+            continue
+        if not _fits_field(column, value):
+            return None
+        if column not in FREE_TEXT_FIELDS and column not in VALID_OPTIONS and _PROSE_VALUE.search(str(value)):
+            return None
+        fields[column] = value
+    return fields or None
+
+
+def parse(text, table_type):
+    """
+    Extracts the fields of a 'header', 'l0' or 'pb' record from structured input.
+    Returns {column: value}, or None when the text is free-form and needs the model.
+    """
+    text = (text or '').strip()
+    fence = _CODE_FENCE.match(text)
+    if fence:
+        text = fence.group(1)
+    text = _TABLE_PREFIX.sub('', text, count=1).strip() if table_type == 'l0' else text
+    if not text:
+        return None
+    return _parse_json(text, table_type) or _parse_yaml(text, table_type) or _parse_pairs(text, table_type)
+
+
+def _in_free_text_value(text):
+    """Whether the end of text lies in the value of a FREE_TEXT_FIELDS field (its last key is one)."""
+    keys = list(_key_pattern('l0').finditer(text))
+    if not keys:
+        return False
+    return field_aliases('l0')[_normalize_key(keys[-1].group('alias') or keys[-1].group('column'))] in FREE_TEXT_FIELDS
+
+
+def _starts_table(text, marker, segment_start):
+    """
+    Whether a _TABLE_MARKER match starts a table spec. An explicit 'table N:' / 'table N -' may follow a
+    ',' or ';', any marker may start a line; inside a SQL or logic value only an explicit one starting
+    a line counts, so 'from t1, t2' and aliases on their own line stay in the value.
+    """
+    line_start = marker.start() == 0 or text[marker.start() - 1] == '\n'
+    explicit = marker.group('word').lower() == 'table' and marker.group('separator') in (':', '-')
+    if _in_free_text_value(text[segment_start:marker.start()]):
+        return line_start and explicit
+    return line_start or explicit
+
+
+def split_l0_tables(text):
+    """
+    Splits a message holding specs for several L0 tables ('table1: ... table2: ...') into
+    [(table index, text)], table index 0 for table1. Text before the first marker is dropped and
+    repeated markers for the same table are joined. Returns [] when fewer than two tables are named.
+    """
+    text = text or ''
+    markers = []
+    segment_start = 0
+    for marker in _TABLE_MARKER.finditer(text):
+        if _starts_table(text, marker, segment_start):
+            markers.append(marker)
+            segment_start = marker.end()
+    segments = {}
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        segment = text[marker.end():end].strip(' \t\n,;')
+        if segment:
+            index = int(marker.group('number')) - 1
+            segments[index] = f"{segments[index]}\n{segment}" if index in segments else segment
+    return list(segments.items()) if len(segments) > 1 else []
+
+
+def record_turn(served_locally):
+    """Counts one extraction turn as served locally or by the model."""
+    with _lock:
+        _stats['local' if served_locally else 'model'] += 1
+
+
+def get_stats():
+    """Returns this process's turn counters and the fraction of turns served locally."""
+    with _lock:
+        stats = dict(_stats)
+    total = stats['local'] + stats['model']
+    stats['local_fraction'] = stats['local'] / total if total else 0.0
+    return stats
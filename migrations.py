@@ -0,0 +1,628 @@
+"""
+Versioned schema migrations for pipelines.db.
+
+The schema version is stored in PRAGMA user_version. Each entry in MIGRATIONS
+upgrades the database by exactly one version and runs in its own transaction,
+so existing database files are brought up to date in place. To change the
+schema, append a new (version, description, function) entry - never edit one
+that has already shipped.
+
+Run `python migrations.py [path/to/pipelines.db]` to migrate a database and
+check that every hot query is served by an index (EXPLAIN QUERY PLAN).
+"""
+import sys
+from db_connection import get_connection
+
+
+def _create_base_tables(cursor):
+    """Version 1: the catalog tables as originally created by init_db()."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_flow_control_header (
+            DATA_FLOW_GROUP_ID STRING PRIMARY KEY,
+            BUSINESS_UNIT STRING,
+            PRODUCT_OWNER STRING,
+            TRIGGER_TYPE STRING,
+            BUSINESS_OBJECT_NAME STRING,
+            ETL_LAYER STRING,
+            COMPUTE_CLASS STRING,
+            COMPUTE_CLASS_DEV STRING,
+            DATA_SME STRING,
+            INGESTION_MODE STRING,
+            INGESTION_BUCKET STRING,
+            SPARK_CONFIGS STRING,
+            COST_CENTER STRING,
+            WARNING_THRESHOLD_MINS INT,
+            WARNING_DL_GROUP STRING,
+            min_version REAL,
+            max_version REAL,
+            IS_ACTIVE STRING,
+            INSERTED_BY STRING,
+            UPDATED_BY STRING,
+            INSERTED_TS STRING,
+            UPDATED_TS STRING
+        )
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_flow_l0_detail (
+            DATA_FLOW_GROUP_ID STRING,
+            SOURCE STRING NOT NULL,
+            SOURCE_OBJ_SCHEMA STRING NOT NULL,
+            SOURCE_OBJ_NAME STRING NOT NULL,
+            INPUT_FILE_FORMAT STRING,
+            STORAGE_TYPE STRING,
+            CUSTOM_SCHEMA STRING,
+            DELIMETER STRING,
+            DQ_LOGIC STRING,
+            CDC_LOGIC STRING,
+            TRANSFORM_QUERY STRING,
+            LOAD_TYPE STRING,
+            PRESTAG_FLAG STRING,
+            PARTITION STRING,
+            LS_FLAG STRING,
+            LS_DETAIL STRING,
+            LOB STRING,
+            IS_ACTIVE STRING,
+            INSERTED_BY STRING,
+            UPDATED_BY STRING,      
+            FOREIGN KEY (DATA_FLOW_GROUP_ID) REFERENCES data_flow_control_header(DATA_FLOW_GROUP_ID),
+            UNIQUE (DATA_FLOW_GROUP_ID, SOURCE, SOURCE_OBJ_SCHEMA, SOURCE_OBJ_NAME)
+        )
+    """)
+    
+    # Removed UNIQUE (DATA_FLOW_GROUP_ID) constraint from data_flow_pb_detail 
+    # to allow for update/insert logic without an explicit pb_id, assuming 
+    # a 1:1 or 1:N relationship where the N side is managed by DATA_FLOW_GROUP_ID
+    # I am assuming a 1:1 relationship based on the original update_pb_details logic.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_flow_pb_detail (
+            DATA_FLOW_GROUP_ID STRING,
+            TARGET_OBJ_SCHEMA STRING,
+            TARGET_OBJ_NAME STRING,
+            PRIORITY INT,
+            TARGET_OBJ_TYPE STRING,
+            TRANSFORM_QUERY STRING,
+            GENERIC_SCRIPTS STRING,
+            SOURCE_PK STRING,
+            TARGET_PK STRING,
+            LOAD_TYPE STRING,
+            PARTITION_METHOD STRING,
+            PARTITION_OR_INDEX STRING,
+            CUSTOM_SCRIPT_PARAMS STRING,
+            RETENTION_DETAILS STRING,
+            LOB STRING,
+            IS_ACTIVE STRING,
+            INSERTED_BY STRING,
+            UPDATED_BY STRING,
+            FOREIGN KEY (DATA_FLOW_GROUP_ID) REFERENCES data_flow_control_header(DATA_FLOW_GROUP_ID)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_flow_cluster_config_lookup (
+            COMPUTE_CLASS STRING PRIMARY KEY,
+            DESCRIPTION STRING,
+            MIN_WORKER INT,
+            MAX_WORKER INT,
+            DRIVER_NODE_TYPE_ID STRING,
+            WORKER_NODE_TYPE_ID STRING,
+            RUNTIME_ENGINE STRING,
+            SPARK_VERSION STRING,
+            INSERTED_BY STRING,
+            UPDATED_BY STRING,
+            INSERTED_TS TEXT,
+            UPDATED_TS TEXT,
+            DEV_ALLOWED STRING
+        )
+    """)
+
+def _add_secondary_indexes(cursor):
+    """Version 2: indexes for the per-pipeline detail lookups and the header filters/sort."""
+    # data_flow_l0_detail.DATA_FLOW_GROUP_ID is already the leading column of the
+    # UNIQUE (DATA_FLOW_GROUP_ID, SOURCE, SOURCE_OBJ_SCHEMA, SOURCE_OBJ_NAME) index,
+    # so only the PB detail table needs its own lookup index.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pb_detail_group_id ON data_flow_pb_detail (DATA_FLOW_GROUP_ID)")
+
+    # Listing is ordered by UPDATED_TS; each filter column is paired with it so a
+    # filtered listing can be read in order without a sort step.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_header_updated_ts ON data_flow_control_header (UPDATED_TS, DATA_FLOW_GROUP_ID)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_header_etl_layer ON data_flow_control_header (ETL_LAYER, UPDATED_TS)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_header_business_unit ON data_flow_control_header (BUSINESS_UNIT, UPDATED_TS)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_header_is_active ON data_flow_control_header (IS_ACTIVE, UPDATED_TS)")
+
+
+def _unique_pb_detail_per_pipeline(cursor):
+    """
+    Version 3: enforce the one-PB-detail-row-per-pipeline assumption with a unique index,
+    which INSERT ... ON CONFLICT (DATA_FLOW_GROUP_ID) needs. Older files may hold duplicates
+    written by save_pb_details, so the most recently written row per pipeline is kept.
+    """
+    cursor.execute("""
+        DELETE FROM data_flow_pb_detail
+        WHERE rowid NOT IN (SELECT MAX(rowid) FROM data_flow_pb_detail GROUP BY DATA_FLOW_GROUP_ID)
+    """)
+    cursor.execute("DROP INDEX IF EXISTS idx_pb_detail_group_id")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_pb_detail_group_id ON data_flow_pb_detail (DATA_FLOW_GROUP_ID)")
+
+
+def _keyset_listing_indexes(cursor):
+    """
+    Version 4: extend the header filter indexes with DATA_FLOW_GROUP_ID, the keyset tie-breaker of
+    database.list_pipelines(), so filtered pages are read straight from the index in
+    (UPDATED_TS, DATA_FLOW_GROUP_ID) order.
+    """
+    for column, old_index, new_index in [
+        ("ETL_LAYER", "idx_header_etl_layer", "idx_header_etl_layer_keyset"),
+        ("BUSINESS_UNIT", "idx_header_business_unit", "idx_header_business_unit_keyset"),
+        ("IS_ACTIVE", "idx_header_is_active", "idx_header_is_active_keyset"),
+    ]:
+        cursor.execute(f"DROP INDEX IF EXISTS {old_index}")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {new_index} ON data_flow_control_header ({column}, UPDATED_TS, DATA_FLOW_GROUP_ID)")
+
+
+# One pipeline_search document per pipeline, sharing the header row's rowid.
+# Detail rows are folded into the document with group_concat, so a pipeline is found
+# by anything in its header, L0 or PB rows.
+_PIPELINE_SEARCH_DOCUMENT = """
+    SELECT
+        h.rowid,
+        h.DATA_FLOW_GROUP_ID,
+        coalesce(h.BUSINESS_UNIT, '') || ' ' || coalesce(h.PRODUCT_OWNER, '') || ' ' ||
+        coalesce(h.DATA_SME, '') || ' ' || coalesce(h.BUSINESS_OBJECT_NAME, '') || ' ' ||
+        coalesce(h.COST_CENTER, '') || ' ' || coalesce(h.WARNING_DL_GROUP, '') || ' ' ||
+        coalesce(h.INSERTED_BY, '') || ' ' || coalesce(h.UPDATED_BY, ''),
+        coalesce((SELECT group_concat(coalesce(l.SOURCE, '') || ' ' || coalesce(l.SOURCE_OBJ_SCHEMA, '') || '.' || coalesce(l.SOURCE_OBJ_NAME, ''), ' ')
+                  FROM data_flow_l0_detail l WHERE l.DATA_FLOW_GROUP_ID = h.DATA_FLOW_GROUP_ID), '') || ' ' ||
+        coalesce((SELECT group_concat(coalesce(p.TARGET_OBJ_SCHEMA, '') || '.' || coalesce(p.TARGET_OBJ_NAME, ''), ' ')
+                  FROM data_flow_pb_detail p WHERE p.DATA_FLOW_GROUP_ID = h.DATA_FLOW_GROUP_ID), ''),
+        coalesce((SELECT group_concat(coalesce(l.TRANSFORM_QUERY, '') || ' ' || coalesce(l.DQ_LOGIC, '') || ' ' || coalesce(l.CDC_LOGIC, ''), ' ')
+                  FROM data_flow_l0_detail l WHERE l.DATA_FLOW_GROUP_ID = h.DATA_FLOW_GROUP_ID), '') || ' ' ||
+        coalesce((SELECT group_concat(coalesce(p.TRANSFORM_QUERY, '') || ' ' || coalesce(p.GENERIC_SCRIPTS, ''), ' ')
+                  FROM data_flow_pb_detail p WHERE p.DATA_FLOW_GROUP_ID = h.DATA_FLOW_GROUP_ID), '')
+    FROM data_flow_control_header h
+"""
+
+
+def _refresh_search_document_sql(group_id_expr):
+    """Trigger body statements that rebuild the search document of one pipeline."""
+    return f"""
+        DELETE FROM pipeline_search
+        WHERE rowid = (SELECT rowid FROM data_flow_control_header WHERE DATA_FLOW_GROUP_ID = {group_id_expr});
+        INSERT INTO pipeline_search (rowid, DATA_FLOW_GROUP_ID, HEADER_TEXT, OBJECT_NAMES, LOGIC)
+        {_PIPELINE_SEARCH_DOCUMENT} WHERE h.DATA_FLOW_GROUP_ID = {group_id_expr};
+    """
+
+
+def _pipeline_search_index(cursor):
+    """
+    Version 5: FTS5 full-text index over pipeline metadata (database.search_pipelines()).
+    Columns: the pipeline ID; header owners/business fields; source and target object names;
+    transform queries, DQ and CDC logic. Triggers on the three catalog tables keep it in sync.
+    """
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS pipeline_search USING fts5(
+            DATA_FLOW_GROUP_ID, HEADER_TEXT, OBJECT_NAMES, LOGIC,
+            prefix = '2 3'
+        )
+    """)
+    # Matches on the ID or object names rank above matches buried in SQL text
+    cursor.execute("INSERT INTO pipeline_search (pipeline_search, rank) VALUES ('rank', 'bm25(10.0, 4.0, 6.0, 1.0)')")
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_header_search_insert AFTER INSERT ON data_flow_control_header BEGIN
+            {_refresh_search_document_sql("NEW.DATA_FLOW_GROUP_ID")}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_header_search_update AFTER UPDATE ON data_flow_control_header BEGIN
+            DELETE FROM pipeline_search WHERE rowid = OLD.rowid;
+            {_refresh_search_document_sql("NEW.DATA_FLOW_GROUP_ID")}
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_header_search_delete AFTER DELETE ON data_flow_control_header BEGIN
+            DELETE FROM pipeline_search WHERE rowid = OLD.rowid;
+        END
+    """)
+
+    for table, prefix in [("data_flow_l0_detail", "l0"), ("data_flow_pb_detail", "pb")]:
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_search_insert AFTER INSERT ON {table} BEGIN
+                {_refresh_search_document_sql("NEW.DATA_FLOW_GROUP_ID")}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_search_update AFTER UPDATE ON {table} BEGIN
+                {_refresh_search_document_sql("OLD.DATA_FLOW_GROUP_ID")}
+                {_refresh_search_document_sql("NEW.DATA_FLOW_GROUP_ID")}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_search_delete AFTER DELETE ON {table} BEGIN
+                {_refresh_search_document_sql("OLD.DATA_FLOW_GROUP_ID")}
+            END
+        """)
+
+    # Index the pipelines that already exist
+    cursor.execute("DELETE FROM pipeline_search")
+    cursor.execute(f"INSERT INTO pipeline_search (rowid, DATA_FLOW_GROUP_ID, HEADER_TEXT, OBJECT_NAMES, LOGIC) {_PIPELINE_SEARCH_DOCUMENT}")
+
+
+# Tables whose row changes are recorded in catalog_change_log, with the columns identifying a row
+CHANGE_LOG_TABLES = {
+    "data_flow_control_header": ["DATA_FLOW_GROUP_ID"],
+    "data_flow_l0_detail": ["DATA_FLOW_GROUP_ID", "SOURCE", "SOURCE_OBJ_SCHEMA", "SOURCE_OBJ_NAME"],
+    "data_flow_pb_detail": ["DATA_FLOW_GROUP_ID"],
+}
+
+
+def _change_log_insert_sql(table, operation, row, key_columns):
+    """Trigger body statement that appends one change for the NEW or OLD row."""
+    row_key = ", ".join(f"{row}.{col}" for col in key_columns)
+    return f"""
+        INSERT INTO catalog_change_log (TABLE_NAME, DATA_FLOW_GROUP_ID, ROW_KEY, OPERATION, CHANGED_TS)
+        VALUES ('{table}', {row}.DATA_FLOW_GROUP_ID, json_array({row_key}), '{operation}', strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    """
+
+
+def _catalog_change_log(cursor):
+    """
+    Version 6: catalog_change_log, an append-only record of every insert, update and delete on the
+    catalog tables, written by triggers. VERSION is AUTOINCREMENT, so it only ever grows and its
+    latest value (database.get_catalog_version()) changes whenever the catalog does.
+    ROW_KEY is a JSON array of the row's key columns (see CHANGE_LOG_TABLES).
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_change_log (
+            VERSION INTEGER PRIMARY KEY AUTOINCREMENT,
+            TABLE_NAME STRING NOT NULL,
+            DATA_FLOW_GROUP_ID STRING,
+            ROW_KEY STRING NOT NULL,
+            OPERATION STRING NOT NULL,
+            CHANGED_TS STRING NOT NULL
+        )
+    """)
+
+    for table, key_columns in CHANGE_LOG_TABLES.items():
+        key_changed = " OR ".join(f"OLD.{col} IS NOT NEW.{col}" for col in key_columns)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_log_insert AFTER INSERT ON {table} BEGIN
+                {_change_log_insert_sql(table, "INSERT", "NEW", key_columns)}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_log_update AFTER UPDATE ON {table} BEGIN
+                {_change_log_insert_sql(table, "UPDATE", "NEW", key_columns)}
+            END
+        """)
+        # A row whose key changed is gone under its old key
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_log_rekey AFTER UPDATE ON {table} WHEN {key_changed} BEGIN
+                {_change_log_insert_sql(table, "DELETE", "OLD", key_columns)}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_log_delete AFTER DELETE ON {table} BEGIN
+                {_change_log_insert_sql(table, "DELETE", "OLD", key_columns)}
+            END
+        """)
+
+        # Existing rows are logged as inserts, so replaying the log from version 0 rebuilds the catalog
+        cursor.execute(f"""
+            INSERT INTO catalog_change_log (TABLE_NAME, DATA_FLOW_GROUP_ID, ROW_KEY, OPERATION, CHANGED_TS)
+            SELECT '{table}', DATA_FLOW_GROUP_ID, json_array({", ".join(key_columns)}), 'INSERT', strftime('%Y-%m-%d %H:%M:%f', 'now')
+            FROM {table}
+        """)
+
+
+def _lineage_tables(cursor):
+    """
+    Version 7: pipeline_lineage, the table-level lineage adjacency list maintained by lineage.py
+    (one row per pipeline reading ('in') or writing ('out') an object), and change_log_consumers,
+    which records how far each derived structure has read catalog_change_log.
+    Both start empty; lineage.py fills pipeline_lineage from the change log on first use.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_lineage (
+            DATA_FLOW_GROUP_ID STRING NOT NULL,
+            DIRECTION STRING NOT NULL CHECK (DIRECTION IN ('in', 'out')),
+            OBJECT_NAME STRING NOT NULL,
+            PRIMARY KEY (DATA_FLOW_GROUP_ID, DIRECTION, OBJECT_NAME)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_lineage_object ON pipeline_lineage (OBJECT_NAME, DIRECTION, DATA_FLOW_GROUP_ID)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log_consumers (
+            NAME STRING PRIMARY KEY,
+            VERSION INTEGER NOT NULL
+        )
+    """)
+
+
+# Header columns counted in catalog_summary
+SUMMARY_COLUMNS = ['BUSINESS_UNIT', 'ETL_LAYER', 'IS_ACTIVE', 'COMPUTE_CLASS', 'COST_CENTER']
+
+
+def _summary_delta_sql(row, delta):
+    """Trigger body statements that add `delta` to the counts of the NEW or OLD row's values."""
+    statements = []
+    for column in SUMMARY_COLUMNS:
+        statements.append(f"""
+            INSERT INTO catalog_summary (COLUMN_NAME, VALUE, PIPELINE_COUNT) VALUES ('{column}', coalesce({row}.{column}, ''), {delta})
+            ON CONFLICT (COLUMN_NAME, VALUE) DO UPDATE SET PIPELINE_COUNT = PIPELINE_COUNT + ({delta});
+        """)
+    if delta < 0:
+        statements.append("DELETE FROM catalog_summary WHERE PIPELINE_COUNT <= 0;")
+    return "".join(statements)
+
+
+def _catalog_summary(cursor):
+    """
+    Version 8: catalog_summary, the number of pipelines per value of each SUMMARY_COLUMNS column,
+    kept exact by triggers on data_flow_control_header (database.get_catalog_summary()).
+    A missing value is counted under ''.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_summary (
+            COLUMN_NAME STRING NOT NULL,
+            VALUE STRING NOT NULL,
+            PIPELINE_COUNT INTEGER NOT NULL,
+            PRIMARY KEY (COLUMN_NAME, VALUE)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_header_summary_insert AFTER INSERT ON data_flow_control_header BEGIN
+            {_summary_delta_sql("NEW", 1)}
+        END
+    """)
+    # Only updates that touch a counted column need to move counts
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_header_summary_update AFTER UPDATE OF {", ".join(SUMMARY_COLUMNS)} ON data_flow_control_header
+        WHEN {" OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in SUMMARY_COLUMNS)} BEGIN
+            {_summary_delta_sql("OLD", -1)}
+            {_summary_delta_sql("NEW", 1)}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_header_summary_delete AFTER DELETE ON data_flow_control_header BEGIN
+            {_summary_delta_sql("OLD", -1)}
+        END
+    """)
+
+    cursor.execute("DELETE FROM catalog_summary")
+    for column in SUMMARY_COLUMNS:
+        cursor.execute(f"""
+            INSERT INTO catalog_summary (COLUMN_NAME, VALUE, PIPELINE_COUNT)
+            SELECT '{column}', coalesce({column}, ''), COUNT(*) FROM data_flow_control_header GROUP BY coalesce({column}, '')
+        """)
+
+
+def _llm_response_cache(cursor):
+    """
+    Version 9: llm_response_cache, model responses keyed on a hash of (model, system prompt, user input)
+    (see llm_cache.py). LAST_USED_TS orders least-recently-used eviction.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS llm_response_cache (
+            CACHE_KEY STRING PRIMARY KEY,
+            MODEL_NAME STRING NOT NULL,
+            RESPONSE_TEXT STRING NOT NULL,
+            CREATED_TS REAL NOT NULL,
+            LAST_USED_TS REAL NOT NULL,
+            HIT_COUNT INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_response_cache (LAST_USED_TS)")
+
+
+# catalog_change_log entries kept; older ones are pruned (see _change_log_retention). Consumers
+# rebuild when they are more than MAX_INCREMENTAL_CHANGES (5000) behind, so any consumer whose
+# position was pruned away reads over this many changes and rebuilds rather than missing some.
+CHANGE_LOG_RETENTION = 100_000
+# Pruning runs once every this many changes
+CHANGE_LOG_PRUNE_INTERVAL = 1000
+
+
+def _change_log_retention(cursor):
+    """
+    Version 10: keep catalog_change_log from growing forever. Every CHANGE_LOG_PRUNE_INTERVAL-th
+    entry deletes the entries more than CHANGE_LOG_RETENTION versions old. The catalog version lives
+    in sqlite_sequence, so pruning never moves it.
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_catalog_change_log_prune AFTER INSERT ON catalog_change_log
+        WHEN NEW.VERSION % {CHANGE_LOG_PRUNE_INTERVAL} = 0 BEGIN
+            DELETE FROM catalog_change_log WHERE VERSION <= NEW.VERSION - {CHANGE_LOG_RETENTION};
+        END
+    """)
+    cursor.execute(f"DELETE FROM catalog_change_log WHERE VERSION <= (SELECT MAX(VERSION) FROM catalog_change_log) - {CHANGE_LOG_RETENTION}")
+
+
+def _llm_cache_size(cursor):
+    """
+    Version 11: llm_response_cache_size, a one-row count of llm_response_cache entries kept by
+    triggers, so reporting the cache size does not count the table.
+    """
+    cursor.execute("CREATE TABLE IF NOT EXISTS llm_response_cache_size (ENTRIES INTEGER NOT NULL)")
+    cursor.execute("INSERT INTO llm_response_cache_size (ENTRIES) SELECT COUNT(*) FROM llm_response_cache")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_llm_response_cache_count_insert AFTER INSERT ON llm_response_cache BEGIN
+            UPDATE llm_response_cache_size SET ENTRIES = ENTRIES + 1;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_llm_response_cache_count_delete AFTER DELETE ON llm_response_cache BEGIN
+            UPDATE llm_response_cache_size SET ENTRIES = ENTRIES - 1;
+        END
+    """)
+
+
+# (version, description, migration function). Versions must be consecutive.
+MIGRATIONS = [
+    (1, "base catalog tables", _create_base_tables),
+    (2, "secondary indexes on detail group IDs and header filter columns", _add_secondary_indexes),
+    (3, "unique PB detail row per pipeline", _unique_pb_detail_per_pipeline),
+    (4, "keyset pagination indexes on header filter columns", _keyset_listing_indexes),
+    (5, "FTS5 full-text search index over pipeline metadata", _pipeline_search_index),
+    (6, "trigger-maintained catalog change log", _catalog_change_log),
+    (7, "table-level lineage adjacency list and change log consumer positions", _lineage_tables),
+    (8, "trigger-maintained catalog summary counts", _catalog_summary),
+    (9, "LLM response cache", _llm_response_cache),
+    (10, "catalog change log retention", _change_log_retention),
+    (11, "trigger-maintained LLM response cache size", _llm_cache_size),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """Returns the schema version recorded in the database file."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn=None):
+    """
+    Applies every migration newer than the database's user_version, one transaction each.
+    Returns the resulting schema version.
+    """
+    conn = conn or get_connection()
+    for version, description, migration in MIGRATIONS:
+        if version <= get_schema_version(conn):
+            continue
+        # BEGIN IMMEDIATE takes the write lock up front so two processes starting
+        # at the same time cannot both apply the same migration.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if version <= get_schema_version(conn):
+                conn.rollback()
+                continue
+            migration(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return get_schema_version(conn)
+
+
+# Queries issued on every page load / pipeline open, with representative parameters.
+HOT_QUERIES = {
+    "get_pipelines_by_ids (header)": ("SELECT * FROM data_flow_control_header WHERE DATA_FLOW_GROUP_ID IN (?, ?, ?)", ("x", "y", "z")),
+    "get_pipelines_by_ids (l0)": ("SELECT * FROM data_flow_l0_detail WHERE DATA_FLOW_GROUP_ID IN (?, ?, ?)", ("x", "y", "z")),
+    "get_pipelines_by_ids (pb)": ("SELECT * FROM data_flow_pb_detail WHERE DATA_FLOW_GROUP_ID IN (?, ?, ?)", ("x", "y", "z")),
+    "delete_pipeline (l0)": ("DELETE FROM data_flow_l0_detail WHERE DATA_FLOW_GROUP_ID = ?", ("x",)),
+    "delete_pipeline (pb)": ("DELETE FROM data_flow_pb_detail WHERE DATA_FLOW_GROUP_ID = ?", ("x",)),
+    "get_all_pipelines": ("SELECT * FROM data_flow_control_header ORDER BY UPDATED_TS DESC", ()),
+    "search by layer": ("SELECT * FROM data_flow_control_header WHERE ETL_LAYER = ? ORDER BY UPDATED_TS DESC", ("L0",)),
+    "search by unit": ("SELECT * FROM data_flow_control_header WHERE BUSINESS_UNIT = ? ORDER BY UPDATED_TS DESC", ("sales",)),
+    "search by status": ("SELECT * FROM data_flow_control_header WHERE IS_ACTIVE = ? ORDER BY UPDATED_TS DESC", ("Y",)),
+    "list_pipelines (next page)": (
+        "SELECT DATA_FLOW_GROUP_ID, UPDATED_TS FROM data_flow_control_header h"
+        " WHERE (h.UPDATED_TS, h.DATA_FLOW_GROUP_ID) < (?, ?)"
+        " ORDER BY h.UPDATED_TS DESC, h.DATA_FLOW_GROUP_ID DESC LIMIT 51",
+        ("2024-01-01 00:00:00", "x")
+    ),
+    "list_pipelines (filtered page)": (
+        "SELECT DATA_FLOW_GROUP_ID, UPDATED_TS FROM data_flow_control_header h"
+        " WHERE h.ETL_LAYER = ? AND (h.UPDATED_TS, h.DATA_FLOW_GROUP_ID) < (?, ?)"
+        " ORDER BY h.UPDATED_TS DESC, h.DATA_FLOW_GROUP_ID DESC LIMIT 51",
+        ("L0", "2024-01-01 00:00:00", "x")
+    ),
+    "list_pipelines (by layer, next page)": (
+        "SELECT DATA_FLOW_GROUP_ID FROM data_flow_control_header h"
+        " WHERE (h.ETL_LAYER, h.UPDATED_TS, h.DATA_FLOW_GROUP_ID) > (?, ?, ?)"
+        " ORDER BY h.ETL_LAYER ASC, h.UPDATED_TS ASC, h.DATA_FLOW_GROUP_ID ASC LIMIT 51",
+        ("L0", "2024-01-01 00:00:00", "x")
+    ),
+    "list_pipelines (by layer, inside the NULL block)": (
+        "SELECT DATA_FLOW_GROUP_ID FROM data_flow_control_header h"
+        " WHERE h.ETL_LAYER IS NULL AND (h.UPDATED_TS, h.DATA_FLOW_GROUP_ID) > (?, ?)"
+        " ORDER BY h.ETL_LAYER ASC, h.UPDATED_TS ASC, h.DATA_FLOW_GROUP_ID ASC LIMIT 51",
+        ("2024-01-01 00:00:00", "x")
+    ),
+    "list_pipelines (by layer, NULL block after the last page)": (
+        "SELECT DATA_FLOW_GROUP_ID FROM data_flow_control_header h"
+        " WHERE h.ETL_LAYER IS NULL ORDER BY h.ETL_LAYER DESC, h.UPDATED_TS DESC, h.DATA_FLOW_GROUP_ID DESC LIMIT 51",
+        ()
+    ),
+    "list_pipelines (by ID, next page)": (
+        "SELECT DATA_FLOW_GROUP_ID FROM data_flow_control_header h"
+        " WHERE (h.DATA_FLOW_GROUP_ID) < (?) ORDER BY h.DATA_FLOW_GROUP_ID DESC LIMIT 51",
+        ("x",)
+    ),
+    "get_facet_counts": (
+        "SELECT 'IS_ACTIVE', h.IS_ACTIVE, COUNT(*) FROM data_flow_control_header h GROUP BY h.IS_ACTIVE"
+        " UNION ALL SELECT 'ETL_LAYER', h.ETL_LAYER, COUNT(*) FROM data_flow_control_header h GROUP BY h.ETL_LAYER"
+        " UNION ALL SELECT 'BUSINESS_UNIT', h.BUSINESS_UNIT, COUNT(*) FROM data_flow_control_header h GROUP BY h.BUSINESS_UNIT",
+        ()
+    ),
+    "get_catalog_summary": ("SELECT COLUMN_NAME, VALUE, PIPELINE_COUNT FROM catalog_summary", ()),
+    "llm_cache lookup": ("SELECT RESPONSE_TEXT, CREATED_TS, LAST_USED_TS FROM llm_response_cache WHERE CACHE_KEY = ?", ("0" * 64,)),
+    "llm_cache size": ("SELECT ENTRIES FROM llm_response_cache_size", ()),
+    "llm_cache eviction": (
+        "SELECT CACHE_KEY FROM llm_response_cache ORDER BY LAST_USED_TS DESC LIMIT -1 OFFSET ?", (5000,)
+    ),
+    "get_changes_since": ("SELECT * FROM catalog_change_log WHERE VERSION > ? ORDER BY VERSION LIMIT 1000", (0,)),
+    "lineage (readers of objects)": (
+        "SELECT OBJECT_NAME, DATA_FLOW_GROUP_ID FROM pipeline_lineage WHERE DIRECTION = ? AND OBJECT_NAME IN (?, ?)",
+        ("in", "gbl.gbl_customer", "mart.dim_customer")
+    ),
+    "lineage (outputs of pipelines)": (
+        "SELECT DATA_FLOW_GROUP_ID, OBJECT_NAME FROM pipeline_lineage WHERE DIRECTION = ? AND DATA_FLOW_GROUP_ID IN (?, ?)",
+        ("out", "x", "y")
+    ),
+    "search_pipelines": (
+        "SELECT h.DATA_FLOW_GROUP_ID FROM pipeline_search"
+        " CROSS JOIN data_flow_control_header h ON h.rowid = pipeline_search.rowid"
+        " WHERE pipeline_search MATCH ? AND h.ETL_LAYER = ? ORDER BY pipeline_search.rank LIMIT 50",
+        ('"gbl_customer"*', "L0")
+    ),
+}
+
+
+# Tables that are meant to be read whole: catalog_summary holds one trigger-maintained row per
+# distinct value of a few header columns and llm_response_cache_size a single row, so scanning
+# them is cheaper than any index lookup
+FULL_SCAN_TABLES = {"catalog_summary", "llm_response_cache_size"}
+
+
+def _plan_uses_index(plan_details):
+    """
+    A plan is index-backed when every table access goes through an index (or reads a FULL_SCAN_TABLES
+    table) and nothing is sorted in a temp b-tree.
+    """
+    for detail in plan_details:
+        if "USE TEMP B-TREE" in detail:
+            return False
+        if detail.startswith("SCAN") and detail.split()[1] in FULL_SCAN_TABLES:
+            continue
+        if (detail.startswith("SCAN") or detail.startswith("SEARCH")) and "INDEX" not in detail and "PRIMARY KEY" not in detail:
+            return False
+    return True
+
+
+def check_query_plans(conn=None):
+    """
+    Runs EXPLAIN QUERY PLAN for each entry in HOT_QUERIES.
+    Returns a list of (name, plan_details, uses_index) tuples.
+    """
+    conn = conn or get_connection()
+    results = []
+    for name, (query, params) in HOT_QUERIES.items():
+        plan_details = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()]
+        results.append((name, plan_details, _plan_uses_index(plan_details)))
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        conn = get_connection(sys.argv[1])
+    else:
+        conn = get_connection()
+    print(f"Schema version: {migrate(conn)}")
+
+    all_indexed = True
+    for name, plan_details, uses_index in check_query_plans(conn):
+        print(f"[{'OK' if uses_index else 'FULL SCAN'}] {name}: {' | '.join(plan_details)}")
+        all_indexed = all_indexed and uses_index
+    sys.exit(0 if all_indexed else 1)
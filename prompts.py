@@ -0,0 +1,214 @@
+"""
+The AI assistant's system prompts and the models that carry them.
+
+Each stage of the assistant (header, l0, l1_l2, show_details) has its own GenerativeModel, created
+once per process with the stage's prompt as its system instruction: a call sends only the user's
+message as content instead of prepending the whole prompt to it. Where a prompt is long enough
+for the API's explicit context caching (CONTEXT_CACHE_MIN_TOKENS), the stage model reads it from a
+CachedContent that is renewed before it expires; shorter prompts (all of them today) rely on the
+model's implicit prefix caching.
+
+A prompt must stay within PROMPT_TOKEN_BUDGET tokens (tests/test_prompts.py checks the estimate). Check it after editing a prompt:
+Usage: python prompts.py [--exact]
+(--exact counts with the API's count_tokens and needs GOOGLE_API_KEY; by default tokens are estimated)
+"""
+import os
+import sys
+import threading
+import time
+from datetime import timedelta
+
+import google.generativeai as genai
+from google.api_core import exceptions as api_exceptions
+
+import llm_client
+
+MODEL_NAME = os.getenv("PIPELINES_GEMINI_MODEL", "gemini-2.5-flash")
+# The stages with a model of their own ('show_table' is answered without the model)
+STAGES = ["header", "l0", "l1_l2", "show_details"]
+# Prompts at least this long are put in an explicit context cache (the API's minimum for the model)
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("PIPELINES_CONTEXT_CACHE_MIN_TOKENS", "1024"))
+CONTEXT_CACHE_TTL_SECONDS = 3600
+# A context cache is renewed this long before it expires
+CONTEXT_CACHE_RENEW_SECONDS = 300
+
+# System Prompts for different tables and operations
+SYSTEM_PROMPTS = {
+    "header": """
+    You are an expert data analyst and an intelligent conversational assistant for managing data pipeline metadata. Your task is to extract specific field values from a user's plain English input.
+
+    You MUST follow these rules:
+    1.  **Extract Data**: Parse the user's input to extract values for the specified fields.
+    2.  **Strict Output Format**: You MUST respond with a single JSON object. The JSON object should only contain the keys for the fields you were able to extract from the user's message. Do not include any other text or formatting.
+        **Example:** For the input "create pipeline with ID my_pipeline, Business Unit is Finace, ETL Layer is L0", the correct output is `{"DATA_FLOW_GROUP_ID": "my_pipeline", "BUSINESS_UNIT": "Finace", "ETL_LAYER": "L0"}`.
+    3.  **No Extraneous Keys**: If a value for a key is not explicitly mentioned or inferred from the user's input, DO NOT include that key in the JSON response.
+    4.  **Schema and Rules**: Use the following database schema and rules to guide your extraction and validation.
+        -   **data_flow_control_header**:
+            -   DATA_FLOW_GROUP_ID (STRING, required)
+            -   BUSINESS_UNIT (STRING, required)
+            -   BUSINESS_OBJECT_NAME (STRING, required)
+            -   TRIGGER_TYPE (STRING, required): Allowed values: DLT, JOB. Dependency: Must be DLT if ETL_LAYER is L0.
+            -   ETL_LAYER (STRING, required): Allowed values: L0, L1, L2.
+            -   COMPUTE_CLASS (STRING, required)
+            -   COMPUTE_CLASS_DEV (STRING, required)
+            -   DATA_SME (STRING, required)
+            -   PRODUCT_OWNER (STRING, required)
+            -   INGESTION_BUCKET (STRING, required): 
+            -   WARNING_THRESHOLD_MINS (INT, required)
+            -   WARNING_DL_GROUP (STRING, required)
+            -   IS_ACTIVE (STRING, required): Allowed values: Y, N. Default: Y.
+            -   INGESTION_MODE (STRING, required for L0)
+            -   SPARK_CONFIGS (STRING)
+            -   COST_CENTER (STRING)
+            -   min_version (DECIMAL)
+            -   max_version (DECIMAL)
+    """,
+    "l0": """
+    You are an expert data analyst and an intelligent conversational assistant for managing data pipeline metadata. Your task is to extract specific field values from a user's plain English input for the L0 layer.
+
+    You MUST follow these rules:
+    1.  **Extract Data**: Parse the user's input to extract values for the specified fields.
+    2.  **Strict Output Format**: You MUST respond with a single JSON object. The JSON object should only contain the keys for the fields you were able to extract from the user's message. Do not include any other text or formatting.
+    3.  **No Extraneous Keys**: If a value for a key is not explicitly mentioned or inferred from the user's input, DO NOT include that key in the JSON response.
+    4.  **Schema and Rules**: Use the following database schema and rules to guide your extraction and validation.
+        -   **data_flow_l0_detail**:
+            -   SOURCE (STRING, required)
+            -   SOURCE_OBJ_SCHEMA (STRING, required)
+            -   SOURCE_OBJ_NAME (STRING, required)
+            -   LOB (STRING, required)
+            -   INPUT_FILE_FORMAT (STRING, required)
+            -   STORAGE_TYPE (STRING, required): Allowed values: C1, C2, C3, C4.
+            -   DQ_LOGIC (STRING, required)
+            -   CDC_LOGIC (STRING, required)
+            -   TRANSFORM_QUERY (STRING, required)
+            -   LOAD_TYPE (STRING, required): Allowed values: FULL, DELTA, SCD, PySpark.
+            -   PRESTAG_FLAG (STRING, required): Allowed values: Y, N.
+            -   CUSTOM_SCHEMA (STRING)
+            -   DELIMETER (STRING)
+            -   PARTITION (STRING)
+            -   IS_ACTIVE (STRING, required): Allowed values: Y, N. Default: Y.
+    """,
+    "l1_l2": """
+    You are an expert data analyst and an intelligent conversational assistant for managing data pipeline metadata. Your task is to extract specific field values from a user's plain English input for the L1 or L2 layer.
+
+    You MUST follow these rules:
+    1.  **Extract Data**: Parse the user's input to extract values for the specified fields.
+    2.  **Strict Output Format**: You MUST respond with a single JSON object. The JSON object should only contain the keys for the fields you were able to extract from the user's message. Do not include any other text or formatting.
+    3.  **No Extraneous Keys**: If a value for a key is not explicitly mentioned or inferred from the user's input, DO NOT include that key in the JSON response.
+    4.  **Schema and Rules**: Use the following database schema and rules to guide your extraction and validation.
+        -   **data_flow_pb_detail**:
+            -   LOB (STRING, required)
+            -   TARGET_OBJ_SCHEMA (STRING, required)
+            -   TARGET_OBJ_NAME (STRING, required)
+            -   PRIORITY (INT, required)
+            -   TARGET_OBJ_TYPE (STRING, required): Allowed values: Table, MV. Dependency: If Table, TRIGGER_TYPE must be JOB. If MV, TRIGGER_TYPE must be DLT.
+            -   TRANSFORM_QUERY (STRING, required)
+            -   LOAD_TYPE (STRING, required): Allowed values: FULL, DELTA, SCD. Dependency: If SCD, CUSTOM_SCRIPT_PARAMS becomes mandatory.
+            -   PARTITION_METHOD (STRING, optional): Allowed values: Partition, Liquid cluster.
+            -   CUSTOM_SCRIPT_PARAMS (STRING, optional)
+            -   GENERIC_SCRIPTS (STRING)
+            -   SOURCE_PK (STRING)
+            -   TARGET_PK (STRING)
+            -   PARTITION_OR_INDEX (STRING)
+            -   RETENTION_DETAILS (STRING)
+            -   IS_ACTIVE (STRING, required): Allowed values: Y, N. Default: Y.
+    """,
+    "show_table": """
+    You are an expert data analyst and an intelligent conversational assistant for managing data pipeline metadata. Your task is to identify a user's request to 'show' a pipeline's details.
+
+    You MUST follow these rules:
+    1.  **Identify Action**: Look for keywords like 'show table', 'display all pipelines', 'list pipelines'.
+    2.  **Strict Output Format**: You MUST respond with a single JSON object. The JSON object should have a key `action` with the value `show_all_pipelines`.
+    3.  **No Other Keys**: Do not include any other keys in the JSON response.
+    4.  **No Other Text**: Do not include any other text or conversational phrases.
+    """,
+    "show_details": """
+    You are an expert data analyst and an intelligent conversational assistant for managing data pipeline metadata. Your task is to identify a user's request to 'show' a pipeline's specific details.
+
+    You MUST follow these rules:
+    1.  **Identify Action**: Look for keywords like 'show details', 'view', 'look up', 'get details'.
+    2.  **Extract Data**: Extract the **DATA_FLOW_GROUP_ID** from the user's input.
+    3.  **Strict Output Format**: You MUST respond with a single JSON object. The JSON object should have a key `action` with the value `show_details` and a key `DATA_FLOW_GROUP_ID` with the extracted value.
+    4.  **No Other Keys**: Do not include any other keys in the JSON response.
+    5.  **No Other Text**: Do not include any other text or conversational phrases.
+    """
+}
+
+
+_models = {}
+# One lock per stage, so creating one stage's model (a network call with a context cache) never
+# holds up the other stages; _lock only guards the creation of those locks
+_lock = threading.Lock()
+_stage_locks = {}
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English and SQL), for checks without the API."""
+    return (len(text) + 3) // 4
+
+
+def _create_model(stage):
+    """Returns (model, expires_at): the stage model, from a context cache when the prompt is long enough for one."""
+    system_prompt = SYSTEM_PROMPTS[stage]
+    if estimate_tokens(system_prompt) >= CONTEXT_CACHE_MIN_TOKENS:
+        try:
+            cache = genai.caching.CachedContent.create(
+                model=MODEL_NAME, display_name=f"pipelines-{stage}", system_instruction=system_prompt,
+                ttl=timedelta(seconds=CONTEXT_CACHE_TTL_SECONDS),
+            )
+            return genai.GenerativeModel.from_cached_content(cache), time.monotonic() + CONTEXT_CACHE_TTL_SECONDS
+        except api_exceptions.GoogleAPIError:
+            # Caching unavailable for this model or key: the prompt goes with every call instead
+            pass
+    return genai.GenerativeModel(model_name=MODEL_NAME, system_instruction=system_prompt), None
+
+
+def _needs_model(entry):
+    """Whether a (model, expires_at) entry is missing or its context cache is due for renewal."""
+    model, expires_at = entry
+    return model is None or (expires_at is not None and time.monotonic() > expires_at - CONTEXT_CACHE_RENEW_SECONDS)
+
+
+def get_stage_model(stage):
+    """The model for a stage, created on first use and re-created when its context cache is about to expire."""
+    entry = _models.get(stage, (None, None))
+    if not _needs_model(entry):
+        return entry[0]
+    with _lock:
+        stage_lock = _stage_locks.setdefault(stage, threading.Lock())
+    # While another session renews the context cache, the current one is still valid for a while
+    if not stage_lock.acquire(blocking=entry[0] is None):
+        return entry[0]
+    try:
+        entry = _models.get(stage, (None, None))
+        if _needs_model(entry):
+            entry = _models[stage] = _create_model(stage)
+        return entry[0]
+    finally:
+        stage_lock.release()
+
+
+def check_prompt_budget(exact=False):
+    """
+    Counts the tokens of each stage's system prompt (with the API's count_tokens when exact).
+    Returns a list of (stage, tokens, within_budget) tuples.
+    """
+    results = []
+    for stage in STAGES:
+        if exact:
+            tokens = genai.GenerativeModel(MODEL_NAME).count_tokens(SYSTEM_PROMPTS[stage]).total_tokens
+        else:
+            tokens = estimate_tokens(SYSTEM_PROMPTS[stage])
+        results.append((stage, tokens, tokens <= llm_client.PROMPT_TOKEN_BUDGET))
+    return results
+
+
+if __name__ == "__main__":
+    exact = "--exact" in sys.argv[1:]
+    if exact:
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    within = True
+    for stage, tokens, within_budget in check_prompt_budget(exact):
+        print(f"[{'OK' if within_budget else 'OVER BUDGET'}] {stage}: {tokens} tokens (budget {llm_client.PROMPT_TOKEN_BUDGET})")
+        within = within and within_budget
+    sys.exit(0 if within else 1)
@@ -1,6 +1,84 @@
 import streamlit as st
-import pandas as pd
 import database
+import catalog_cache
+import fuzzy_index
+import search_index
+
+# Page sizes offered by the results pager
+PAGE_SIZE_OPTIONS = [25, 50, 100]
+
+# Sortable result columns (see database.SORT_KEYS) and their labels
+SORT_OPTIONS = {
+    'UPDATED_TS': "Last Updated",
+    'DATA_FLOW_GROUP_ID': "Pipeline",
+    'ETL_LAYER': "Layer",
+    'BUSINESS_UNIT': "Business Unit",
+    'IS_ACTIVE': "Status",
+}
+
+RESULT_COLUMNS = ['DATA_FLOW_GROUP_ID', 'IS_ACTIVE', 'ETL_LAYER', 'BUSINESS_UNIT', 'UPDATED_TS']
+
+
+def reset_pager_if_changed(signature):
+    """Goes back to page 1 whenever the search text, filters, sort or page size change."""
+    if st.session_state.get('search_pager_signature') != signature:
+        st.session_state.search_pager_signature = signature
+        st.session_state.search_page = 0
+        # Keyset cursor that starts each page visited so far (page 1 starts at None)
+        st.session_state.search_page_cursors = [None]
+
+
+def show_catalog_metrics(summary):
+    """Draws the metrics strip: pipeline totals by status and layer, and the size of each breakdown."""
+    layers = summary['ETL_LAYER']
+    statuses = summary['IS_ACTIVE']
+    metrics = [("Pipelines", sum(layers.values())), ("Active", statuses.get('Y', 0)), ("Inactive", statuses.get('N', 0))]
+    metrics += [(f"Layer {layer or 'not set'}", count) for layer, count in sorted(layers.items())]
+    metrics += [
+        ("Business Units", len([value for value in summary['BUSINESS_UNIT'] if value])),
+        ("Compute Classes", len([value for value in summary['COMPUTE_CLASS'] if value])),
+        ("Cost Centers", len([value for value in summary['COST_CENTER'] if value])),
+    ]
+    for col, (label, value) in zip(st.columns(len(metrics)), metrics):
+        col.metric(label, value)
+
+    with st.expander("Catalog breakdown"):
+        columns = [("BUSINESS_UNIT", "Business Unit"), ("COMPUTE_CLASS", "Compute Class"), ("COST_CENTER", "Cost Center")]
+        for col, (column, label) in zip(st.columns(len(columns)), columns):
+            with col:
+                rows = sorted(summary[column].items(), key=lambda item: (-item[1], item[0]))
+                st.dataframe([{label: value or "(not set)", "Pipelines": count} for value, count in rows], hide_index=True)
+
+
+def use_suggestion(text):
+    """Callback: replaces the search text with a "Did you mean" suggestion."""
+    st.session_state.search_query = text
+
+
+def fetch_page(search_query, filters, match_count, page_size, order_by, descending):
+    """
+    Fetches only the rows of the current page.
+    Returns (rows, snippets, has_next_page, match_count); match_count changes for substring matches.
+    """
+    page = st.session_state.search_page
+    if search_query and match_count:
+        # Full-text matches, best first
+        rows = catalog_cache.search_pipelines(
+            search_query, filters, limit=page_size, offset=page * page_size,
+            columns=RESULT_COLUMNS, snippet_marks=('[', ']')
+        )
+        snippets = {row['DATA_FLOW_GROUP_ID']: row['snippet'] for row in rows}
+        return rows, snippets, (page + 1) * page_size < match_count, match_count
+    if search_query:
+        # No whole-word or prefix match: fall back to substring matching (e.g. part of a name)
+        rows, match_count = search_index.search(search_query, filters, limit=page_size, offset=page * page_size)
+        return rows, {}, (page + 1) * page_size < match_count, match_count
+
+    cursors = st.session_state.search_page_cursors
+    rows, next_cursor = catalog_cache.list_pipelines(page_size, cursors[page], filters, RESULT_COLUMNS, order_by, descending)
+    if next_cursor is not None and len(cursors) == page + 1:
+        cursors.append(next_cursor)
+    return rows, {}, next_cursor is not None, match_count
 
 def show():
     """
@@ -8,6 +86,9 @@ def show():
     """
     st.subheader("🔍 Search Pipelines")
 
+    # Counts kept exact by triggers (catalog_summary): one small cached read per catalog version
+    show_catalog_metrics(catalog_cache.get_catalog_summary())
+
     # --- FIX: State management for delete confirmation ---
     # These lines must be at the very top of the function
     if 'delete_confirm' not in st.session_state:
@@ -15,49 +96,77 @@ def show():
     if 'pipeline_to_delete' not in st.session_state:
         st.session_state.pipeline_to_delete = None
 
-    all_pipelines = database.get_all_pipelines()
+    if 'search_table_key' not in st.session_state:
+        st.session_state.search_table_key = 0
 
-    # --- Conditional setup for filter options ---
-    if all_pipelines:
-        df = pd.DataFrame(all_pipelines)
-        status_options = ["All"] + sorted(df['IS_ACTIVE'].unique().tolist())
-        layer_options = ["All"] + sorted(df['ETL_LAYER'].unique().tolist())
-        all_units = sorted(df['BUSINESS_UNIT'].unique().tolist())
-        unit_options = ["All"] + all_units
-    else:
-        df = pd.DataFrame()
-        status_options = ["All"]
-        layer_options = ["All"]
-        unit_options = ["All"]
+    # --- Widget values are already in session_state when the script reruns, so the filters and
+    # facet counts can be computed before the widgets are drawn. All filtering happens in SQL,
+    # and results are shared across sessions until the catalog changes (catalog_cache). ---
+    search_query = st.session_state.get('search_query', '').strip()
+    filters = {
+        'IS_ACTIVE': st.session_state.get('status_filter', 'All'),
+        'ETL_LAYER': st.session_state.get('layer_filter', 'All'),
+        'BUSINESS_UNIT': st.session_state.get('unit_filter', 'All'),
+        'TEXT': search_query,
+    }
+    total_count = catalog_cache.count_pipelines()
+    facets = catalog_cache.get_facet_counts(filters)
+
+    def facet_options(column, widget_key):
+        counts = facets[column]
+        options = ["All"] + sorted(value for value in counts if value is not None)
+        # Keep the current choice selectable even when no pipeline has it any more
+        selected = st.session_state.get(widget_key, "All")
+        if selected not in options:
+            options.append(selected)
+        return options, lambda value: value if value == "All" else f"{value} ({counts.get(value, 0)})"
+
+    status_options, status_format = facet_options('IS_ACTIVE', 'status_filter')
+    layer_options, layer_format = facet_options('ETL_LAYER', 'layer_filter')
+    unit_options, unit_format = facet_options('BUSINESS_UNIT', 'unit_filter')
 
     # --- Render Filter Controls (Always visible) ---
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        search_query = st.text_input(
-            "Search by name, ID, business unit, or owner...",
+        st.text_input(
+            "Search by ID, owner, source/target object, or SQL logic...",
             placeholder="e.g., customer_sales_etl_001",
             key="search_query"
         )
     with col2:
-        status_filter = st.selectbox("Statuses", status_options, key="status_filter")
+        st.selectbox("Statuses", status_options, format_func=status_format, key="status_filter")
     with col3:
-        layer_filter = st.selectbox("Layers", layer_options, key="layer_filter")
+        st.selectbox("Layers", layer_options, format_func=layer_format, key="layer_filter")
     with col4:
-        unit_filter = st.selectbox("Units", unit_options, key="unit_filter")
-    
-    # --- Filter data based on selections ---
-    if not df.empty:
-        filtered_df = df.copy()
-        if search_query:
-            filtered_df = filtered_df[filtered_df.apply(lambda row: search_query.lower() in str(row).lower(), axis=1)]
-        if status_filter != "All":
-            filtered_df = filtered_df[filtered_df['IS_ACTIVE'] == status_filter]
-        if layer_filter != "All":
-            filtered_df = filtered_df[filtered_df['ETL_LAYER'] == layer_filter]
-        if unit_filter != "All":
-            filtered_df = filtered_df[filtered_df['BUSINESS_UNIT'] == unit_filter]
-
-        st.write(f"Pipeline Results ({len(filtered_df)} of {len(all_pipelines)} pipelines)")
+        st.selectbox("Units", unit_options, format_func=unit_format, key="unit_filter")
+
+    if total_count:
+        # The layer facet is counted under every other filter, so the match count falls out of it
+        layer_counts = facets['ETL_LAYER']
+        if filters['ETL_LAYER'] == "All":
+            match_count = sum(layer_counts.values())
+        else:
+            match_count = layer_counts.get(filters['ETL_LAYER'], 0)
+
+        # --- Paging and sorting controls ---
+        col_sort, col_direction, col_size = st.columns([3, 2, 1])
+        with col_sort:
+            order_by = st.selectbox(
+                "Sort by", list(SORT_OPTIONS), format_func=SORT_OPTIONS.get, key="search_sort",
+                disabled=bool(search_query), help="Text search results are sorted by relevance."
+            )
+        with col_direction:
+            descending = st.radio("Order", ["Descending", "Ascending"], horizontal=True, key="search_order",
+                                  disabled=bool(search_query)) == "Descending"
+        with col_size:
+            page_size = st.selectbox("Page size", PAGE_SIZE_OPTIONS, index=1, key="search_page_size")
+
+        reset_pager_if_changed((search_query, tuple(sorted(filters.items())), order_by, descending, page_size))
+        rows, snippets, has_next_page, match_count = fetch_page(search_query, filters, match_count, page_size, order_by, descending)
+        if search_query and rows and not snippets:
+            st.caption("No whole-word matches; showing pipelines containing the text.")
+
+        st.write(f"Pipeline Results ({match_count} of {total_count} pipelines)")
 
         # --- Confirmation Pop-up for Delete (NEW) ---
         if st.session_state.delete_confirm:
@@ -81,41 +190,62 @@ def show():
                 pass
             with _:
                 pass
-        # --- Display results with action buttons (Manual Row Rendering) ---
-        if not filtered_df.empty:
-            col_names = ["Pipeline", "Status", "Layer", "Business Unit", "Last Updated", "Actions"]
-            cols = st.columns([5, 2, 1, 2, 2, 1])
-            for col, col_name in zip(cols, col_names):
-                col.markdown(f"**{col_name}**")
-            st.markdown("---")
-
-            for _, row in filtered_df.iterrows():
-                cols = st.columns([5, 2, 1, 2, 2, 1])
-                pipeline_name = row.get('DATA_FLOW_GROUP_ID', 'N/A')
-                pipeline_status = "🟢 Active" if row.get('IS_ACTIVE') == 'Y' else "🔴 Inactive"
-                pipeline_layer = row.get('ETL_LAYER', 'N/A')
-                business_unit = row.get('BUSINESS_UNIT', 'N/A')
-                updated_ts = row.get('UPDATED_TS', 'N/A')
-
-                with cols[0]:
-                    st.write(pipeline_name)
-                with cols[1]:
-                    st.write(pipeline_status)
-                with cols[2]:
-                    st.write(pipeline_layer)
-                with cols[3]:
-                    st.write(business_unit)
-                with cols[4]:
-                    st.write(updated_ts)
-                with cols[5]:
-                    if st.button("📝Edit", key=f"edit_{pipeline_name}"):
-                        st.session_state.edit_pipeline_id = pipeline_name
-                        st.session_state.current_pipeline_layer = pipeline_layer
-                        st.session_state.form_visible = True
-                        st.session_state.current_view = 'add_edit'
-                        st.rerun()
-                st.markdown("---")
+        # --- Display the current page; selecting a row opens it in the editor ---
+        if rows:
+            table = []
+            for row in rows:
+                table_row = {
+                    "Pipeline": row['DATA_FLOW_GROUP_ID'],
+                    "Status": "🟢 Active" if row.get('IS_ACTIVE') == 'Y' else "🔴 Inactive",
+                    "Layer": row.get('ETL_LAYER'),
+                    "Business Unit": row.get('BUSINESS_UNIT'),
+                    "Last Updated": row.get('UPDATED_TS'),
+                }
+                if snippets:
+                    table_row["Match"] = snippets.get(row['DATA_FLOW_GROUP_ID'])
+                table.append(table_row)
+
+            event = st.dataframe(
+                table,
+                hide_index=True,
+                on_select="rerun",
+                selection_mode="single-row",
+                key=f"search_results_{st.session_state.search_table_key}",
+            )
+            if event.selection.rows:
+                selected = rows[event.selection.rows[0]]
+                # A new table key drops the selection, so coming back to the dashboard does not reopen it
+                st.session_state.search_table_key += 1
+                st.session_state.edit_pipeline_id = selected['DATA_FLOW_GROUP_ID']
+                st.session_state.current_pipeline_layer = selected['ETL_LAYER']
+                st.session_state.form_visible = True
+                st.session_state.current_view = 'add_edit'
+                st.rerun()
+            st.caption("Select a row to open the pipeline in the editor.")
+
+            page = st.session_state.search_page
+            col_prev, col_page, col_next = st.columns([1, 4, 1])
+            with col_prev:
+                if st.button("← Previous", key="search_prev_page", disabled=page == 0):
+                    st.session_state.search_page -= 1
+                    st.rerun()
+            with col_page:
+                page_count = max(1, -(-match_count // page_size))
+                st.caption(f"Page {page + 1} of {page_count}")
+            with col_next:
+                if st.button("Next →", key="search_next_page", disabled=not has_next_page):
+                    st.session_state.search_page += 1
+                    st.rerun()
         else:
             st.info("No pipelines match the current filters.")
+            if search_query:
+                suggestions = fuzzy_index.find_pipelines(search_query, limit=5)
+                if suggestions:
+                    st.write("Did you mean:")
+                    for suggestion in suggestions:
+                        st.button(
+                            suggestion['name'], key=f"did_you_mean_{suggestion['DATA_FLOW_GROUP_ID']}",
+                            on_click=use_suggestion, args=(suggestion['name'],)
+                        )
     else:
         st.info("No pipelines found. Create one to get started!")
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+In-memory substring index for the pipeline dashboard.
+
+The FTS5 search in database.search_pipelines() matches whole words and word prefixes.
+This index covers the rest: any substring of a pipeline's ID, business/owner fields or
+source/target object names (e.g. 'ustomer' in GBL_CUSTOMER). Every pipeline is reduced
+once to a lowercase haystack string, and a query is a single vectorized str.contains over
+all of them. The index is rebuilt only when the catalog version changes and is shared by
+all sessions of the process.
+
+Usage: python search_index.py [N]   - benchmark build and search over N synthetic pipelines
+"""
+import argparse
+import threading
+import time
+
+import pandas as pd
+
+import database
+
+# Listing columns kept next to the haystack, so results need no further database reads
+RESULT_COLUMNS = ['DATA_FLOW_GROUP_ID', 'IS_ACTIVE', 'ETL_LAYER', 'BUSINESS_UNIT', 'UPDATED_TS']
+HAYSTACK_COLUMNS = ['DATA_FLOW_GROUP_ID', 'HEADER_TEXT', 'OBJECT_NAMES']
+FILTER_COLUMNS = ['IS_ACTIVE', 'ETL_LAYER', 'BUSINESS_UNIT']
+# Never typed by users, so a query cannot match across two fields
+SEPARATOR = '\x1f'
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def build_index(documents, version=None):
+    """Builds the index from database.get_search_documents()-style rows."""
+    frame = pd.DataFrame(documents, columns=RESULT_COLUMNS + HAYSTACK_COLUMNS[1:])
+    parts = [frame[col].fillna('').astype(str) for col in HAYSTACK_COLUMNS]
+    haystack = parts[0].str.cat(parts[1:], sep=SEPARATOR).str.lower()
+    frame = frame[RESULT_COLUMNS].copy()
+    # Few distinct values: categoricals make the equality filters integer comparisons
+    for column in FILTER_COLUMNS:
+        frame[column] = frame[column].astype('category')
+    return {'version': version, 'frame': frame, 'haystack': haystack}
+
+
+def get_index():
+    """Returns the process-wide index, rebuilding it first if the catalog has changed since it was built."""
+    global _index
+    version = database.get_catalog_version()
+    index = _index
+    if index is None or index['version'] != version:
+        with _index_lock:
+            if _index is None or _index['version'] != version:
+                _index = build_index(database.get_search_documents(), version)
+            index = _index
+    return index
+
+
+def search(text, filters=None, limit=None, offset=0, index=None):
+    """
+    Returns (rows, match_count): the pipelines whose haystack contains `text` (case-insensitive),
+    newest first, cut to `limit` rows after skipping `offset`. filters takes equality filters on FILTER_COLUMNS,
+    e.g. {'ETL_LAYER': 'L0', 'IS_ACTIVE': 'All'}; other keys are ignored.
+    """
+    index = index or get_index()
+    frame = index['frame']
+    mask = index['haystack'].str.contains(text.strip().lower(), regex=False).to_numpy()
+    for column, value in (filters or {}).items():
+        if value is None or value == "All" or column not in FILTER_COLUMNS:
+            continue
+        mask = mask & (frame[column] == value).to_numpy()
+
+    matches = frame[mask]
+    rows = matches.iloc[offset:] if limit is None else matches.iloc[offset:offset + limit]
+    return rows.to_dict('records'), len(matches)
+
+
+def benchmark(count=100_000, queries=('ustomer', 'sales_etl_0042', 'no-such-pipeline')):
+    """Times an index build and a few queries over `count` synthetic pipelines."""
+    documents = [
+        {
+            'DATA_FLOW_GROUP_ID': f'customer_sales_etl_{i:06d}',
+            'IS_ACTIVE': 'Y' if i % 4 else 'N',
+            'ETL_LAYER': f'L{i % 3}',
+            'BUSINESS_UNIT': f'unit_{i % 25}',
+            'UPDATED_TS': f'2024-01-01 00:00:{i % 60:02d}',
+            'HEADER_TEXT': f'unit_{i % 25} owner{i % 500}@example.com data_sme{i % 97}@example.com CC{i % 40}',
+            'OBJECT_NAMES': f'sap GBL.GBL_CUSTOMER_{i % 1000} MART.DIM_CUSTOMER_{i}',
+        }
+        for i in range(count)
+    ]
+    start = time.perf_counter()
+    index = build_index(documents)
+    print(f"build: {count} pipelines in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    for query in queries:
+        for filters in (None, {'ETL_LAYER': 'L1'}):
+            start = time.perf_counter()
+            rows, match_count = search(query, filters, limit=50, index=index)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"search {query!r} filters={filters}: {match_count} matches in {elapsed:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the in-memory pipeline search index.")
+    parser.add_argument("count", type=int, nargs="?", default=100_000, help="Number of synthetic pipelines")
+    args = parser.parse_args()
+    benchmark(args.count)
+
+
+if __name__ == "__main__":
+    main()
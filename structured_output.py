@@ -0,0 +1,176 @@
+"""
+Schema-constrained JSON output for the AI assistant's extraction calls.
+
+generation_config(kind) puts a model call in JSON mode (response_mime_type application/json) with a
+response schema built from validation: one property per field of ALL_FIELDS_HEADER, ALL_FIELDS_L0
+or ALL_FIELDS_PB, the VALID_OPTIONS values as enums, integer and decimal fields typed as such.
+The model then answers with a bare JSON object using only known keys and allowed values, instead
+of prose or a fenced block the caller had to strip.
+
+parse_response() is the fallback for output that is still not clean JSON (cached answers from
+before JSON mode, a stream cut off at the deadline): it strips code fences, ignores text around the
+object and closes a truncated one, so a usable extraction is not thrown away. Every parse is
+counted per call name, together with whether the old strict parsing would have failed on the same
+text, so get_stats() shows the parse-failure rate before and after.
+"""
+import json
+import re
+import threading
+
+from local_parser import INTEGER_FIELDS
+from validation import ALL_FIELDS_HEADER, ALL_FIELDS_L0, ALL_FIELDS_PB, VALID_OPTIONS
+
+FIELDS_BY_KIND = {'header': ALL_FIELDS_HEADER, 'l0': ALL_FIELDS_L0, 'pb': ALL_FIELDS_PB}
+DECIMAL_FIELDS = {"min_version", "max_version"}
+
+_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+# What a truncated object may end with that cannot be closed as is: a comma, a key without its value
+_DANGLING = re.compile(r'(?:,|"(?:[^"\\]|\\.)*"\s*:)\s*$', re.DOTALL)
+_DANGLING_KEY = re.compile(r'(?<=[{,])\s*"(?:[^"\\]|\\.)*"\s*$', re.DOTALL)
+_decoder = json.JSONDecoder(strict=False)
+
+_lock = threading.Lock()
+_stats = {}
+_configs = {}
+
+
+def field_schema(column):
+    """Schema of one column: integer, number or string (an enum when it has VALID_OPTIONS)."""
+    if column in INTEGER_FIELDS:
+        return {'type': 'integer'}
+    if column in DECIMAL_FIELDS:
+        return {'type': 'number'}
+    if column in VALID_OPTIONS:
+        return {'type': 'string', 'format': 'enum', 'enum': list(VALID_OPTIONS[column])}
+    return {'type': 'string'}
+
+
+def response_schema(kind):
+    """
+    Schema of the model's answer for 'header', 'l0', 'pb' or 'show_details'. Extraction schemas have
+    no required keys: the model only returns the fields the user mentioned.
+    """
+    if kind == 'show_details':
+        return {
+            'type': 'object',
+            'properties': {'action': {'type': 'string', 'format': 'enum', 'enum': ['show_details']},
+                           'DATA_FLOW_GROUP_ID': {'type': 'string'}},
+            'required': ['action', 'DATA_FLOW_GROUP_ID'],
+        }
+    return {'type': 'object', 'properties': {column: field_schema(column) for column in FIELDS_BY_KIND[kind]}}
+
+
+def generation_config(kind):
+    """The generation_config for a model call answering in JSON with response_schema(kind)."""
+    if kind not in _configs:
+        _configs[kind] = {'response_mime_type': 'application/json', 'response_schema': response_schema(kind)}
+    return _configs[kind]
+
+
+def _strip_dangling(text, in_object):
+    while True:
+        stripped = _DANGLING.sub('', text.rstrip())
+        if in_object:
+            stripped = _DANGLING_KEY.sub('', stripped)
+        if stripped == text:
+            return text
+        text = stripped
+
+
+def complete_json(fragment):
+    """
+    Closes a truncated JSON object: open arrays and objects are closed, while a string cut off midway
+    (a value that may be incomplete), trailing commas and a key left without a value are dropped.
+    Text after the object is ignored.
+    """
+    out = ''
+    stack = []
+    in_string = escaped = False
+    string_start = 0
+    for char in fragment:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            out += char
+            continue
+        if char in '}]':
+            out = _strip_dangling(out, stack[-1:] == ['}']) + (stack.pop() if stack else '')
+            if not stack:
+                return out
+            continue
+        if char == '"':
+            in_string = True
+            string_start = len(out)
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        out += char
+    if in_string:
+        out = out[:string_start]
+    while stack:
+        out = _strip_dangling(out, stack[-1] == '}') + stack.pop()
+    return out
+
+
+def parse_object(text):
+    """Reads the JSON object in a model response, tolerating fences, surrounding text and truncation. Raises ValueError."""
+    text = _FENCE.sub('', text or '').strip()
+    start = text.find('{')
+    if start < 0:
+        raise ValueError("The model response holds no JSON object.")
+    try:
+        data, _ = _decoder.raw_decode(text, start)
+    except ValueError:
+        data = _decoder.decode(complete_json(text[start:]))
+    if not isinstance(data, dict):
+        raise ValueError("The model response is not a JSON object.")
+    return data
+
+
+def _strict_parse_fails(text):
+    """Whether the assistant's previous parsing (strip fences, require {...}, json.loads) rejects the text."""
+    text = (text or '').replace("```json", "").replace("```", "").strip()
+    if not text.startswith('{') or not text.endswith('}'):
+        return True
+    try:
+        json.loads(text)
+    except ValueError:
+        return True
+    return False
+
+
+def _record(name, strict_failed, failed):
+    with _lock:
+        stats = _stats.setdefault(name, {'responses': 0, 'strict_failures': 0, 'failures': 0})
+        stats['responses'] += 1
+        stats['strict_failures'] += strict_failed
+        stats['failures'] += failed
+
+
+def parse_response(text, name='default'):
+    """parse_object() for a response of the named call, counted in get_stats(). Raises ValueError."""
+    strict_failed = _strict_parse_fails(text)
+    try:
+        data = parse_object(text)
+    except ValueError:
+        _record(name, strict_failed, True)
+        raise
+    _record(name, strict_failed, False)
+    return data
+
+
+def get_stats():
+    """
+    Returns per call name the responses parsed, how many failed, and how many strict parsing would
+    have rejected, with both rates, e.g.
+    {'header': {'responses': 40, 'strict_failures': 3, 'failures': 0, 'strict_failure_rate': 0.075, 'failure_rate': 0.0}}
+    """
+    with _lock:
+        report = {name: dict(stats) for name, stats in _stats.items()}
+    for stats in report.values():
+        stats['strict_failure_rate'] = stats['strict_failures'] / stats['responses']
+        stats['failure_rate'] = stats['failures'] / stats['responses']
+    return report
@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+
+# Repo modules are flat files at the repository root; validation bootstraps a database at import,
+# so point it at a scratch file before anything is imported
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("PIPELINES_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="pipelines-tests-"), "pipelines.db"))
+
+import pytest
+
+import database
+import db_connection
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh, migrated database for one test."""
+    previous = db_connection.get_db_path()
+    db_connection.set_db_path(str(tmp_path / "pipelines.db"))
+    database.init_db()
+    yield db_connection.get_connection()
+    db_connection.set_db_path(previous)
+
+
+def header_record(pipeline_id, **overrides):
+    """A valid L1 header record for bulk_upsert / bulk_import."""
+    from validation import compute_class_options, dev_compute_class_options
+    record = {
+        "DATA_FLOW_GROUP_ID": pipeline_id, "BUSINESS_UNIT": "finance", "BUSINESS_OBJECT_NAME": f"{pipeline_id}_object",
+        "TRIGGER_TYPE": "JOB", "ETL_LAYER": "L1", "COMPUTE_CLASS": compute_class_options[0],
+        "COMPUTE_CLASS_DEV": dev_compute_class_options[0], "DATA_SME": "sme@example.com",
+        "PRODUCT_OWNER": "owner@example.com", "WARNING_THRESHOLD_MINS": "30", "WARNING_DL_GROUP": "dl-group",
+        "IS_ACTIVE": "Y",
+    }
+    record.update(overrides)
+    return record
@@ -0,0 +1,98 @@
+import gzip
+import http.client
+import json
+import threading
+from urllib.parse import quote
+
+import pytest
+
+import api_server
+from conftest import header_record
+
+
+@pytest.fixture
+def api(db):
+    server = api_server.make_server(port=0, workers=2)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+
+    def request(method, path, body=None, headers=None):
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+        if body is not None and not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        conn.request(method, path, body, headers or {})
+        response = conn.getresponse()
+        data = response.read()
+        conn.close()
+        return response.status, dict(response.getheaders()), json.loads(data) if data else None
+
+    yield request
+    server.shutdown()
+    server.server_close()
+
+
+def test_create_read_update_delete(api):
+    assert api("POST", "/pipelines", header_record("api_001"))[0] == 201
+    assert api("POST", "/pipelines", header_record("api_001"))[0] == 409
+    status, _, pipeline = api("GET", "/pipelines/api_001")
+    assert status == 200 and pipeline["BUSINESS_UNIT"] == "finance"
+    assert api("PUT", "/pipelines/api_001", dict(pipeline, BUSINESS_UNIT="sales"))[0] == 200
+    assert api("GET", "/pipelines/api_001")[2]["BUSINESS_UNIT"] == "sales"
+    assert api("DELETE", "/pipelines/api_001")[0] == 200
+    assert api("GET", "/pipelines/api_001")[0] == 404
+    assert api("DELETE", "/pipelines/api_001")[0] == 404
+
+
+def test_invalid_requests(api):
+    assert api("POST", "/pipelines", header_record("api_001", ETL_LAYER="L9"))[0] == 400
+    assert api("PUT", "/pipelines/api_001", header_record("other_id"))[0] == 400
+    assert api("POST", "/pipelines", b"{not json", {"Content-Type": "application/json"})[0] == 400
+    assert api("GET", "/nowhere")[0] == 404
+    assert api("DELETE", "/pipelines")[0] == 405
+    assert api("GET", "/pipelines?page_size=5000")[0] == 400
+    assert api("GET", "/pipelines?order_by=PRODUCT_OWNER")[0] == 400
+
+
+def test_etag_answers_304_until_the_catalog_changes(api):
+    status, headers, _ = api("GET", "/version")
+    etag = headers["ETag"]
+    assert status == 200
+    assert api("GET", "/pipelines", headers={"If-None-Match": etag})[0] == 304
+    api("PUT", "/pipelines/api_001", header_record("api_001"))
+    status, headers, _ = api("GET", "/pipelines", headers={"If-None-Match": etag})
+    assert status == 200 and headers["ETag"] != etag
+
+
+def test_pages_follow_the_cursor(api):
+    for i in range(5):
+        api("PUT", f"/pipelines/api_{i:03}", header_record(f"api_{i:03}"))
+    ids, cursor = [], None
+    while True:
+        path = "/pipelines?order_by=DATA_FLOW_GROUP_ID&descending=false&page_size=2"
+        if cursor:
+            path += "&cursor=" + quote(json.dumps(cursor))
+        status, _, page = api("GET", path)
+        assert status == 200
+        ids += [row["DATA_FLOW_GROUP_ID"] for row in page["pipelines"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert ids == [f"api_{i:03}" for i in range(5)]
+
+
+@pytest.mark.parametrize("cursor", ["not-json", "{}", "[1]", '[{"a":1},2]', "[[1],2]", "[1,2,3]"])
+def test_malformed_cursor_is_a_bad_request(api, cursor):
+    status, _, body = api("GET", "/pipelines?cursor=" + quote(cursor))
+    assert status == 400 and "cursor" in body["error"]
+
+
+def test_gzip_request_bodies(api, monkeypatch):
+    body = gzip.compress(json.dumps(header_record("api_gz")).encode('utf-8'))
+    assert api("PUT", "/pipelines/api_gz", body, {"Content-Encoding": "gzip"})[0] == 201
+    assert api("PUT", "/pipelines/api_gz", b"not gzip at all", {"Content-Encoding": "gzip"})[0] == 400
+    assert api("PUT", "/pipelines/api_gz", body[:-10], {"Content-Encoding": "gzip"})[0] == 400
+    # A small body inflating past the limit
+    monkeypatch.setattr(api_server, "MAX_BODY_BYTES", 10_000)
+    bomb = gzip.compress(b" " * 100_000)
+    assert len(bomb) < 10_000
+    assert api("PUT", "/pipelines/api_gz", bomb, {"Content-Encoding": "gzip"})[0] == 413
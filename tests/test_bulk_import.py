@@ -0,0 +1,54 @@
+import io
+import json
+
+import bulk_import
+from conftest import header_record
+
+
+def _jsonl(records):
+    return io.BytesIO("\n".join(json.dumps(dict({"RECORD_TYPE": "header"}, **record)) for record in records).encode())
+
+
+def _pb_record(pipeline_id, target_type):
+    return {
+        "RECORD_TYPE": "pb", "DATA_FLOW_GROUP_ID": pipeline_id, "LOB": "gbl", "TARGET_OBJ_SCHEMA": "mart",
+        "TARGET_OBJ_NAME": f"{pipeline_id}_target", "PRIORITY": "1", "TARGET_OBJ_TYPE": target_type,
+        "TRANSFORM_QUERY": "select * from gbl.orders", "LOAD_TYPE": "FULL", "IS_ACTIVE": "Y",
+    }
+
+
+def test_rejects_kept_in_report_are_capped(db, monkeypatch):
+    monkeypatch.setattr(bulk_import, "MAX_REPORTED_REJECTS", 3)
+    records = [{"DATA_FLOW_GROUP_ID": f"bad_{i}"} for i in range(10)]
+    report = bulk_import.import_file(_jsonl(records), "jsonl", dry_run=True)
+    assert report["rejected"] == 10
+    assert [reject["DATA_FLOW_GROUP_ID"] for reject in report["rejects"]] == ["bad_0", "bad_1", "bad_2"]
+
+
+def test_dry_run_counts_repeats_in_later_chunks_as_updates(db):
+    records = [header_record("p_a"), header_record("p_b"), header_record("p_a", BUSINESS_UNIT="sales")]
+    dry = bulk_import.import_file(_jsonl(records), "jsonl", dry_run=True, chunk_size=2)
+    assert (dry["inserted"], dry["updated"], dry["rejected"]) == (2, 1, 0)
+    assert db.execute("SELECT COUNT(*) FROM data_flow_control_header").fetchone()[0] == 0
+
+    real = bulk_import.import_file(_jsonl(records), "jsonl", dry_run=False, chunk_size=2)
+    assert (real["inserted"], real["updated"]) == (dry["inserted"], dry["updated"])
+
+
+def test_pb_rows_are_checked_against_headers_of_earlier_chunks(db):
+    # The JOB header is in the first chunk; TARGET_OBJ_TYPE 'MV' needs a DLT pipeline
+    records = [header_record("p_a"), header_record("p_b"), _pb_record("p_a", "Table"), _pb_record("p_b", "MV")]
+    for dry_run in (True, False):
+        report = bulk_import.import_file(_jsonl(records), "jsonl", dry_run=dry_run, chunk_size=2)
+        assert (report["inserted"], report["rejected"]) == (3, 1)
+        assert report["rejects"][0]["line"] == 4 and "DLT" in " ".join(report["rejects"][0]["errors"])
+
+
+def test_dry_run_database_errors_reject_only_the_offending_rows(db):
+    db.execute("CREATE TRIGGER test_no_sales BEFORE INSERT ON data_flow_control_header"
+               " WHEN NEW.BUSINESS_UNIT = 'sales' BEGIN SELECT RAISE(ABORT, 'no sales'); END")
+    records = [header_record("p_a"), header_record("p_b", BUSINESS_UNIT="sales"), header_record("p_c")]
+    report = bulk_import.import_file(_jsonl(records), "jsonl", dry_run=True, chunk_size=3)
+    assert (report["inserted"], report["rejected"]) == (2, 1)
+    assert report["rejects"][0]["errors"] == ["Database error: no sales"]
+    assert db.execute("SELECT COUNT(*) FROM data_flow_control_header").fetchone()[0] == 0
@@ -0,0 +1,25 @@
+import database
+import migrations
+
+
+def test_pb_detail_resave_is_logged_as_update(db):
+    database.save_pb_details({"LOB": "retail", "TARGET_OBJ_NAME": "a"}, "p1")
+    database.save_pb_details({"LOB": "retail", "TARGET_OBJ_NAME": "b"}, "p1")
+    changes = [c for c in database.get_changes_since(0) if c['TABLE_NAME'] == 'data_flow_pb_detail']
+    assert [c['OPERATION'] for c in changes] == ['INSERT', 'UPDATE']
+    assert db.execute("SELECT TARGET_OBJ_NAME FROM data_flow_pb_detail WHERE DATA_FLOW_GROUP_ID = 'p1'").fetchall() == [('b',)]
+
+
+def test_change_log_is_pruned_beyond_retention(db):
+    total = migrations.CHANGE_LOG_RETENTION + 2 * migrations.CHANGE_LOG_PRUNE_INTERVAL
+    with db:
+        db.executemany(
+            "INSERT INTO catalog_change_log (TABLE_NAME, DATA_FLOW_GROUP_ID, ROW_KEY, OPERATION, CHANGED_TS)"
+            " VALUES ('data_flow_control_header', ?, '[]', 'INSERT', '2024-01-01')",
+            ((f"p{i}",) for i in range(total))
+        )
+    oldest, count = db.execute("SELECT MIN(VERSION), COUNT(*) FROM catalog_change_log").fetchone()
+    assert count == migrations.CHANGE_LOG_RETENTION
+    assert oldest == total - migrations.CHANGE_LOG_RETENTION + 1
+    # The catalog version is unaffected by pruning
+    assert database.get_catalog_version() == total
@@ -0,0 +1,25 @@
+import pytest
+
+from db_connection import transaction
+
+
+def _names(db):
+    return [row[0] for row in db.execute("SELECT NAME FROM change_log_consumers ORDER BY NAME")]
+
+
+def test_failed_nested_block_rolls_back_only_itself(db):
+    with transaction() as conn:
+        conn.execute("INSERT INTO change_log_consumers (NAME, VERSION) VALUES ('outer', 1)")
+        with pytest.raises(ValueError):
+            with transaction() as conn:
+                conn.execute("INSERT INTO change_log_consumers (NAME, VERSION) VALUES ('inner', 1)")
+                raise ValueError
+    assert _names(db) == ['outer']
+
+
+def test_rollback_block_sees_its_writes_then_discards_them(db):
+    with transaction(rollback=True) as conn:
+        with transaction() as conn:
+            conn.execute("INSERT INTO change_log_consumers (NAME, VERSION) VALUES ('dry', 1)")
+        assert _names(db) == ['dry']
+    assert _names(db) == []
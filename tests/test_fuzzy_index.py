@@ -0,0 +1,25 @@
+import pytest
+
+import database
+import fuzzy_index
+from conftest import header_record
+
+
+@pytest.fixture
+def catalog(db, monkeypatch):
+    # The trigram index is process-wide; start it over for each test database
+    monkeypatch.setattr(fuzzy_index, "_index", None)
+    database.bulk_upsert([header_record("customer_sales_etl_001"), header_record("inventory_daily_load")])
+
+
+def test_typo_finds_the_pipeline(catalog):
+    assert fuzzy_index.find_pipelines("custmer_sales_etl_001", limit=1)[0]["DATA_FLOW_GROUP_ID"] == "customer_sales_etl_001"
+
+
+def test_sync_advances_the_version_when_no_changes_are_left(catalog, monkeypatch):
+    fuzzy_index.find_pipelines("inventory")
+    version = database.get_catalog_version()
+    monkeypatch.setattr(database, "get_catalog_version", lambda: version + 10)
+    monkeypatch.setattr(database, "get_changes_since", lambda since, limit=None: [])
+    with fuzzy_index._index_lock:
+        assert fuzzy_index._sync_index()["version"] == version + 10
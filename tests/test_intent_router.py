@@ -0,0 +1,39 @@
+import pytest
+
+import database
+import fuzzy_index
+import intent_router
+from conftest import header_record
+
+
+@pytest.fixture
+def catalog(db, monkeypatch):
+    # The ID and trigram indexes are process-wide; start them over for each test database
+    monkeypatch.setattr(intent_router, "_index", None)
+    monkeypatch.setattr(fuzzy_index, "_index", None)
+    database.bulk_upsert([header_record("customer_sales_etl_001"), header_record("inventory_daily_load")])
+
+
+def test_typo_right_after_the_command_resolves_fuzzily(catalog):
+    routed = intent_router.route("show details for custmer_sales_etl_001")
+    assert (routed["pipeline_id"], routed["match"], routed["query"]) == ("customer_sales_etl_001", "fuzzy", "custmer_sales_etl_001")
+
+
+def test_fuzzy_match_elsewhere_in_the_message_is_not_opened(catalog):
+    routed = intent_router.route("view the dashboard, custmer_sales_etl_001 looks wrong")
+    assert intent_router.command_target("view the dashboard, custmer_sales_etl_001 looks wrong") == "dashboard"
+    assert routed["pipeline_id"] is None
+
+
+def test_exact_id_anywhere_still_resolves(catalog):
+    routed = intent_router.route("look up the numbers of customer_sales_etl_001")
+    assert (routed["pipeline_id"], routed["match"]) == ("customer_sales_etl_001", "exact")
+
+
+def test_sync_advances_the_version_when_no_changes_are_left(catalog, monkeypatch):
+    intent_router.resolve("view customer_sales_etl_001")
+    version = database.get_catalog_version()
+    monkeypatch.setattr(database, "get_catalog_version", lambda: version + 10)
+    monkeypatch.setattr(database, "get_changes_since", lambda since, limit=None: [])
+    with intent_router._index_lock:
+        assert intent_router._sync_index()["version"] == version + 10
@@ -0,0 +1,50 @@
+import pytest
+
+from lineage import parse_table_references
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT EXTRACT(year FROM order_date) AS y FROM gbl.orders",
+    "SELECT SUBSTRING(code FROM 2) FROM gbl.orders",
+    "SELECT TRIM(BOTH ' ' FROM name) FROM gbl.orders",
+    "SELECT CAST(EXTRACT(MONTH FROM (order_date)) AS INT) FROM gbl.orders",
+])
+def test_from_inside_function_arguments_is_not_a_read(sql):
+    assert parse_table_references(sql) == ({"gbl.orders"}, set())
+
+
+def test_delete_from_is_not_a_read():
+    assert parse_table_references("DELETE FROM mart.stage WHERE d < 1; INSERT INTO mart.stage SELECT * FROM gbl.orders") == (
+        {"gbl.orders"}, {"mart.stage"}
+    )
+
+
+def test_subqueries_in_parentheses_are_still_read():
+    sql = ("WITH recent AS (SELECT * FROM gbl.orders) SELECT * FROM recent"
+           " WHERE id IN (SELECT id FROM gbl.returns) AND EXISTS (SELECT 1 FROM (SELECT * FROM gbl.customers) c)")
+    assert parse_table_references(sql)[0] == {"gbl.orders", "gbl.returns", "gbl.customers"}
+
+
+def test_sync_with_no_changes_left_saves_the_current_version(db, monkeypatch):
+    import database
+    import lineage
+
+    version = database.get_catalog_version()
+    monkeypatch.setattr(database, "get_catalog_version", lambda: version + 10)
+    monkeypatch.setattr(database, "get_changes_since", lambda since, limit=None: [])
+    assert lineage.sync() == 0
+    assert db.execute("SELECT VERSION FROM change_log_consumers WHERE NAME = 'lineage'").fetchone()[0] == version + 10
+    assert lineage.downstream("gbl.orders")["pipelines"] == {}
+
+
+def test_dot_graph_escapes_quotes_and_backslashes():
+    from lineage_view import lineage_dot
+
+    result = {
+        'objects': {'gbl.orders': 0},
+        'pipelines': {'odd "id"\\x': 1},
+        'edges': [{'DEPTH': 1, 'FROM': 'gbl.orders', 'TO': 'odd "id"\\x', 'TYPE': 'object -> pipeline'}],
+    }
+    dot = lineage_dot(result)
+    assert '"odd \\"id\\"\\\\x" [shape=box' in dot
+    assert '"gbl.orders" -> "odd \\"id\\"\\\\x";' in dot
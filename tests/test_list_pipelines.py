@@ -0,0 +1,36 @@
+import pytest
+
+import database
+
+
+def _insert(conn, rows):
+    with conn:
+        conn.executemany(
+            "INSERT INTO data_flow_control_header (DATA_FLOW_GROUP_ID, ETL_LAYER, BUSINESS_UNIT, IS_ACTIVE, UPDATED_TS)"
+            " VALUES (?, ?, ?, ?, ?)", rows
+        )
+
+
+@pytest.mark.parametrize("order_by", sorted(database.SORT_KEYS))
+@pytest.mark.parametrize("descending", [True, False])
+def test_paging_visits_every_row_with_null_sort_keys(db, order_by, descending):
+    layers = ["L0", None, "L1", None, "L2"]
+    _insert(db, [
+        (f"p{i:02d}", layers[i % 5], None if i % 3 == 0 else f"bu{i % 2}", None if i % 4 == 0 else "Y",
+         f"2024-01-{1 + i % 7:02d} 00:00:00")
+        for i in range(23)
+    ])
+    sort_key = database.SORT_KEYS[order_by]
+    direction = "DESC" if descending else "ASC"
+    expected = [row[0] for row in db.execute(
+        f"SELECT DATA_FLOW_GROUP_ID FROM data_flow_control_header ORDER BY {', '.join(f'{col} {direction}' for col in sort_key)}"
+    )]
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = database.list_pipelines(page_size=4, cursor=cursor, columns=['DATA_FLOW_GROUP_ID'],
+                                               order_by=order_by, descending=descending)
+        seen.extend(row['DATA_FLOW_GROUP_ID'] for row in rows)
+        if cursor is None:
+            break
+    assert seen == expected
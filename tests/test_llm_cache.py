@@ -0,0 +1,54 @@
+import time
+
+import llm_cache
+
+
+def _entry(db, key):
+    return db.execute("SELECT LAST_USED_TS, HIT_COUNT FROM llm_response_cache WHERE CACHE_KEY = ?", (key,)).fetchone()
+
+
+def test_hits_refresh_last_used_at_most_once_per_interval(db, monkeypatch):
+    llm_cache.put("k", "model", "text")
+    stored = _entry(db, "k")
+    assert [llm_cache.get("k") for _ in range(3)] == ["text"] * 3
+    assert _entry(db, "k") == stored
+
+    # Once the entry is older than the refresh interval, the next hit writes all hits counted so far
+    monkeypatch.setattr(time, "time", lambda: stored[0] + llm_cache.LAST_USED_REFRESH_SECONDS + 1)
+    assert llm_cache.get("k") == "text"
+    assert _entry(db, "k") == (stored[0] + llm_cache.LAST_USED_REFRESH_SECONDS + 1, 4)
+
+
+def test_entry_count_follows_inserts_evictions_and_clear(db, monkeypatch):
+    monkeypatch.setattr(llm_cache, "MAX_ENTRIES", 3)
+    for i in range(5):
+        llm_cache.put(f"k{i}", "model", "text")
+    llm_cache.put("k4", "model", "new text")
+    assert llm_cache.get_stats()["entries"] == 3 == db.execute("SELECT COUNT(*) FROM llm_response_cache").fetchone()[0]
+    llm_cache.clear()
+    assert llm_cache.get_stats()["entries"] == 0
+
+
+class CountingModel:
+    model_name = "test-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False, generation_config=None, request_options=None):
+        self.calls += 1
+        return type("Response", (), {"text": f"answer {self.calls}", "usage_metadata": None})()
+
+
+def test_generation_config_is_part_of_the_key(db):
+    model = CountingModel()
+    json_config = {"response_mime_type": "application/json", "response_schema": {"type": "object"}}
+    first = llm_cache.generate(model, "system", "input", generation_config=json_config)
+    # Same config with its keys in another order: a hit
+    reordered = {"response_schema": {"type": "object"}, "response_mime_type": "application/json"}
+    assert llm_cache.generate(model, "system", "input", generation_config=reordered) == first
+    assert model.calls == 1
+    # Same input under another config, or none: misses
+    llm_cache.generate(model, "system", "input", generation_config={"response_mime_type": "text/plain"})
+    llm_cache.generate(model, "system", "input")
+    assert model.calls == 3
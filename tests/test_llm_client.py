@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+import llm_client
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class SlowStreamModel:
+    """A model whose stream sends a chunk every `interval` seconds, each well within the request timeout."""
+
+    def __init__(self, chunks, interval):
+        self.chunks = chunks
+        self.interval = interval
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False, generation_config=None, request_options=None):
+        self.calls += 1
+
+        def chunks():
+            for text in self.chunks:
+                time.sleep(self.interval)
+                yield Chunk(text)
+        return chunks()
+
+
+def test_slow_stream_is_cut_off_at_the_deadline():
+    model = SlowStreamModel(['x'] * 50, interval=0.02)
+    received = []
+    started = time.monotonic()
+    with pytest.raises(llm_client.LLMTimeout, match="within 0.1 seconds"):
+        llm_client.generate(model, "prompt", name='slow_stream', stream=True, on_text=received.append, deadline=0.1)
+    assert time.monotonic() - started < 0.5
+    assert 0 < len(received) < 50
+    assert model.calls == 1
+    assert llm_client.get_stats()['slow_stream']['timeouts'] == 1
+
+
+def test_stream_within_the_deadline_returns_the_text():
+    model = SlowStreamModel(['a', 'b', 'c'], interval=0)
+    assert llm_client.generate(model, "prompt", name='fast_stream', stream=True, deadline=5) == 'abc'
+    assert llm_client.get_stats()['fast_stream']['succeeded'] == 1
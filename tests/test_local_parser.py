@@ -0,0 +1,52 @@
+import pytest
+
+import local_parser
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("BUSINESS_UNIT=finance, ETL_LAYER=l0, WARNING_THRESHOLD_MINS=30",
+     {"BUSINESS_UNIT": "finance", "ETL_LAYER": "L0", "WARNING_THRESHOLD_MINS": 30}),
+    ("business unit: finance\ntrigger type: job", {"BUSINESS_UNIT": "finance", "TRIGGER_TYPE": "JOB"}),
+    ('{"ETL_LAYER": "L1", "WARNING_THRESHOLD_MINS": 15}', {"ETL_LAYER": "L1", "WARNING_THRESHOLD_MINS": 15}),
+])
+def test_structured_input_is_parsed(text, expected):
+    assert local_parser.parse(text, "header") == expected
+
+
+@pytest.mark.parametrize("text", [
+    # Prose after a plain value
+    "Business Unit = Finance and the layer is L0",
+    # An option followed by more text
+    "ETL_LAYER: L0, owner is bob",
+    # Not an integer
+    "WARNING_THRESHOLD_MINS: 30 minutes",
+    # Not one of the options
+    "ETL_LAYER=L7",
+    '{"ETL_LAYER": "bronze"}',
+])
+def test_values_that_do_not_fit_their_field_go_to_the_model(text):
+    assert local_parser.parse(text, "header") is None
+
+
+def test_multi_table_paste_is_split_per_table():
+    text = "table1: source=sap, load type=FULL\nTable 2 - source=ora; table 3: source=db2\nt4: source=hana"
+    assert local_parser.split_l0_tables(text) == [
+        (0, "source=sap, load type=FULL"), (1, "source=ora"), (2, "source=db2"), (3, "source=hana"),
+    ]
+
+
+def test_comma_joined_tables_in_sql_stay_in_the_query():
+    text = "table1: source=sap, transform query=select * from t1, t2 where t1.a=t2.a\ntable2: source=ora"
+    assert local_parser.split_l0_tables(text) == [
+        (0, "source=sap, transform query=select * from t1, t2 where t1.a=t2.a"), (1, "source=ora"),
+    ]
+
+
+def test_table_aliases_are_not_markers():
+    # Aliases starting a line of the query, or after a comma outside it, do not start a table
+    query = "transform query=select *\nfrom orders\nt1 join customers\nt2 on t1.id = t2.id"
+    assert local_parser.split_l0_tables(f"table1: source=sap\n{query}\ntable2: source=ora") == [
+        (0, f"source=sap\n{query}"), (1, "source=ora"),
+    ]
+    assert local_parser.split_l0_tables("table1: transform query=select * from a t1, b t2 where t1.x = t2.x") == []
+    assert local_parser.split_l0_tables("table1: source object name=orders, t2 source=ora") == []
@@ -0,0 +1,5 @@
+import migrations
+
+
+def test_hot_queries_are_index_backed(db):
+    assert [name for name, _, uses_index in migrations.check_query_plans(db) if not uses_index] == []
@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+import llm_client
+import prompts
+
+
+@pytest.mark.parametrize("stage", prompts.STAGES)
+def test_stage_prompt_is_within_the_token_budget(stage):
+    tokens = prompts.estimate_tokens(prompts.SYSTEM_PROMPTS[stage])
+    assert tokens <= llm_client.PROMPT_TOKEN_BUDGET, f"The {stage} prompt is {tokens} tokens"
+
+
+def test_creating_one_stage_model_does_not_block_the_others(monkeypatch):
+    monkeypatch.setattr(prompts, "_models", {})
+    release = threading.Event()
+
+    def create_model(stage):
+        if stage == "header":
+            # A slow context-cache creation
+            release.wait(5)
+        return f"{stage} model", None
+    monkeypatch.setattr(prompts, "_create_model", create_model)
+
+    slow = threading.Thread(target=prompts.get_stage_model, args=("header",))
+    slow.start()
+    try:
+        assert prompts.get_stage_model("l0") == "l0 model"
+        assert slow.is_alive()
+    finally:
+        release.set()
+        slow.join()
+    assert prompts.get_stage_model("header") == "header model"
+
+
+def test_a_renewing_stage_keeps_serving_its_current_model(monkeypatch):
+    monkeypatch.setattr(prompts, "_models", {"l0": ("old model", 0)})
+    monkeypatch.setattr(prompts, "_stage_locks", {"l0": threading.Lock()})
+    with prompts._stage_locks["l0"]:
+        # Another session holds the stage lock while it renews the expired cache
+        assert prompts.get_stage_model("l0") == "old model"
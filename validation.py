@@ -0,0 +1,173 @@
+"""
+Field lists and validation rules for pipeline metadata.
+Shared by the AI assistant and the bulk importer so both enforce the same rules.
+"""
+import re
+import database as db
+
+# Compute classes come from the lookup table, so the database must be bootstrapped first
+db.init_db()
+
+compute_class_options = db.get_compute_classes(dev_allowed=False)
+dev_compute_class_options = db.get_compute_classes(dev_allowed=True)
+
+# The VALID_OPTIONS dictionary is updated to use the fetched lists
+VALID_OPTIONS = {
+    "IS_ACTIVE": ["Y", "N"],
+    "TRIGGER_TYPE": ["DLT", "JOB"],
+    "ETL_LAYER": ["L0", "L1", "L2"],
+    "COMPUTE_CLASS": compute_class_options,
+    "COMPUTE_CLASS_DEV": dev_compute_class_options,
+    "INGESTION_MODE": ["EXTL_FULL", "EXTL_INC", "DATASPHERE_INGEST", "API_INGEST", "DB_INGEST"],
+    "STORAGE_TYPE": ["C1", "C2", "C3", "C4"],
+    "INPUT_FILE_FORMAT": ["parquet", "csv", "tsv", "json", "xml"],
+    "LOAD_TYPE": ["FULL", "DELTA", "SCD", "PySpark"],
+    "PRESTAG_FLAG": ["Y", "N"],
+    "TARGET_OBJ_TYPE": ["MV", "Table", "View"],
+    #"PRIORITY": ["Low", "Medium", "High", "Critical"],
+    "PARTITION_METHOD": ["Partition", "Liquid cluster"],
+}
+
+
+REQUIRED_FIELDS_HEADER = [
+    "DATA_FLOW_GROUP_ID", "BUSINESS_UNIT", "BUSINESS_OBJECT_NAME", "TRIGGER_TYPE",
+    "ETL_LAYER", "COMPUTE_CLASS", "COMPUTE_CLASS_DEV", "DATA_SME", "PRODUCT_OWNER",
+     "WARNING_THRESHOLD_MINS", "WARNING_DL_GROUP", "IS_ACTIVE"
+]
+
+REQUIRED_FIELDS_L0 = [
+    "SOURCE", "SOURCE_OBJ_SCHEMA", "SOURCE_OBJ_NAME", "LOB", "INPUT_FILE_FORMAT",
+    "STORAGE_TYPE", "DQ_LOGIC", "CDC_LOGIC", "TRANSFORM_QUERY", "LOAD_TYPE",
+    "PRESTAG_FLAG", "IS_ACTIVE"
+]
+
+REQUIRED_FIELDS_PB = [
+    "LOB", "TARGET_OBJ_SCHEMA", "TARGET_OBJ_NAME", "PRIORITY", "TARGET_OBJ_TYPE",
+    "TRANSFORM_QUERY", "LOAD_TYPE", "IS_ACTIVE"
+]
+
+# All possible fields for each table, including optional ones
+ALL_FIELDS_HEADER = REQUIRED_FIELDS_HEADER + ["INGESTION_MODE", "INGESTION_BUCKET", "SPARK_CONFIGS", "COST_CENTER", "min_version", "max_version"]
+ALL_FIELDS_L0 = REQUIRED_FIELDS_L0 + ["CUSTOM_SCHEMA", "DELIMETER", "PARTITION"]
+ALL_FIELDS_PB = REQUIRED_FIELDS_PB + ["PARTITION_METHOD", "CUSTOM_SCRIPT_PARAMS", "GENERIC_SCRIPTS", "SOURCE_PK", "TARGET_PK", "PARTITION_OR_INDEX", "RETENTION_DETAILS"]
+
+# Mapping for user-friendly names
+FIELD_MAPPING = {
+    "DATA_FLOW_GROUP_ID": "data flow name",
+    "BUSINESS_UNIT": "business unit",
+    "BUSINESS_OBJECT_NAME": "business object name",
+    "TRIGGER_TYPE": "trigger type",
+    "ETL_LAYER": "ETL layer",
+    "COMPUTE_CLASS": "compute class",
+    "COMPUTE_CLASS_DEV": "dev compute class",
+    "DATA_SME": "data SME",
+    "PRODUCT_OWNER": "product owner",
+    "INGESTION_BUCKET": "ingestion bucket",
+    "WARNING_THRESHOLD_MINS": "warning threshold (mins)",
+    "WARNING_DL_GROUP": "warning DL group",
+    "IS_ACTIVE": "is active",
+    "INGESTION_MODE": "ingestion mode",
+    "SOURCE": "source",
+    "SOURCE_OBJ_SCHEMA": "source schema",
+    "SOURCE_OBJ_NAME": "source object name",
+    "LOB": "LOB",
+    "INPUT_FILE_FORMAT": "input file format",
+    "STORAGE_TYPE": "storage type",
+    "DQ_LOGIC": "DQ logic",
+    "CDC_LOGIC": "CDC logic",
+    "TRANSFORM_QUERY": "transform query",
+    "LOAD_TYPE": "load type",
+    "PRESTAG_FLAG": "pre-stage flag",
+    "TARGET_OBJ_SCHEMA": "target schema",
+    "TARGET_OBJ_NAME": "target object name",
+    "PRIORITY": "priority",
+    "TARGET_OBJ_TYPE": "target object type",
+    "PARTITION_METHOD": "partition method",
+    "CUSTOM_SCRIPT_PARAMS": "custom script parameters",
+    "SOURCE_PK": "source primary key",
+    "TARGET_PK": "target primary key",
+    "CUSTOM_SCHEMA": "custom schema",
+    "RETENTION_DETAILS": "retention details"
+}
+
+def get_required_fields(table_type, etl_layer=None):
+    if table_type == "header":
+        required = REQUIRED_FIELDS_HEADER.copy()
+        if etl_layer and etl_layer.upper() == "L0":
+            required.append("INGESTION_MODE")
+        return required
+    elif table_type == "l0":
+        return REQUIRED_FIELDS_L0
+    elif table_type == "pb":
+        return REQUIRED_FIELDS_PB
+    return []
+
+def get_all_fields(table_type):
+    if table_type == "header":
+        return ALL_FIELDS_HEADER
+    elif table_type == "l0":
+        return ALL_FIELDS_L0
+    elif table_type == "pb":
+        return ALL_FIELDS_PB
+    return []
+
+def is_valid_email(email):
+    return re.match(r"[^@]+@[^@]+\.[^@]+", email)
+
+
+def validate_data(data, table_type, trigger_type=None):
+    missing_fields = []
+    invalid_values = []
+    
+    if table_type == "header":
+        required_fields = get_required_fields(table_type, data.get('ETL_LAYER'))
+        for field in required_fields:
+            if field not in data or data[field] is None or data[field] == "":
+                missing_fields.append(FIELD_MAPPING.get(field, field))
+        
+        # if "PRODUCT_OWNER" in data and data["PRODUCT_OWNER"] is not None and not is_valid_email(data["PRODUCT_OWNER"]):
+        #     invalid_values.append(f"PRODUCT_OWNER must be a valid email address.")
+        
+        etl_layer = (data.get('ETL_LAYER') or '').upper()
+        trigger_type = (data.get('TRIGGER_TYPE') or '').upper()
+        
+        if etl_layer == "L0" and trigger_type != "DLT" and "TRIGGER_TYPE" in data:
+             invalid_values.append(f"Friendly message: For an L0 pipeline, the trigger type must always be DLT. Please update the TRIGGER_TYPE field.")
+
+        for key in VALID_OPTIONS:
+            if key in data and data[key] is not None and data[key].upper() not in [o.upper() for o in VALID_OPTIONS[key]]:
+                invalid_values.append(f"Oops! The value for **{FIELD_MAPPING.get(key, key)}** is not allowed. Only allowed options are: `{', '.join(VALID_OPTIONS[key])}`.")
+
+            
+    elif table_type == "l0":
+        required_fields = get_required_fields(table_type)
+        for field in required_fields:
+            if field not in data or data[field] is None or data[field] == "":
+                missing_fields.append(FIELD_MAPPING.get(field, field))
+        
+        for key in VALID_OPTIONS:
+            if key in data and data[key] is not None and data[key].upper() not in [o.upper() for o in VALID_OPTIONS[key]]:
+                invalid_values.append(f"Oops! The value for **{FIELD_MAPPING.get(key, key)}** is not allowed. Only allowed options are: `{', '.join(VALID_OPTIONS[key])}`.")
+
+
+    elif table_type == "pb":
+        required_fields = get_required_fields(table_type)
+        for field in required_fields:
+            if field not in data or data[field] is None or data[field] == "":
+                missing_fields.append(FIELD_MAPPING.get(field, field))
+        
+        if "LOAD_TYPE" in data and data["LOAD_TYPE"].upper() == "SCD" and ("CUSTOM_SCRIPT_PARAMS" not in data or data["CUSTOM_SCRIPT_PARAMS"] is None or data["CUSTOM_SCRIPT_PARAMS"] == ""):
+            missing_fields.append(FIELD_MAPPING.get("CUSTOM_SCRIPT_PARAMS", "CUSTOM_SCRIPT_PARAMS"))
+        
+        target_obj_type = (data.get("TARGET_OBJ_TYPE") or '').upper()
+        if target_obj_type == "TABLE" and trigger_type and (trigger_type.upper() or '') != "JOB":
+            invalid_values.append(f"For TARGET_OBJ_TYPE 'Table', the TRIGGER_TYPE must be 'JOB'.")
+        if target_obj_type == "MV" and trigger_type and (trigger_type.upper() or '') != "DLT":
+            invalid_values.append(f"For TARGET_OBJ_TYPE 'MV', the TRIGGER_TYPE must be 'DLT'.")
+            
+        for key in VALID_OPTIONS:
+            if key in data and data[key] is not None and data[key].upper() not in [o.upper() for o in VALID_OPTIONS[key]]:
+                invalid_values.append(f"Oops! The value for **{FIELD_MAPPING.get(key, key)}** is not allowed. Only allowed options are: `{', '.join(VALID_OPTIONS[key])}`.")
+                
+    return missing_fields, invalid_values
+